@@ -35,6 +35,40 @@ load_dotenv(override=True)
 # config.json file path setting
 CONFIG_FILE_PATH = "config.json"
 
+# Transport names accepted in config.json, mapped to langchain-mcp-adapters transports
+TRANSPORT_ALIASES = {
+    "sse": "sse",
+    "streamable_http": "streamable_http",
+    "streamable-http": "streamable_http",
+    "http": "streamable_http",
+    "stdio": "stdio",
+    "websocket": "websocket",
+}
+
+
+def normalize_transport(tool_config):
+    """
+    Sets the transport of a tool configuration to a name the MCP client accepts.
+
+    URL tools without a transport use "streamable_http" when the URL ends with
+    /mcp (stateless HTTP servers) and "sse" otherwise; command tools use "stdio".
+
+    Args:
+        tool_config (dict): Tool configuration, updated in place
+
+    Returns:
+        dict: The tool configuration
+    """
+    transport = tool_config.get("transport")
+    if transport is None:
+        if "url" in tool_config:
+            path = tool_config["url"].split("?")[0].rstrip("/")
+            transport = "streamable_http" if path.endswith("/mcp") else "sse"
+        else:
+            transport = "stdio"
+    tool_config["transport"] = TRANSPORT_ALIASES.get(transport, transport)
+    return tool_config
+
 # Function to load settings from JSON file
 def load_config_from_json():
     """
@@ -55,7 +89,10 @@ def load_config_from_json():
     try:
         if os.path.exists(CONFIG_FILE_PATH):
             with open(CONFIG_FILE_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
+                config = json.load(f)
+            for tool_config in config.values():
+                normalize_transport(tool_config)
+            return config
         else:
             # Create file with default settings if it doesn't exist
             save_config_to_json(default_config)
@@ -222,8 +259,7 @@ async def cleanup_mcp_client():
     """
     if "mcp_client" in st.session_state and st.session_state.mcp_client is not None:
         try:
-
-            await st.session_state.mcp_client.__aexit__(None, None, None)
+            # The client opens a new session for each tool call, so there is no connection to close
             st.session_state.mcp_client = None
         except Exception as e:
             import traceback
@@ -451,8 +487,7 @@ async def initialize_session(mcp_config=None):
             # Load settings from config.json file
             mcp_config = load_config_from_json()
         client = MultiServerMCPClient(mcp_config)
-        await client.__aenter__()
-        tools = client.get_tools()
+        tools = await client.get_tools()
         st.session_state.tool_count = len(tools)
         st.session_state.mcp_client = client
 
@@ -650,16 +685,13 @@ with st.sidebar:
                         # Process all tools
                         success_tools = []
                         for tool_name, tool_config in parsed_tool.items():
-                            # Check URL field and set transport
-                            if "url" in tool_config:
-                                # Set transport to "sse" if URL exists
-                                tool_config["transport"] = "sse"
+                            # Set transport: "sse" or "streamable_http" for URL tools, "stdio" for commands
+                            transport_given = "transport" in tool_config
+                            normalize_transport(tool_config)
+                            if "url" in tool_config and not transport_given:
                                 st.info(
-                                    f"URL detected in '{tool_name}' tool, setting transport to 'sse'."
+                                    f"URL detected in '{tool_name}' tool, setting transport to '{tool_config['transport']}'."
                                 )
-                            elif "transport" not in tool_config:
-                                # Set default "stdio" if URL doesn't exist and transport isn't specified
-                                tool_config["transport"] = "stdio"
 
                             # Check required fields
                             if (
@@ -0,0 +1,124 @@
+"""
+Benchmark: memory, recall@k and latency of the approximate and quantized index
+variants vs. exact search.
+
+Vectors come from the flat KBS FAISS index when it exists (or from a .npy
+file), otherwise they are random. Queries are indexed vectors with added
+noise, so every query has meaningful nearest neighbors.
+
+Usage:
+    python benchmarks/bench_ann.py --ef-search 16 32 64 128 --nprobe 1 4 8 16
+    python benchmarks/bench_ann.py --random 100000 --dim 1024 --pq-m 64 --rerank 0 4
+
+Memory is the serialized index size; re-ranked rows additionally read the
+exact vectors from a memory mapped .npy file at query time.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from rag.ann import (  # noqa: E402
+    QUANTIZED_INDEX_TYPES,
+    RerankIndex,
+    apply_search_params,
+    build_index,
+    index_variant_path,
+    read_vectors,
+)
+
+
+def load_vectors(args: argparse.Namespace) -> tuple:
+    if args.vectors:
+        return np.load(args.vectors).astype(np.float32), faiss.METRIC_L2
+    flat_path = index_variant_path(config.DB_DIR, config.DB_INDEX_NAME, "flat")
+    if args.random is None and flat_path.exists():
+        index = faiss.read_index(str(flat_path))
+        return read_vectors(index), index.metric_type
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((args.random or 20_000, args.dim)).astype(np.float32), faiss.METRIC_L2
+
+
+def time_search(index, queries: np.ndarray, k: int) -> tuple:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return latencies, np.stack(results)
+
+
+def recall(ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(exact)) for row, exact in zip(ids, exact_ids))
+    return hits / exact_ids.size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=Path, help="Benchmark a .npy vector file")
+    parser.add_argument("--random", type=int, help="Benchmark this many random vectors")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.1, help="Query noise relative to the vector norm")
+    parser.add_argument("--k", type=int, default=config.HYBRID_FETCH_K)
+    parser.add_argument("--hnsw-m", type=int, default=config.HNSW_M)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--pq-m", type=int, default=config.PQ_M)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, config.RERANK_FACTOR],
+                        help="Re-rank factors for quantized variants (0: none)")
+    parser.add_argument("--types", nargs="+", default=["hnsw", "ivf_flat", "fp16", "sq8", "pq", "ivf_pq"])
+    args = parser.parse_args()
+
+    vectors, metric = load_vectors(args)
+    rng = np.random.default_rng(1)
+    picked = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    scale = args.noise * np.linalg.norm(picked, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    queries = (picked + rng.standard_normal(picked.shape).astype(np.float32) * scale).astype(np.float32)
+    print(f"{len(vectors)} vectors, {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    flat = build_index(vectors, "flat", metric=metric)
+    flat_latencies, exact_ids = time_search(flat, queries, args.k)
+
+    header = f"{'index':<10} {'param':<14} {'rerank':>6} {'MB':>9} {'B/vec':>7} {'build s':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+
+    def report(name, param, rerank, size, build, latencies, ids) -> None:
+        print(f"{name:<10} {param:<14} {rerank:>6} {size / 2 ** 20:>9.1f} {size / len(vectors):>7.0f} {build:>8.2f} "
+              f"{recall(ids, exact_ids):>7.3f} {statistics.median(latencies):>8.3f} "
+              f"{statistics.quantiles(latencies, n=20)[-1]:>8.3f}")
+
+    report("flat", "-", "-", faiss.serialize_index(flat).nbytes, 0.0, flat_latencies, exact_ids)
+
+    search_params = {"hnsw": ("ef_search", args.ef_search), "ivf_flat": ("nprobe", args.nprobe),
+                     "ivf_pq": ("nprobe", args.nprobe)}
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, metric=metric, hnsw_m=args.hnsw_m,
+                            hnsw_ef_construction=config.HNSW_EF_CONSTRUCTION, ivf_nlist=config.IVF_NLIST,
+                            pq_m=args.pq_m)
+        build = time.perf_counter() - start
+        size = faiss.serialize_index(index).nbytes
+        param_name, values = search_params.get(index_type, (None, [None]))
+        rerank_factors = args.rerank if index_type in QUANTIZED_INDEX_TYPES else [0]
+        for value in values:
+            if param_name:
+                apply_search_params(index, **{param_name: value})
+            for factor in rerank_factors:
+                searcher = RerankIndex(index, vectors, factor) if factor else index
+                latencies, ids = time_search(searcher, queries, args.k)
+                param = f"{param_name}={value}" if param_name else "-"
+                report(index_type, param, factor or "-", size, build, latencies, ids)
+
+
+if __name__ == "__main__":
+    main()
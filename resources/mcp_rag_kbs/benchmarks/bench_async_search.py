@@ -0,0 +1,62 @@
+"""
+Benchmark: hybrid search throughput vs. number of concurrent clients.
+
+Compares calling the synchronous search_hybrid from an async handler (what
+the MCP search tool used to do) with the native asearch_hybrid path. The
+embedding API is simulated with a fixed latency, and the query embedding
+cache is disabled so every request pays the round trip.
+
+Usage:
+    python benchmarks/bench_async_search.py --clients 1 2 4 8 16 32
+"""
+
+import argparse
+import asyncio
+import time
+
+from common import BenchmarkRetrievalChain, LatencyEmbeddings, load_kbs_documents
+
+
+async def run_clients(search, queries, clients: int, requests_per_client: int) -> float:
+    async def client(offset: int) -> None:
+        for i in range(requests_per_client):
+            await search(queries[(offset + i) % len(queries)])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return clients * requests_per_client / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated embedding latency (s)")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    docs = load_kbs_documents()
+    chain = BenchmarkRetrievalChain(
+        LatencyEmbeddings(dim=args.dim, latency=args.latency),
+        split_docs=docs,
+        query_cache_size=0,
+        search_workers=args.workers,
+    ).initialize()
+    queries = [doc.page_content[:40] for doc in docs[::7]]
+
+    async def blocking(query):
+        return chain.search_hybrid(query, 4)
+
+    async def native(query):
+        return await chain.asearch_hybrid(query, 4)
+
+    print(f"{'clients':>8} {'sync QPS':>10} {'async QPS':>10}")
+    for clients in args.clients:
+        sync_qps = asyncio.run(run_clients(blocking, queries, clients, args.requests))
+        async_qps = asyncio.run(run_clients(native, queries, clients, args.requests))
+        print(f"{clients:>8} {sync_qps:>10.1f} {async_qps:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: LangChain BM25Retriever vs. the CSR-backed SparseBM25Retriever.
+
+Synthetic corpora are generated by sampling tokens (Zipf distributed) from the
+vocabulary of the KBS parsing outputs, so term statistics resemble the real
+corpus at 10k / 100k / 1M chunks.
+
+Usage:
+    python benchmarks/bench_bm25.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import glob
+import pickle
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from langchain_community.retrievers import BM25Retriever  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from rag.bm25 import SparseBM25Retriever  # noqa: E402
+
+
+def load_vocabulary() -> list:
+    vocab = {}
+    for pkl_file in glob.glob(str(Path(config.PARSING_OUTPUT_KBS_DIR).parent / "*" / "*.pkl")):
+        with open(pkl_file, "rb") as f:
+            for doc in pickle.load(f):
+                for token in doc.page_content.split():
+                    vocab[token] = vocab.get(token, 0) + 1
+    return [t for t, _ in sorted(vocab.items(), key=lambda x: -x[1])]
+
+
+def make_corpus(vocab: list, size: int, chunk_len: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.2, size=size * chunk_len), len(vocab)) - 1
+    tokens = np.asarray(vocab, dtype=object)[ranks].reshape(size, chunk_len)
+    return [Document(page_content=" ".join(row)) for row in tokens]
+
+
+def time_queries(retriever, queries: list) -> list:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk-len", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=config.DEFAULT_TOP_K)
+    parser.add_argument("--skip-baseline-above", type=int, default=None,
+                        help="Skip BM25Retriever for corpora larger than this")
+    args = parser.parse_args()
+
+    vocab = load_vocabulary()
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(vocab[:2000], size=3)) for _ in range(args.queries)]
+
+    print(f"{'chunks':>9} {'engine':<20} {'build s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in args.sizes:
+        docs = make_corpus(vocab, size, args.chunk_len)
+        engines = [("SparseBM25Retriever", SparseBM25Retriever)]
+        if args.skip_baseline_above is None or size <= args.skip_baseline_above:
+            engines.insert(0, ("BM25Retriever", BM25Retriever))
+
+        for name, cls in engines:
+            start = time.perf_counter()
+            retriever = cls.from_documents(docs, k=args.k)
+            build = time.perf_counter() - start
+            latencies = time_queries(retriever, queries)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{size:>9} {name:<20} {build:>9.2f} {statistics.median(latencies):>9.2f} {p95:>9.2f}")
+            del retriever
+
+
+if __name__ == "__main__":
+    main()
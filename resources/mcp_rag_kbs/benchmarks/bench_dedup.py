@@ -0,0 +1,112 @@
+"""
+Benchmark: MinHash/LSH near-duplicate detection (rag.dedup).
+
+Two parts:
+
+- real: the parsing outputs of the KBS corpus (every directory of the corpus
+  root, or --dirs), reporting the chunks, characters and flat index bytes
+  collapsing the duplicates saves, per threshold
+- synthetic: --size chunks sampled from the KBS vocabulary as in
+  bench_bm25.py, of which --dup-rate are copies of an earlier chunk with
+  --edit-rate of their tokens replaced. Reports the throughput and the
+  recall of the planted duplicates, and the precision: the share of
+  collapsed pairs whose exact shingle Jaccard similarity reaches the
+  threshold (within 0.05, as the similarity is estimated)
+
+Usage:
+    python benchmarks/bench_dedup.py --size 100000 --thresholds 0.8 0.9 0.95
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from bench_bm25 import load_vocabulary, make_corpus  # noqa: E402
+from rag.dedup import MinHashDeduplicator, duplicate_stats, format_dedup_stats  # noqa: E402
+from rag.ingest import discover_sources, load_source_documents  # noqa: E402
+
+
+def shingles(text: str, size: int) -> set:
+    text = " ".join(text.split()).lower().ljust(size)
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: str, b: str, size: int) -> float:
+    a, b = shingles(a, size), shingles(b, size)
+    return len(a & b) / len(a | b)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dirs", type=Path, nargs="*", help="Parsing output directories (default: the KBS corpus)")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--chunk-len", type=int, default=60)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    parser.add_argument("--edit-rate", type=float, default=0.03, help="Share of tokens replaced in a planted copy")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--dim", type=int, default=4096, help="Vector dimension for the index size estimate")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+    results = []
+
+    root = Path(config.CORPORA[config.DEFAULT_CORPUS]["parsing_output_root"])
+    dirs = args.dirs or (sorted(path for path in root.iterdir() if path.is_dir()) if root.exists() else [])
+    docs = [doc for path in discover_sources(dirs).values() for doc in load_source_documents(path)]
+    if docs:
+        print(f"Parsing outputs: {len(docs)} chunks from {len(dirs)} directories", flush=True)
+        texts = [doc.page_content for doc in docs]
+        for threshold in args.thresholds:
+            start = time.perf_counter()
+            canonical = MinHashDeduplicator(threshold, num_perm=args.num_perm).find_duplicates(texts)
+            elapsed = time.perf_counter() - start
+            stats = duplicate_stats(docs, canonical)
+            print(f"  threshold {threshold}: {format_dedup_stats(stats, args.dim)} in {elapsed:.2f}s", flush=True)
+            results.append({"corpus": "parsing outputs", "threshold": threshold, "seconds": elapsed, **stats})
+
+    rng = np.random.default_rng(0)
+    vocab = load_vocabulary()
+    texts = [doc.page_content for doc in make_corpus(vocab, args.size, args.chunk_len)]
+    planted = {}
+    for i in np.flatnonzero(rng.random(args.size) < args.dup_rate)[1:]:
+        original = int(rng.integers(0, i))
+        tokens = texts[original].split()
+        for j in np.flatnonzero(rng.random(len(tokens)) < args.edit_rate):
+            tokens[j] = vocab[rng.integers(len(vocab))]
+        texts[i] = " ".join(tokens)
+        planted[int(i)] = original
+    print(f"\nSynthetic: {args.size} chunks, {len(planted)} planted near-duplicates", flush=True)
+
+    for threshold in args.thresholds:
+        deduplicator = MinHashDeduplicator(threshold, num_perm=args.num_perm)
+        start = time.perf_counter()
+        canonical = deduplicator.find_duplicates(texts)
+        elapsed = time.perf_counter() - start
+        found = np.flatnonzero(canonical != np.arange(args.size))
+        planted_above = [i for i, original in planted.items()
+                         if jaccard(texts[i], texts[original], deduplicator.shingle_size) >= threshold]
+        recall = np.mean([canonical[i] != i for i in planted_above]) if planted_above else float("nan")
+        sample = rng.choice(found, min(found.size, 2000), replace=False) if found.size else found
+        precision = np.mean([jaccard(texts[i], texts[canonical[i]], deduplicator.shingle_size) >= threshold - 0.05
+                             for i in sample]) if sample.size else float("nan")
+        print(f"  threshold {threshold} ({deduplicator.bands} bands x {deduplicator.band_rows} rows): "
+              f"{found.size} collapsed in {elapsed:.2f}s ({args.size / elapsed:,.0f} chunks/s), "
+              f"recall {recall:.3f} of {len(planted_above)} planted above the threshold, precision {precision:.3f}",
+              flush=True)
+        results.append({"corpus": "synthetic", "threshold": threshold, "seconds": elapsed,
+                        "chunks": args.size, "duplicate_chunks": int(found.size),
+                        "recall": float(recall), "precision": float(precision)})
+
+    if args.output:
+        args.output.write_text(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark: metadata pre-filtering vs. post-filtering an over-fetched result list.
+
+A synthetic corpus of --size chunks is split into --sources consecutive
+source documents of pages of --page-size chunks (the layout ingestion
+produces). Chunk texts are sampled from the KBS vocabulary as in
+bench_bm25.py and vectors are random, with queries close to an in-scope
+chunk. For scopes of decreasing size (several sources, one source, one
+page) every engine is timed three ways:
+
+- unfiltered: the plain search, for reference
+- post-filter: the search over-fetches k * corpus / scope results (the
+  expected number needed to keep k in scope) and drops the rest; BM25
+  scores the whole corpus and masks it
+- pre-filter: the scope is resolved from the metadata posting lists and
+  only its rows are searched (rag.ann.search_rows) or scored (BM25 doc_ids)
+
+Recall is measured against the exact top k within the scope.
+
+Usage:
+    python benchmarks/bench_filters.py --size 100000 --dim 256 --index-types flat hnsw ivf_flat
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bm25 import load_vocabulary, make_corpus  # noqa: E402
+from rag.ann import apply_search_params, build_index, search_rows  # noqa: E402
+from rag.bm25 import BM25Index  # noqa: E402
+from rag.metadata_index import MetadataIndex  # noqa: E402
+
+
+def timed(func, queries) -> tuple:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(func(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+
+def recall(found: list, truth: list, k: int) -> Optional[float]:
+    if found is None:
+        return None
+    return statistics.mean(len(set(ids.tolist()) & set(t.tolist())) / min(k, t.size or 1) for ids, t in zip(found, truth))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=4, help="Chunks per page")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--chunk-len", type=int, default=60)
+    parser.add_argument("--index-types", nargs="+", default=["flat", "hnsw", "ivf_flat"])
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    docs = make_corpus(load_vocabulary(), args.size, args.chunk_len)
+    per_source = -(-args.size // args.sources)
+    for i, doc in enumerate(docs):
+        doc.metadata = {"source": f"doc{i // per_source:04d}.pdf", "page": (i % per_source) // args.page_size}
+
+    start = time.perf_counter()
+    metadata_index = MetadataIndex.build(docs, ("source", "page"))
+    print(f"Metadata index: {len(metadata_index.values('source'))} sources, "
+          f"{metadata_index.nbytes / 2 ** 20:.1f} MiB, built in {time.perf_counter() - start:.2f}s", flush=True)
+    bm25 = BM25Index.from_texts(doc.page_content for doc in docs)
+    vectors = rng.standard_normal((args.size, args.dim)).astype(np.float32)
+    indexes = {}
+    for index_type in args.index_types:
+        start = time.perf_counter()
+        indexes[index_type] = apply_search_params(build_index(vectors, index_type), ef_search=args.ef_search,
+                                                  nprobe=args.nprobe)
+        print(f"Built {index_type} in {time.perf_counter() - start:.1f}s", flush=True)
+
+    scopes = {
+        "10% of sources": {"source": [f"doc{i:04d}.pdf" for i in range(0, args.sources, 10)]},
+        "one source": {"source": "doc0001.pdf"},
+        "one page": {"source": "doc0001.pdf", "page": 1},
+    }
+
+    results = []
+    for scope_name, filters in scopes.items():
+        start = time.perf_counter()
+        rows = metadata_index.select(filters)
+        select_ms = (time.perf_counter() - start) * 1000
+        fetch = min(args.size, args.k * -(-args.size // rows.size))
+        print(f"\n{scope_name}: {rows.size} chunks ({rows.size / args.size:.2%}), filter resolved in "
+              f"{select_ms:.3f} ms, post-filter fetch {fetch}")
+
+        picks = rng.choice(rows, args.queries)
+        query_vectors = vectors[picks] + 0.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        query_texts = [" ".join(rng.choice(docs[i].page_content.split(), 3)) for i in picks]
+        in_scope = np.zeros(args.size, dtype=bool)
+        in_scope[rows] = True
+
+        def report(engine: str, method: str, latencies: list, found: list, truth: list) -> None:
+            # Unfiltered results are not restricted to the scope; only their latency is reported
+            filled = None if found is None else statistics.mean(
+                min(ids.size, args.k) / min(args.k, rows.size) for ids in found
+            )
+            result = {"scope": scope_name, "scope_rows": int(rows.size), "engine": engine, "method": method,
+                      "p50_ms": statistics.median(latencies), "mean_ms": statistics.mean(latencies),
+                      "recall": recall(found, truth, args.k), "filled": filled}
+            results.append(result)
+            quality = "" if found is None else f"  recall@{args.k} {result['recall']:.3f}  filled {filled:.0%}"
+            print(f"  {engine:<9} {method:<11} p50 {result['p50_ms']:8.3f} ms  "
+                  f"mean {result['mean_ms']:8.3f} ms{quality}", flush=True)
+
+        # Exact top k within the scope
+        _, exact = faiss.knn(query_vectors, vectors[rows], args.k)
+        truth = [rows[ids[ids >= 0]] for ids in exact]
+        for index_type, index in indexes.items():
+
+            def post_filter(query: np.ndarray) -> np.ndarray:
+                _, ids = index.search(query[None, :], fetch)
+                ids = ids[0][ids[0] >= 0]
+                return ids[in_scope[ids]][:args.k]
+
+            def pre_filter(query: np.ndarray) -> np.ndarray:
+                _, ids = search_rows(index, query[None, :], args.k, rows)
+                return ids[0][ids[0] >= 0]
+
+            report(index_type, "unfiltered", timed(lambda q: index.search(q[None, :], args.k), query_vectors)[0],
+                   None, truth)
+            report(index_type, "post-filter", *timed(post_filter, query_vectors), truth)
+            report(index_type, "pre-filter", *timed(pre_filter, query_vectors), truth)
+
+        def bm25_post_filter(query: str) -> np.ndarray:
+            scores = bm25.get_scores(query)
+            scores[~in_scope] = -np.inf
+            ids, scores = bm25._top_k(scores, args.k)
+            return ids[np.isfinite(scores)]
+
+        latencies, found = timed(bm25_post_filter, query_texts)
+        truth = found
+        report("bm25", "unfiltered", timed(lambda q: bm25.search(q, args.k), query_texts)[0],
+               None, truth)
+        report("bm25", "post-filter", latencies, found, truth)
+        report("bm25", "pre-filter", *timed(lambda q: bm25.search(q, args.k, rows)[0], query_texts), truth)
+
+    if args.output:
+        args.output.write_text(json.dumps({"results": results, "size": args.size, "dim": args.dim}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Benchmark: latency, throughput, per-stage timings and memory of the retrieval path.
+
+Drives search_semantic, search_keyword and search_hybrid of a KBSRetrievalChain
+and the MCP `search` tool with a recorded query set, against the local
+hashing embedding backend (optionally with a simulated API latency), and
+reports:
+
+- latency p50 / p95 / p99 of sequential requests per mode
+- QPS of the async paths at increasing concurrency
+- per-stage breakdown of hybrid search (query embedding, keyword search,
+  semantic search, fusion)
+- resident memory before and after loading, and peak RSS
+
+Without --index, a temporary index is built from the KBS parsing outputs
+with the hashing backend. Query and result caches are off unless --cache
+is given, so every request does the full work.
+
+Usage:
+    python benchmarks/bench_retrieval.py --queries kbs_qa_question_20251108.csv --output bench.json
+    python benchmarks/bench_retrieval.py --latency 0.05 --concurrency 1 4 16 --baseline bench.json
+
+Queries are read from the "question" column of a CSV file or from a text
+file with one query per line; without --queries they are derived from the
+chunks. With --baseline, p95 latencies and the QPS of each concurrency
+level are compared to an earlier result file and the exit status is 1 if any regressed by more
+than --max-regression.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from common import DelayedEmbeddings, percentile
+
+import config  # noqa: E402
+from rag import CachedQueryEmbeddings, KBSRetrievalChain  # noqa: E402
+from rag.corpora import CorpusRegistry  # noqa: E402
+from rag.embedding_builder import EmbeddingBuilder  # noqa: E402
+from rag.embeddings import create_embeddings  # noqa: E402
+from rag.ingest import discover_sources  # noqa: E402
+
+MODES = ("semantic", "keyword", "hybrid", "tool")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def load_queries(path: Optional[Path], chain: KBSRetrievalChain, limit: int) -> List[str]:
+    if path is not None and path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            queries = [row["question"].strip() for row in csv.DictReader(f) if row.get("question")]
+    elif path is not None:
+        queries = [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        # First sentence of every few chunks, without markdown and image links
+        queries = []
+        for doc in list(chain.row_documents())[::5]:
+            text = re.sub(r"!\[[^\]]*\]\([^)]*\)|[#*>|`-]", " ", doc.page_content)
+            sentence = re.split(r"(?<=[.?!])\s", " ".join(text.split()), maxsplit=1)[0][:80]
+            if len(sentence) >= 10:
+                queries.append(sentence)
+    if not queries:
+        raise ValueError("No queries to run.")
+    return [queries[i % len(queries)] for i in range(limit)]
+
+
+def build_index(directory: Path, dim: int) -> None:
+    sources = discover_sources(sorted(p for p in Path(config.PARSING_OUTPUT_KBS_ROOT).iterdir() if p.is_dir()))
+    builder = EmbeddingBuilder(create_embeddings("hashing", "passage", dim=dim), directory / "bench.checkpoint",
+                               batch_size=256)
+    builder.open_checkpoint(sources, restart=True)
+    builder.embed(sources)
+    builder.write(create_chain(directory, None, "pickle", False), sources)
+    builder.clear_checkpoint()
+
+
+def create_chain(directory: Path, query_embeddings: Any, mode: str, cache: bool, **kwargs) -> KBSRetrievalChain:
+    return KBSRetrievalChain(
+        persist_directory=str(directory),
+        db_index_name=kwargs.get("db_index_name", "bench"),
+        keyword_index_name=kwargs.get("keyword_index_name"),
+        manifest_name=kwargs.get("manifest_name"),
+        vectorstore_mode=mode,
+        query_embeddings=query_embeddings,
+        k=config.DEFAULT_TOP_K,
+        hybrid_fusion=config.HYBRID_FUSION,
+        hybrid_weights=config.HYBRID_WEIGHTS,
+        hybrid_fetch_k=config.HYBRID_FETCH_K,
+        result_cache_backend="memory" if cache else None,
+    )
+
+
+def load_tool(chain: KBSRetrievalChain) -> Callable:
+    """Return the MCP search tool of mcp_server, serving the benchmark chain."""
+    import mcp_server
+
+    mcp_server.corpus_registry = CorpusRegistry(lambda name, directory: chain,
+                                                {config.DEFAULT_CORPUS: {"db_dir": chain.persist_directory}})
+    mcp_server.startup.mark_ready()
+
+    async def tool(query: str, k: int) -> Any:
+        return await mcp_server.mcp.call_tool("search", {"query": query, "top_k": k})
+
+    return tool
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def measure_latency(search: Callable, queries: List[str], k: int, warmup: int) -> Dict[str, float]:
+    for query in queries[:warmup]:
+        search(query, k)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+async def measure_throughput(search: Callable, queries: List[str], k: int, concurrency: int) -> Dict[str, float]:
+    latencies = []
+    position = iter(range(len(queries)))
+
+    async def client() -> None:
+        for i in position:
+            start = time.perf_counter()
+            await search(queries[i], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "qps": len(queries) / elapsed, **summarize(latencies)}
+
+
+def measure_stages(chain: KBSRetrievalChain, queries: List[str], k: int) -> Dict[str, Dict[str, float]]:
+    fetch_k = chain.hybrid_engine.candidate_pool_size(k)
+    stages: Dict[str, List[float]] = {"embed": [], "keyword": [], "semantic": [], "fuse": []}
+    for query in queries:
+        t0 = time.perf_counter()
+        embedding = chain.embeddings.embed_query(query)
+        t1 = time.perf_counter()
+        keyword = chain.search_keyword_with_scores(query, fetch_k)
+        t2 = time.perf_counter()
+        semantic = chain.search_semantic_by_vectors([embedding], fetch_k)[0]
+        t3 = time.perf_counter()
+        chain.hybrid_engine.fuse([keyword, semantic], k)
+        t4 = time.perf_counter()
+        for stage, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            stages[stage].append(seconds * 1000)
+    return {stage: summarize(values) for stage, values in stages.items()}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    regressions = []
+    print(f"\n{'metric':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    checks = [(f"latency.{mode}.p95_ms", baseline["latency"][mode]["p95_ms"], stats["p95_ms"], False)
+              for mode, stats in results["latency"].items() if mode in baseline.get("latency", {})]
+    for mode, runs in results["throughput"].items():
+        baseline_qps = {run["concurrency"]: run["qps"] for run in baseline.get("throughput", {}).get(mode, [])}
+        checks += [(f"throughput.{mode}.c{run['concurrency']}.qps", baseline_qps[run["concurrency"]], run["qps"], True)
+                   for run in runs if run["concurrency"] in baseline_qps]
+    for name, old, new, higher_is_better in checks:
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = " !" if worse > max_regression else ""
+        print(f"{name:<32} {old:>10.2f} {new:>10.2f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=Path, help="Query set: CSV with a 'question' column or one query per line")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode and concurrency level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--k", type=int, default=config.DEFAULT_TOP_K)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--index", type=Path, help="Existing index directory built with the hashing backend")
+    parser.add_argument("--index-name", default=config.DB_INDEX_NAME, help="Index name of --index")
+    parser.add_argument("--vectorstore-mode", choices=KBSRetrievalChain.VECTORSTORE_MODES, default="pickle")
+    parser.add_argument("--dim", type=int, default=4096, help="Embedding dimension of the hashing backend")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated embedding API latency (s)")
+    parser.add_argument("--cache", action="store_true", help="Enable the query embedding and result caches")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare with an earlier --output file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Tolerated relative regression")
+    args = parser.parse_args()
+
+    rss_baseline = rss_mb()
+    embeddings = create_embeddings("hashing", "query", dim=args.dim)
+    if args.latency:
+        embeddings = DelayedEmbeddings(embeddings, args.latency)
+
+    if args.index is None:
+        directory = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+        start = time.perf_counter()
+        build_index(directory, args.dim)
+        print(f"Built a temporary index in {time.perf_counter() - start:.1f}s: {directory}")
+        names = {"db_index_name": "bench"}
+    else:
+        directory = args.index
+        names = {"db_index_name": args.index_name, "keyword_index_name": f"{args.index_name}_bm25",
+                 "manifest_name": f"{args.index_name}_manifest.json"}
+
+    if args.cache:
+        embeddings = CachedQueryEmbeddings(embeddings, max_size=config.QUERY_EMBEDDING_CACHE_SIZE)
+    start = time.perf_counter()
+    chain = create_chain(directory, embeddings, args.vectorstore_mode, args.cache, **names).initialize()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+    queries = load_queries(args.queries, chain, args.requests)
+
+    sync_searches = {"semantic": chain.search_semantic, "keyword": chain.search_keyword, "hybrid": chain.search_hybrid}
+    async_searches = {"semantic": chain.asearch_semantic, "keyword": chain.asearch_keyword,
+                      "hybrid": chain.asearch_hybrid}
+    skipped = {}
+    if "tool" in args.modes:
+        try:
+            async_searches["tool"] = load_tool(chain)
+        except Exception as e:
+            skipped["tool"] = f"{type(e).__name__}: {e}"
+            print(f"Skipping the MCP tool: {skipped['tool']}")
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            "chunks": chain.vectorstore.index.ntotal,
+            "queries": len(set(queries)),
+            "load_seconds": load_seconds,
+        },
+        "latency": {},
+        "throughput": {},
+        "stages": {},
+        "memory": {},
+        "skipped": skipped,
+    }
+
+    print(f"{chain.vectorstore.index.ntotal} chunks, {len(set(queries))} distinct queries, k={args.k}")
+    print(f"\n{'mode':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for mode in args.modes:
+        if mode in sync_searches:
+            stats = measure_latency(sync_searches[mode], queries, args.k, args.warmup)
+        elif mode in async_searches:
+            stats = asyncio.run(measure_throughput(async_searches[mode], queries, args.k, 1))
+            stats = {key: stats[key] for key in ("n", "mean_ms", "p50_ms", "p95_ms", "p99_ms")}
+        else:
+            continue
+        results["latency"][mode] = stats
+        print(f"{mode:<10} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+    print(f"\n{'mode':<10} {'clients':>8} {'QPS':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for mode in args.modes:
+        if mode not in async_searches:
+            continue
+        runs = results["throughput"][mode] = []
+        for concurrency in args.concurrency:
+            run = asyncio.run(measure_throughput(async_searches[mode], queries, args.k, concurrency))
+            runs.append(run)
+            print(f"{mode:<10} {concurrency:>8} {run['qps']:>9.1f} {run['p50_ms']:>9.2f} {run['p95_ms']:>9.2f} "
+                  f"{run['p99_ms']:>9.2f}")
+
+    results["stages"] = measure_stages(chain, queries, args.k)
+    print(f"\n{'stage':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<10} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f}")
+
+    results["memory"] = {
+        "rss_baseline_mb": rss_baseline,
+        "rss_loaded_mb": rss_loaded,
+        "rss_final_mb": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "index_estimate_mb": chain.memory_usage() / 2 ** 20,
+    }
+    print("\n" + ", ".join(f"{key} {value:.1f}" for key, value in results["memory"].items()))
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.max_regression)
+        if regressions:
+            print(f"Regressions beyond {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark: startup time of the MCP server.
+
+Starts mcp_server.py in a subprocess against a temporary index built with
+the hashing embedding backend (so no API key or network is needed) and
+measures:
+
+- time to port open: until the SSE port accepts TCP connections
+- time to ready: until a `search` tool call over SSE returns results
+  (calls answered with the warming-up status are retried)
+- the /ready endpoint, when the server has one: time of its first 200
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --index /tmp/bench-index --output startup.json
+
+The server binds port 8001, which must be free.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common import percentile
+
+ROOT = Path(__file__).resolve().parent.parent
+HOST, PORT = "127.0.0.1", 8001
+
+# Runs mcp_server.py as __main__ with its single corpus pointed at the benchmark index
+LAUNCHER = """
+import runpy, sys
+from pathlib import Path
+sys.path.insert(0, {root!r})
+import config
+directory = Path({index!r})
+config.DEFAULT_EMBEDDING_MODEL = "hashing"
+config.EMBEDDING_BACKEND_OPTIONS = {{"hashing": {{"dim": {dim}}}}}
+config.QUERY_EMBEDDING_CACHE_PATH = None
+config.RESULT_CACHE_BACKEND = None
+config.SERVER_PID_PATH = directory / "mcp_server.pid"
+config.CORPORA = {{"kbs": {{**config.CORPORA["kbs"], "db_dir": directory, "db_index_name": "bench",
+                           "keyword_index_name": "bench_bm25", "chunk_store_name": "bench_chunks",
+                           "manifest_name": "bench_manifest.json"}}}}
+runpy.run_path({server!r}, run_name="__main__")
+"""
+
+
+def port_open() -> bool:
+    try:
+        with socket.create_connection((HOST, PORT), timeout=0.1):
+            return True
+    except OSError:
+        return False
+
+
+def ready_endpoint() -> Optional[bool]:
+    """True/False for the /ready status, None if the server has no such endpoint."""
+    try:
+        with urllib.request.urlopen(f"http://{HOST}:{PORT}/ready", timeout=1):
+            return True
+    except urllib.error.HTTPError as e:
+        return False if e.code == 503 else None
+    except OSError:
+        return False
+
+
+async def search_ready(start: float, timeout: float) -> float:
+    """Call the search tool until it returns results; return the elapsed seconds."""
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
+    async with sse_client(f"http://{HOST}:{PORT}/sse", timeout=timeout, sse_read_timeout=timeout) as streams:
+        async with ClientSession(*streams) as session:
+            await session.initialize()
+            while time.perf_counter() - start < timeout:
+                result = await session.call_tool("search", {"query": "킹덤빌더스쿨", "top_k": 4})
+                text = result.content[0].text if result.content else ""
+                if "## Result" in text or "### Result" in text:
+                    return time.perf_counter() - start
+                await asyncio.sleep(0.05)
+    raise TimeoutError("The server did not become ready.")
+
+
+def measure(index: Path, dim: int, timeout: float) -> Dict[str, Optional[float]]:
+    launcher = LAUNCHER.format(root=str(ROOT), index=str(index), dim=dim, server=str(ROOT / "mcp_server.py"))
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", launcher], cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while not port_open():
+            if process.poll() is not None:
+                raise RuntimeError(f"The server exited with status {process.returncode}.")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("The port did not open.")
+            time.sleep(0.01)
+        port_seconds = time.perf_counter() - start
+
+        ready_seconds = None
+        status = ready_endpoint()
+        if status is not None:
+            while not ready_endpoint():
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError("/ready did not report ready.")
+                time.sleep(0.02)
+            ready_seconds = time.perf_counter() - start
+
+        search_seconds = asyncio.run(search_ready(start, timeout))
+        return {"port_open_s": port_seconds, "ready_endpoint_s": ready_seconds, "first_search_s": search_seconds}
+    finally:
+        # uvicorn waits for open SSE streams on SIGTERM
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--index", type=Path, help="Index directory reused between runs (built if empty)")
+    parser.add_argument("--dim", type=int, default=4096, help="Embedding dimension of the hashing backend")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if port_open():
+        sys.exit(f"Port {PORT} is already in use.")
+
+    index = args.index or Path(tempfile.mkdtemp(prefix="rag-startup-"))
+    if not (index / "bench_manifest.json").exists():
+        from bench_retrieval import build_index
+
+        index.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        build_index(index, args.dim)
+        print(f"Built the index in {time.perf_counter() - start:.1f}s: {index}")
+
+    runs: List[Dict[str, Optional[float]]] = []
+    for run in range(1, args.runs + 1):
+        runs.append(measure(index, args.dim, args.timeout))
+        print(f"run {run}: " + ", ".join(f"{name}={value:.2f}" for name, value in runs[-1].items()
+                                         if value is not None))
+
+    summary = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs if run[name] is not None]
+        if values:
+            summary[name] = {"p50": percentile(values, 50), "min": min(values), "max": max(values)}
+            print(f"{name:<18} p50 {summary[name]['p50']:.2f}s  min {summary[name]['min']:.2f}s  "
+                  f"max {summary[name]['max']:.2f}s")
+
+    if args.output:
+        args.output.write_text(json.dumps({"runs": runs, "summary": summary, "index": str(index),
+                                           "dim": args.dim}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Benchmark: throughput of the SSE and stateless streamable-HTTP transports
+with several server replicas behind a load balancer.
+
+Starts --replicas copies of mcp_server.py on consecutive ports against a
+temporary index built with the hashing embedding backend (no API key or
+network needed), puts a round-robin TCP proxy in front of them (a plain
+layer-4 load balancer without session affinity), and drives the `search`
+tool with concurrent MCP clients. For each transport and client count it
+reports QPS, latency p50 / p95 / p99 and the share of failed calls:
+
+- streamable-http: clients connect through the proxy to /mcp/. Every POST
+  is self-contained, so any replica can answer it.
+- sse, proxy: clients connect through the proxy to /sse. The message POSTs
+  reach whichever replica the proxy picks, and those that land on a replica
+  without the session fail (reported as errors).
+- sticky: every client connects straight to one replica, as a load
+  balancer with session affinity would do. This is the best SSE can do
+  with replicas; for streamable-http it shows the cost of the proxy hop
+  (the proxy runs in the benchmark process).
+
+With --session-per-call every tool call opens its own MCP session, the way
+langchain-mcp-adapters (app.py) calls tools; otherwise each client keeps
+one session open.
+
+Usage:
+    python benchmarks/bench_transport.py --replicas 2 --clients 1 4 16
+    python benchmarks/bench_transport.py --index /tmp/bench-index --session-per-call --output transport.json
+
+Replicas bind --base-port and the following ports, the proxy binds
+--proxy-port; all must be free. Replicas only add throughput with spare
+CPU cores: on a single core they split the same CPU time.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bench_startup import LAUNCHER, ROOT
+from common import percentile
+
+import config  # noqa: E402
+
+HOST = "127.0.0.1"
+TRANSPORTS = ("streamable-http", "sse")
+DEFAULT_QUERIES = ["킹덤빌더스쿨", "새벽기도 시간", "제자훈련 과정", "리더십 세미나 일정", "중보기도 모임"]
+
+
+def ready(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://{HOST}:{port}/ready", timeout=1):
+            return True
+    except (urllib.error.HTTPError, OSError):
+        return False
+
+
+def start_replicas(index: Path, dim: int, transport: str, ports: List[int], timeout: float) -> List[subprocess.Popen]:
+    launcher = LAUNCHER.format(root=str(ROOT), index=str(index), dim=dim, server=str(ROOT / "mcp_server.py"))
+    processes = [
+        subprocess.Popen([sys.executable, "-c", launcher, "--transport", transport, "--host", HOST, "--port", str(port)],
+                         cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    start = time.perf_counter()
+    try:
+        for process, port in zip(processes, ports):
+            while not ready(port):
+                if process.poll() is not None:
+                    raise RuntimeError(f"The replica on port {port} exited with status {process.returncode}.")
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"The replica on port {port} did not become ready.")
+                time.sleep(0.05)
+    except Exception:
+        stop_replicas(processes)
+        raise
+    return processes
+
+
+def stop_replicas(processes: List[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        # uvicorn waits for open SSE streams on SIGTERM
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class RoundRobinProxy:
+    """
+    TCP proxy that sends every new connection to the next backend port.
+    """
+
+    def __init__(self, port: int, backends: List[int]) -> None:
+        self.port = port
+        self.backends = itertools.cycle(backends)
+        self.connections: Dict[int, int] = {port: 0 for port in backends}
+        self.server: Optional[asyncio.base_events.Server] = None
+
+    async def __aenter__(self) -> "RoundRobinProxy":
+        self.server = await asyncio.start_server(self._handle, HOST, self.port)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.server.close()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        backend = next(self.backends)
+        self.connections[backend] += 1
+        try:
+            backend_reader, backend_writer = await asyncio.open_connection(HOST, backend)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(self._pipe(client_reader, backend_writer), self._pipe(backend_reader, client_writer))
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+def open_streams(transport: str, url: str, timeout: float) -> Any:
+    from mcp.client.sse import sse_client
+    from mcp.client.streamable_http import streamablehttp_client
+
+    if transport == "sse":
+        return sse_client(url, timeout=timeout, sse_read_timeout=timeout)
+    return streamablehttp_client(url, timeout=timeout, sse_read_timeout=timeout)
+
+
+async def call_search(session: Any, query: str, k: int) -> bool:
+    result = await session.call_tool("search", {"query": query, "top_k": k})
+    text = result.content[0].text if result.content else ""
+    return not result.isError and ("## Result" in text or "### Result" in text)
+
+
+async def run_client(transport: str, url: str, queries: List[str], k: int, timeout: float,
+                     session_per_call: bool, latencies: List[float]) -> int:
+    """Call the search tool for every query; return the number of failed calls."""
+    from mcp import ClientSession
+
+    async def session_calls(calls: List[str], latencies: List[float]) -> int:
+        errors = 0
+        async with open_streams(transport, url, timeout) as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                await asyncio.wait_for(session.initialize(), timeout)
+                for query in calls:
+                    start = time.perf_counter()
+                    try:
+                        if await asyncio.wait_for(call_search(session, query, k), timeout):
+                            latencies.append((time.perf_counter() - start) * 1000)
+                            continue
+                    except asyncio.TimeoutError:
+                        pass
+                    errors += 1
+        return errors
+
+    async def guarded(calls: List[str], latencies: List[float]) -> int:
+        # A session that cannot even be set up fails all of its calls
+        try:
+            return await session_calls(calls, latencies)
+        except Exception:
+            return len(calls)
+
+    if not session_per_call:
+        return await guarded(queries, latencies)
+    errors = 0
+    for query in queries:
+        start = time.perf_counter()
+        failed = await guarded([query], [])
+        if not failed:
+            # The call latency includes opening the session
+            latencies.append((time.perf_counter() - start) * 1000)
+        errors += failed
+    return errors
+
+
+async def measure(transport: str, urls: Callable[[int], str], queries: List[str], k: int, clients: int,
+                  timeout: float, session_per_call: bool) -> Dict[str, float]:
+    latencies: List[float] = []
+    per_client = [queries[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(run_client(transport, urls(i), calls, k, timeout, session_per_call, latencies)
+                                    for i, calls in enumerate(per_client)))
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "requests": len(queries),
+        "ok": len(latencies),
+        "error_rate": sum(errors) / len(queries),
+        "qps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def scenarios(transport: str, ports: List[int], proxy_port: int) -> List[Tuple[str, Callable[[int], str]]]:
+    path = "/sse" if transport == "sse" else "/mcp/"
+    return [("proxy", lambda i: f"http://{HOST}:{proxy_port}{path}"),
+            ("sticky", lambda i: f"http://{HOST}:{ports[i % len(ports)]}{path}")]
+
+
+async def run_transport(transport: str, ports: List[int], args: argparse.Namespace,
+                        queries: List[str]) -> List[Dict[str, Any]]:
+    results = []
+    async with RoundRobinProxy(args.proxy_port, ports) as proxy:
+        for routing, urls in scenarios(transport, ports, args.proxy_port):
+            # Warm up every replica once before measuring
+            await measure(transport, urls, queries[:len(ports)], args.k, len(ports), args.timeout, False)
+            for clients in args.clients:
+                result = await measure(transport, urls, queries, args.k, clients, args.timeout, args.session_per_call)
+                results.append({"transport": transport, "routing": routing, **result})
+                print(f"{transport:<16} {routing:<7} clients {clients:>3}  {result['qps']:7.1f} qps  "
+                      f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                      f"errors {result['error_rate']:.0%}")
+        print(f"{transport:<16} connections per replica: {proxy.connections}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="Tool calls per transport and client count")
+    parser.add_argument("--session-per-call", action="store_true", help="Open a new MCP session for every call")
+    parser.add_argument("--queries", type=Path, help="Query set: CSV with a 'question' column or one query per line")
+    parser.add_argument("--k", type=int, default=config.DEFAULT_TOP_K)
+    parser.add_argument("--index", type=Path, help="Index directory reused between runs (built if empty)")
+    parser.add_argument("--dim", type=int, default=4096, help="Embedding dimension of the hashing backend")
+    parser.add_argument("--base-port", type=int, default=8101, help="Port of the first replica")
+    parser.add_argument("--proxy-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds per call and per replica startup")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    args = parser.parse_args()
+    # Failed SSE message POSTs are expected through the proxy and counted as errors
+    logging.getLogger("mcp.client").setLevel(logging.CRITICAL)
+
+    index = args.index or Path(tempfile.mkdtemp(prefix="rag-transport-"))
+    if not (index / "bench_manifest.json").exists():
+        from bench_retrieval import build_index
+
+        index.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        build_index(index, args.dim)
+        print(f"Built the index in {time.perf_counter() - start:.1f}s: {index}")
+
+    if args.queries is not None:
+        from bench_retrieval import load_queries
+
+        queries = load_queries(args.queries, None, args.requests)
+    else:
+        queries = [DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)] for i in range(args.requests)]
+
+    ports = [args.base_port + i for i in range(args.replicas)]
+    results = []
+    for transport in args.transports:
+        processes = start_replicas(index, args.dim, transport, ports, args.timeout * 10)
+        try:
+            results.extend(asyncio.run(run_transport(transport, ports, args, queries)))
+        finally:
+            stop_replicas(processes)
+
+    if args.output:
+        args.output.write_text(json.dumps({"results": results, "replicas": args.replicas, "cpus": os.cpu_count(),
+                                           "session_per_call": args.session_per_call, "index": str(index),
+                                           "dim": args.dim}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
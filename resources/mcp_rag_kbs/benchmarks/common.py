@@ -0,0 +1,136 @@
+"""
+Shared helpers for the retrieval benchmarks.
+
+Benchmarks run fully offline: chunks come from the KBS parsing outputs,
+vectors are random, and the Upstage query model is replaced by an
+embedding stand-in that simulates the network round trip.
+"""
+
+import asyncio
+import glob
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from rag.base import PersistRetrievalChain  # noqa: E402
+
+
+def load_kbs_documents() -> List[Document]:
+    """Load every chunk of every KBS parsing output."""
+    docs = []
+    for pkl_file in sorted(glob.glob(str(Path(config.PARSING_OUTPUT_KBS_DIR).parent / "*" / "*.pkl"))):
+        with open(pkl_file, "rb") as f:
+            docs.extend(pickle.load(f))
+    return docs
+
+
+class LatencyEmbeddings(Embeddings):
+    """
+    Deterministic random embeddings that sleep like a remote embedding API.
+    """
+
+    def __init__(self, dim: int = 4096, latency: float = 0.05) -> None:
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(self.dim).astype(np.float32).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._vector(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await self.aembed_documents(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+
+class DelayedEmbeddings(Embeddings):
+    """
+    Wrap an embedding model and sleep before every call like a remote embedding API.
+    """
+
+    def __init__(self, embeddings: Embeddings, latency: float = 0.05) -> None:
+        self.embeddings = embeddings
+        self.latency = latency
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.latency)
+        return await self.embeddings.aembed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await self.aembed_documents(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        return await self.embeddings.aembed_documents(texts)
+
+
+class BenchmarkRetrievalChain(PersistRetrievalChain):
+    """PersistRetrievalChain over an in-memory FAISS index of random vectors."""
+
+    def __init__(self, embeddings: Embeddings, **kwargs) -> None:
+        kwargs.setdefault("persist_directory", tempfile.mkdtemp(prefix="rag-bench-"))
+        kwargs.setdefault("db_index_name", "bench")
+        super().__init__(**kwargs)
+        self.bench_embeddings = embeddings
+
+    def create_query_embedding(self) -> Embeddings:
+        return self.create_query_embedding_cache(self.bench_embeddings)
+
+    def create_vectorstore(self) -> FAISS:
+        dim = getattr(self.bench_embeddings, "dim", 4096)
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((len(self.split_docs), dim)).astype(np.float32)
+        return FAISS.from_embeddings(
+            text_embeddings=[(doc.page_content, vec) for doc, vec in zip(self.split_docs, vectors.tolist())],
+            embedding=self.embeddings,
+            metadatas=[doc.metadata for doc in self.split_docs],
+        )
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q)) if values else 0.0
@@ -0,0 +1,97 @@
+"""
+Stub of the Upstage (OpenAI compatible) embedding API for offline runs.
+
+Serves POST /embeddings with deterministic vectors derived from each input
+text, after a simulated latency. A fraction of requests can be answered
+with 429 (with a Retry-After header) or 500, to exercise retries.
+
+Usage:
+    python benchmarks/stub_embedding_server.py --port 8090 --latency 0.2 --rate-limit 0.1
+    UPSTAGE_API_KEY=stub python index_tools.py build --base-url http://127.0.0.1:8090
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def stub_embedding(text: str, dim: int) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def create_handler(args: argparse.Namespace) -> type:
+    lock = threading.Lock()
+    counters = {"requests": 0, "inputs": 0, "rate_limited": 0, "failed": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            time.sleep(args.latency)
+
+            roll = random.random()
+            with lock:
+                counters["requests"] += 1
+                if roll < args.rate_limit:
+                    counters["rate_limited"] += 1
+                elif roll < args.rate_limit + args.fail:
+                    counters["failed"] += 1
+                else:
+                    counters["inputs"] += len(inputs)
+                if counters["requests"] % 100 == 0:
+                    print(counters, flush=True)
+
+            if roll < args.rate_limit:
+                self.reply(429, {"error": {"message": "Rate limit exceeded"}}, {"Retry-After": str(args.retry_after)})
+                return
+            if roll < args.rate_limit + args.fail:
+                self.reply(500, {"error": {"message": "Internal server error"}})
+                return
+            data = [{"object": "embedding", "index": i, "embedding": stub_embedding(text, args.dim)}
+                    for i, text in enumerate(inputs)]
+            tokens = sum(len(text) for text in inputs)
+            self.reply(200, {"object": "list", "data": data, "model": body.get("model"),
+                             "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+        def reply(self, status: int, payload: dict, headers: dict = None) -> None:
+            encoded = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 responses, in seconds")
+    parser.add_argument("--fail", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), create_handler(args))
+    print(f"Stub embedding server on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
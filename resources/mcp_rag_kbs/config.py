@@ -3,13 +3,147 @@ from pathlib import Path
 # Path settings
 DB_DIR = Path(__file__).parent / "db"
 DB_INDEX_NAME = "kbs_faiss_db"
+KEYWORD_INDEX_NAME = "kbs_faiss_db_bm25"
+CHUNK_STORE_NAME = "kbs_faiss_db_chunks"
+
+# "pickle": load FAISS with its pickled docstore
+# "mmap": memory map the FAISS index and read chunks lazily from the chunk store
+#         (create it with `python index_tools.py chunk-store`)
+VECTORSTORE_MODE = "pickle"
+
+# Vector index: "flat" (exact), "hnsw", "ivf_flat" or quantized "fp16", "sq8", "pq", "ivf_pq"
+# (build the other variants with `python index_tools.py build-ann --type <type>`)
+INDEX_TYPE = "flat"
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+IVF_NLIST = None  # None: about 4 * sqrt(number of chunks)
+IVF_NPROBE = 8
+PQ_M = 64  # PQ bytes per vector, must divide the embedding dimension (4096)
+RERANK_FACTOR = 4  # quantized variants: re-rank k * factor candidates with exact vectors, 0 disables
+
+# Index versions: DB_DIR/versions/<name> with DB_DIR/CURRENT naming the active one
+# (created by `python index_tools.py ingest` / `publish`); a running server switches with `index_tools.py reload`
+INDEX_VERSIONS_KEEP = 3
+SERVER_PID_PATH = DB_DIR / "mcp_server.pid"  # replicas on other ports write mcp_server.<port>.pid
+
+# MCP transport of `python mcp_server.py` (override with --transport):
+# "sse": one long-lived connection per client, pinned to one server process (http://<host>:8001/sse)
+# "streamable-http": stateless HTTP, every tool call is an independent POST that any worker or replica
+#                    behind a load balancer can answer (http://<host>:8001/mcp/)
+SERVER_TRANSPORT = "sse"
+# streamable-http: worker processes accepting connections on one shared port (override with --workers),
+# about one per core. With more than one worker every corpus is opened in "mmap" mode whatever
+# VECTORSTORE_MODE says, so the workers share the FAISS index, chunk store and keyword index through
+# the page cache instead of each loading a copy (create the chunk store with `index_tools.py chunk-store`).
+# `index_tools.py reload` restarts the workers one at a time on the active index version.
+# Each worker keeps its own metrics and "memory" result cache; use RESULT_CACHE_BACKEND "sqlite" to share it.
+SERVER_WORKERS = 1
+# streamable-http: answer with a plain JSON body instead of a one-event SSE stream
+STREAMABLE_HTTP_JSON_RESPONSE = True
+
+# Prometheus metrics (stage timings, cache hit rates, in-flight requests, result sizes),
+# served by the MCP server next to the SSE endpoint, e.g. http://localhost:8001/metrics
+METRICS_PATH = "/metrics"
+
+# Startup: the server opens its port right away and initializes the retrieval chain in the background.
+# Until then searches are refused with a warming-up status; READY_PATH answers 503 while warming
+# and 200 once ready, HEALTH_PATH always 200. WARMUP_CORPORA load before the server reports ready,
+# the other corpora on their first query.
+HEALTH_PATH = "/health"
+READY_PATH = "/ready"
+WARMUP_CORPORA = ["kbs"]
+
+# Incremental ingestion: every subdirectory of PARSING_OUTPUT_KBS_ROOT is a parsing output directory
+# (`python index_tools.py ingest`); the manifest records the indexed sources and removed rows
+PARSING_OUTPUT_KBS_ROOT = Path(__file__).parent / "parsing_outputs/kbs"
+INGEST_MANIFEST_NAME = "kbs_faiss_db_manifest.json"
+# Near-duplicate chunks (estimated Jaccard similarity of their character shingles at least DEDUP_THRESHOLD)
+# are collapsed into their first occurrence by `build` and `ingest`, so the overlapping parsing outputs
+# are embedded and indexed once; the kept chunk lists the other sources. None turns it off.
+DEDUP_THRESHOLD = 0.9
 
 # PARSING_OUTPUT_KBS_DIR = Path(__file__).parent / "parsing_outputs/kbs/4a414ed1-67ae-49f6-acf5-a92ad7a3c206"
 PARSING_OUTPUT_KBS_DIR = Path(__file__).parent / "parsing_outputs/kbs/8bd71afa-3ed8-450e-a8ef-9f609a403daf"
 
+# Corpora hosted by the server, selected with the `corpus` parameter of the search tools.
+# Each corpus has its own index directory, index names and parsing output directory; any other
+# KBSRetrievalChain argument (e.g. "vectorstore_mode", "index_type") overrides the settings below.
+# Corpora load on their first query and share one query embedding client and cache.
+CORPORA = {
+    "kbs": {
+        "description": "킹덤빌더스쿨(KBS) 자료",
+        "db_dir": DB_DIR,
+        "db_index_name": DB_INDEX_NAME,
+        "keyword_index_name": KEYWORD_INDEX_NAME,
+        "chunk_store_name": CHUNK_STORE_NAME,
+        "manifest_name": INGEST_MANIFEST_NAME,
+        "parsing_output_dir": PARSING_OUTPUT_KBS_DIR,
+        "parsing_output_root": PARSING_OUTPUT_KBS_ROOT,
+    },
+    # "help-center": {
+    #     "description": "TBB 헬프 센터",
+    #     "db_dir": Path(__file__).parent / "db/help_center",
+    #     "db_index_name": "help_center_faiss_db",
+    #     "keyword_index_name": "help_center_faiss_db_bm25",
+    #     "chunk_store_name": "help_center_faiss_db_chunks",
+    #     "manifest_name": "help_center_faiss_db_manifest.json",
+    #     "parsing_output_dir": Path(__file__).parent / "parsing_outputs/help_center",
+    #     "parsing_output_root": Path(__file__).parent / "parsing_outputs/help_center",
+    # },
+}
+DEFAULT_CORPUS = "kbs"
+# Estimated memory the loaded corpora may use; least recently used corpora are unloaded beyond it
+# (None: never unload)
+CORPUS_MEMORY_BUDGET_MB = 4096
+# Seconds a search waits for its corpus to load (first query, or again after eviction) before answering
+# that it is loading; the load continues in the background. None waits until it finishes.
+CORPUS_LOAD_WAIT = 30
+
 # Default settings
 # DEFAULT_CHUNK_SIZE = 1000
 # DEFAULT_CHUNK_OVERLAP = 50
 DEFAULT_TOP_K = 4
+# Search tool output: "markdown" or "json" (compact), and the default size budget of a response
+# (None: full chunks). With a budget each chunk is trimmed to the passage matching the query;
+# callers can pass max_chars / max_tokens per call. Tokens are counted with the tiktoken encoding
+# (estimated when it cannot be loaded).
+SEARCH_OUTPUT_FORMAT = "markdown"
+SEARCH_MAX_CHARS = None
+SEARCH_MAX_TOKENS = None
+SEARCH_TOKEN_ENCODING = "o200k_base"
+# Embedding backend (rag.embeddings.EMBEDDING_BACKENDS): "upstage", "openai", or "hashing",
+# a deterministic local backend for offline runs and benchmarks. Indexes must be built with the same backend.
 DEFAULT_EMBEDDING_MODEL = "upstage"
-DEFAULT_LLM_MODEL = "gpt-4.1-mini"
\ No newline at end of file
+EMBEDDING_BACKEND_OPTIONS = {
+    "hashing": {"dim": 4096, "batch_size": 256, "num_threads": 1},
+}
+DEFAULT_LLM_MODEL = "gpt-4.1-mini"
+
+# Hybrid search settings
+HYBRID_FUSION = "rrf"  # "rrf" or "minmax"
+HYBRID_WEIGHTS = [0.5, 0.5]  # keyword, semantic
+HYBRID_FETCH_K = 20
+# Maximal marginal relevance: re-rank the top MMR_FETCH_K candidates to drop near-duplicate chunks.
+# MMR_LAMBDA between 0 (diversity only) and 1 (relevance only); None turns it off.
+# The search tools can override both per call (mmr_lambda, mmr_fetch_k).
+MMR_LAMBDA = None
+MMR_FETCH_K = 20
+# Chunk metadata indexed at load for filtered search (the `source` and `pages` parameters of the
+# search tools): filters select the matching chunks before BM25 scoring and FAISS search
+# instead of filtering an over-fetched result list. () turns filtering off.
+METADATA_FILTER_FIELDS = ("source", "page", "images")
+
+# Threads running CPU-bound search work for async search
+SEARCH_WORKERS = 4
+
+# Query embedding cache settings
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # in-memory LRU entries, 0 disables it
+QUERY_EMBEDDING_CACHE_PATH = DB_DIR / "query_embedding_cache.sqlite3"  # None disables the disk tier
+QUERY_EMBEDDING_CACHE_DISK_SIZE = 100_000
+
+# Search result cache settings
+RESULT_CACHE_BACKEND = "memory"  # "memory", "sqlite" (shared by worker processes) or None
+RESULT_CACHE_SIZE = 4096
+RESULT_CACHE_TTL = 3600  # seconds
+RESULT_CACHE_PATH = DB_DIR / "search_result_cache.sqlite3"
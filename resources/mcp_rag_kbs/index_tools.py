@@ -0,0 +1,333 @@
+"""
+Offline maintenance commands for the KBS retrieval indexes.
+
+Usage:
+    python index_tools.py chunk-store    # export the pickled FAISS docstore to a chunk store
+    python index_tools.py convert-parsing-outputs    # convert *.pkl parsing outputs to *.parquet chunk files
+    python index_tools.py build-ann --type hnsw    # build an approximate or quantized index variant
+    python index_tools.py build    # embed all parsing outputs into a new vector store (resumable)
+    python index_tools.py ingest    # incrementally index new, changed and removed parsing outputs
+    python index_tools.py publish    # snapshot the active index as a new version and activate it
+    python index_tools.py reload    # make the running MCP server swap to the active index version
+    python index_tools.py versions    # list index versions
+
+Commands operating on index files use the active index version of --db-dir.
+--corpus selects one of the corpora of config.CORPORA (default: config.DEFAULT_CORPUS),
+which provides the defaults of --db-dir, --index-name and the parsing output directories.
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+import config
+from rag import KBSRetrievalChain
+from rag.ann import INDEX_TYPES, QUANTIZED_INDEX_TYPES, build_index, index_variant_path, read_vectors, vectors_path
+from rag.dedup import MinHashDeduplicator, format_dedup_stats
+from rag.embedding_builder import EmbeddingBuilder
+from rag.embeddings import EMBEDDING_BACKENDS, create_embeddings
+from rag.ingest import discover_sources
+from rag.parsing_outputs import convert_pickle_outputs
+from rag.versions import (
+    VERSIONS_DIR,
+    activate_version,
+    create_version,
+    current_index_directory,
+    current_version,
+    list_versions,
+    prune_versions,
+)
+
+
+def export_chunk_store(args: argparse.Namespace) -> None:
+    """
+    Convert the pickled FAISS docstore to a memory mappable chunk store.
+    """
+    chain = KBSRetrievalChain(
+        persist_directory=str(current_index_directory(args.db_dir)),
+        db_index_name=args.index_name,
+        chunk_store_name=args.chunk_store_name,
+    )
+    store = chain.export_chunk_store()
+    print(f"✅ {len(store)}개의 청크를 {store.path} 에 저장했습니다.")
+
+
+def convert_parsing_outputs(args: argparse.Namespace) -> None:
+    """
+    Convert pickled parsing outputs to streaming-friendly Parquet chunk files.
+    """
+    for directory in args.dirs:
+        written = convert_pickle_outputs(directory, overwrite=args.overwrite)
+        for path in written:
+            print(f"✅ {path}")
+        if not written:
+            print(f"변환할 .pkl 파일이 없습니다: {directory}")
+
+
+def build_ann(args: argparse.Namespace) -> None:
+    """
+    Build an HNSW, IVF or quantized variant next to the flat FAISS index.
+    
+    The variant holds the same vectors in the same order, so it shares the
+    docstore of the flat index. Quantized variants also get the exact
+    vectors as a .npy file for re-ranking.
+    """
+    persist_directory = current_index_directory(args.db_dir)
+    flat_path = index_variant_path(persist_directory, args.index_name, "flat")
+    if args.vectors:
+        vectors = np.load(args.vectors)
+        metric = faiss.METRIC_INNER_PRODUCT if args.metric == "ip" else faiss.METRIC_L2
+    else:
+        if not flat_path.exists():
+            raise ValueError(f"FAISS index not found: {flat_path}")
+        flat_index = faiss.read_index(str(flat_path))
+        vectors = read_vectors(flat_index)
+        metric = flat_index.metric_type
+
+    print(f"{args.type} 인덱스를 생성합니다: {vectors.shape[0]}개 벡터, {vectors.shape[1]}차원")
+    start = time.perf_counter()
+    index = build_index(
+        vectors,
+        args.type,
+        metric=metric,
+        hnsw_m=args.hnsw_m,
+        hnsw_ef_construction=args.hnsw_ef_construction,
+        ivf_nlist=args.ivf_nlist,
+        pq_m=args.pq_m,
+    )
+
+    path = index_variant_path(persist_directory, args.index_name, args.type)
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, path)
+    print(f"✅ {path} ({time.perf_counter() - start:.1f}초, {path.stat().st_size / 2 ** 20:.1f}MB)")
+
+    if args.type in QUANTIZED_INDEX_TYPES:
+        exact_path = vectors_path(persist_directory, args.index_name)
+        tmp_path = exact_path.with_name(f"{exact_path.name}.tmp-{os.getpid()}.npy")
+        np.save(tmp_path, np.ascontiguousarray(vectors, dtype=np.float32))
+        os.replace(tmp_path, exact_path)
+        print(f"✅ {exact_path} (re-ranking vectors)")
+
+
+def build(args: argparse.Namespace) -> None:
+    """
+    Embed every chunk of the parsing outputs into a new vector store, published as a new index version.
+
+    Batches are embedded concurrently and checkpointed in <db-dir>/<index-name>.checkpoint;
+    running the command again after a crash resumes with the missing batches.
+    Near-duplicate chunks are collapsed before embedding (--dedup-threshold, 0 disables it).
+    """
+    settings = config.CORPORA[args.corpus]
+    root = Path(settings["parsing_output_root"])
+    dirs = args.dirs or sorted(path for path in root.iterdir() if path.is_dir())
+    sources = discover_sources(dirs)
+    if not sources:
+        print(f"❌ 파싱 결과를 찾을 수 없습니다: {', '.join(str(d) for d in dirs)}")
+        return
+
+    options = dict(config.EMBEDDING_BACKEND_OPTIONS.get(args.embedding_model, {}))
+    if args.embedding_model == "upstage":
+        # 재시도는 EmbeddingBuilder가 backoff로 처리
+        options.update(embed_batch_size=args.batch_size, max_retries=0)
+    if args.base_url:
+        options["base_url"] = args.base_url
+    embeddings = create_embeddings(args.embedding_model, "passage", **options)
+    builder = EmbeddingBuilder(
+        embeddings,
+        Path(args.db_dir) / f"{args.index_name}.checkpoint",
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        deduplicator=MinHashDeduplicator(args.dedup_threshold) if args.dedup_threshold else None,
+    )
+    done = builder.open_checkpoint(sources, restart=args.restart)
+    duplicates = builder.duplicate_stats(sources)
+    if duplicates is not None:
+        print(f"🧹 {format_dedup_stats(duplicates)}")
+    print(f"📄 소스 {len(sources)}개 임베딩 시작 (완료된 배치 {done}개에서 재개)")
+    start = time.perf_counter()
+    stats = builder.embed(sources)
+    print(
+        f"✅ 배치 {stats['embedded_batches']}개 임베딩 (청크 {stats['embedded_chunks']}개, "
+        f"재개 {stats['resumed_batches']}개, 재시도 {stats['retries']}회, {time.perf_counter() - start:.1f}초)"
+    )
+
+    persist_directory = create_version(args.db_dir, empty=True)
+    chain = KBSRetrievalChain(
+        persist_directory=str(persist_directory),
+        db_index_name=args.index_name,
+        keyword_index_name=settings.get("keyword_index_name"),
+        chunk_store_name=settings.get("chunk_store_name"),
+        manifest_name=settings.get("manifest_name"),
+    )
+    written = builder.write(chain, sources)
+    builder.clear_checkpoint()
+    print(f"✅ 소스 {written['sources']}개, 청크 {written['chunks']}개를 {persist_directory} 에 저장했습니다.")
+    publish_version(args, persist_directory.name)
+
+
+def ingest(args: argparse.Namespace) -> None:
+    """
+    Embed and index only the parsing outputs that changed since the last ingest.
+
+    The update is written to a new index version (a hard linked copy of the
+    active one, or of the unversioned DB_DIR on the first ingest), which is
+    activated only if something changed. A crash mid-ingest therefore
+    leaves the active index untouched.
+    """
+    settings = config.CORPORA[args.corpus]
+    root = Path(settings["parsing_output_root"])
+    dirs = args.dirs or sorted(path for path in root.iterdir() if path.is_dir())
+    persist_directory = create_version(args.db_dir)
+
+    chain = KBSRetrievalChain(
+        persist_directory=str(persist_directory),
+        db_index_name=args.index_name,
+        keyword_index_name=settings.get("keyword_index_name"),
+        chunk_store_name=settings.get("chunk_store_name"),
+        manifest_name=settings.get("manifest_name"),
+        embedding_backend=config.DEFAULT_EMBEDDING_MODEL,
+        embedding_options=config.EMBEDDING_BACKEND_OPTIONS.get(config.DEFAULT_EMBEDDING_MODEL, {}),
+        dedup_threshold=args.dedup_threshold,
+    )
+    stats = chain.ingest(dirs)
+    print(
+        f"✅ 추가 {stats['added']}, 변경 {stats['updated']}, 삭제 {stats['removed']}, "
+        f"기존 색인 {stats['adopted']}, 변경 없음 {stats['unchanged']} "
+        f"(임베딩 {stats['embedded_chunks']}개, 삭제 표시 {stats['tombstoned_chunks']}개, "
+        f"중복 {stats['duplicate_chunks']}개 청크)"
+    )
+
+    if not any(stats[key] for key in ("added", "updated", "removed", "adopted")):
+        shutil.rmtree(persist_directory)
+        print("변경 사항이 없어 새 인덱스 버전을 만들지 않았습니다.")
+        return
+    publish_version(args, persist_directory.name)
+
+
+def publish(args: argparse.Namespace) -> None:
+    """
+    Snapshot the active index (or the unversioned DB_DIR) as a new version and activate it.
+    """
+    persist_directory = create_version(args.db_dir)
+    publish_version(args, persist_directory.name)
+
+
+def publish_version(args: argparse.Namespace, name: str) -> None:
+    activate_version(args.db_dir, name)
+    print(f"✅ 활성 인덱스 버전: {name}")
+    for removed in prune_versions(args.db_dir, keep=config.INDEX_VERSIONS_KEEP):
+        print(f"🗑️ 오래된 인덱스 버전 삭제: {removed}")
+    if args.reload:
+        reload_server(args)
+
+
+def reload_server(args: argparse.Namespace) -> None:
+    """
+    Signal the running MCP servers (every replica with a PID file) to load the active index version.
+    """
+    pid_path = Path(config.SERVER_PID_PATH)
+    pid_paths = sorted(pid_path.parent.glob(f"{pid_path.stem}*{pid_path.suffix}"))
+    if not pid_paths:
+        print(f"❌ 실행 중인 서버를 찾을 수 없습니다: {pid_path}")
+        return
+    for path in pid_paths:
+        pid = int(path.read_text().strip())
+        try:
+            os.kill(pid, signal.SIGHUP)
+        except ProcessLookupError:
+            print(f"❌ 서버 프로세스가 없습니다: {pid} ({path.name})")
+            continue
+        print(f"🔄 서버({pid})에 다시 로드 신호를 보냈습니다.")
+
+
+def show_versions(args: argparse.Namespace) -> None:
+    """
+    List the index versions, marking the active one.
+    """
+    active = current_version(args.db_dir)
+    versions = list_versions(args.db_dir)
+    if not versions:
+        print(f"버전 관리되지 않는 인덱스입니다: {args.db_dir} (`publish` 로 시작)")
+    for name in versions:
+        marker = "*" if name == active else " "
+        print(f"{marker} {name}  {Path(args.db_dir) / VERSIONS_DIR / name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=list(config.CORPORA), default=config.DEFAULT_CORPUS)
+    parser.add_argument("--db-dir", type=Path, help="Index root directory (default: the corpus db_dir)")
+    parser.add_argument("--index-name", help="Index name (default: the corpus db_index_name)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chunk_store = subparsers.add_parser("chunk-store", help="Export the FAISS docstore to a chunk store")
+    chunk_store.add_argument("--chunk-store-name", help="Default: the corpus chunk_store_name")
+    chunk_store.set_defaults(func=export_chunk_store)
+
+    convert = subparsers.add_parser("convert-parsing-outputs", help="Convert *.pkl parsing outputs to chunk files")
+    convert.add_argument("dirs", type=Path, nargs="*", help="Default: the corpus parsing_output_dir")
+    convert.add_argument("--overwrite", action="store_true")
+    convert.set_defaults(func=convert_parsing_outputs)
+
+    ann = subparsers.add_parser("build-ann", help="Build an approximate (HNSW / IVF) or quantized (fp16 / SQ8 / PQ) index variant")
+    ann.add_argument("--type", choices=[t for t in INDEX_TYPES if t != "flat"], default="hnsw")
+    ann.add_argument("--vectors", type=Path, help="Build from a .npy vector file instead of the flat index")
+    ann.add_argument("--metric", choices=["l2", "ip"], default="l2", help="Metric of --vectors")
+    ann.add_argument("--hnsw-m", type=int, default=config.HNSW_M)
+    ann.add_argument("--hnsw-ef-construction", type=int, default=config.HNSW_EF_CONSTRUCTION)
+    ann.add_argument("--ivf-nlist", type=int, default=config.IVF_NLIST)
+    ann.add_argument("--pq-m", type=int, default=config.PQ_M)
+    ann.set_defaults(func=build_ann)
+
+    build_parser = subparsers.add_parser("build", help="Embed all parsing outputs into a new vector store (resumable)")
+    build_parser.add_argument("dirs", type=Path, nargs="*", help="Parsing output directories (default: all)")
+    build_parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding request (max 100)")
+    build_parser.add_argument("--concurrency", type=int, default=4, help="Embedding requests in flight")
+    build_parser.add_argument("--max-retries", type=int, default=8, help="Retries per batch on rate limits and errors")
+    build_parser.add_argument("--embedding-model", choices=list(EMBEDDING_BACKENDS), default=config.DEFAULT_EMBEDDING_MODEL,
+                              help="Embedding backend")
+    build_parser.add_argument("--base-url", help="Embedding API base URL, e.g. a local stub server")
+    build_parser.add_argument("--restart", action="store_true", help="Discard the checkpoint of an earlier build")
+    build_parser.add_argument("--dedup-threshold", type=float, default=config.DEDUP_THRESHOLD,
+                              help="Collapse near-duplicate chunks at this Jaccard similarity (0: keep all)")
+    build_parser.add_argument("--reload", action="store_true", help="Reload the running server afterwards")
+    build_parser.set_defaults(func=build)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Incrementally index new or changed parsing outputs")
+    ingest_parser.add_argument("dirs", type=Path, nargs="*", help="Parsing output directories (default: all)")
+    ingest_parser.add_argument("--dedup-threshold", type=float, default=config.DEDUP_THRESHOLD,
+                               help="Collapse near-duplicate chunks at this Jaccard similarity (0: keep all)")
+    ingest_parser.add_argument("--reload", action="store_true", help="Reload the running server afterwards")
+    ingest_parser.set_defaults(func=ingest)
+
+    publish_parser = subparsers.add_parser("publish", help="Snapshot the active index as a new version and activate it")
+    publish_parser.add_argument("--reload", action="store_true", help="Reload the running server afterwards")
+    publish_parser.set_defaults(func=publish)
+
+    reload_parser = subparsers.add_parser("reload", help="Make the running server load the active index version")
+    reload_parser.set_defaults(func=reload_server)
+
+    versions_parser = subparsers.add_parser("versions", help="List index versions")
+    versions_parser.set_defaults(func=show_versions)
+
+    args = parser.parse_args()
+    settings = config.CORPORA[args.corpus]
+    args.db_dir = args.db_dir or Path(settings["db_dir"])
+    args.index_name = args.index_name or settings["db_index_name"]
+    if args.command == "chunk-store":
+        args.chunk_store_name = args.chunk_store_name or settings.get("chunk_store_name")
+    if args.command == "convert-parsing-outputs":
+        args.dirs = args.dirs or [Path(settings["parsing_output_dir"])]
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,37 @@
+import argparse
 import os
+import signal
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 from dotenv import load_dotenv
-from langchain_core.documents import Document
 from mcp.server.fastmcp import FastMCP
-from rag import KBSRetrievalChain
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from rag.corpora import CorpusLoading
+from rag.metrics import metrics_response, observe_result, stage_timer, track_request
+from rag.startup import ServerNotReady, Startup
 import config
 import glob
 import pickle
-from langchain_teddynote import logging
+
+# langchain, faiss 등 무거운 모듈은 서버 시작 후 백그라운드 초기화(startup)에서 import
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from rag import KBSRetrievalChain
 
 load_dotenv()
-DB_DIR = Path(config.DB_DIR)
-PARSING_OUTPUT_DIR = Path(config.PARSING_OUTPUT_KBS_DIR)
 
-logging.langsmith(project_name="htm-mcp-server")
+# --workers 로 실행한 워커 프로세스는 이 모듈을 새로 import 하므로 워커 수를 환경 변수로 전달
+WORKERS_ENV = "MCP_SERVER_WORKERS"
+server_workers = int(os.environ.get(WORKERS_ENV, "1"))
+
+def setup_tracing():
+    """
+    LangSmith 추적 설정
+    """
+    from langchain_teddynote import logging
+    logging.langsmith(project_name="htm-mcp-server")
 
 def load_documents_from_pkl(filepath):
     """
@@ -34,37 +51,188 @@ def load_documents_from_pkl(filepath):
         documents = pickle.load(f)
     return documents
 
-# load documentts from parsing_outputs
-pkl_files = glob.glob(str(PARSING_OUTPUT_DIR / "*.pkl"))
+# 검색 체인에 기본으로 전달하는 설정 (코퍼스 설정으로 덮어쓸 수 있음)
+CHAIN_SETTINGS = dict(
+    embedding_backend = config.DEFAULT_EMBEDDING_MODEL,
+    embedding_options = config.EMBEDDING_BACKEND_OPTIONS.get(config.DEFAULT_EMBEDDING_MODEL, {}),
+    vectorstore_mode = config.VECTORSTORE_MODE,
+    index_type = config.INDEX_TYPE,
+    ef_search = config.HNSW_EF_SEARCH,
+    nprobe = config.IVF_NPROBE,
+    rerank_factor = config.RERANK_FACTOR,
+    k = config.DEFAULT_TOP_K,
+    hybrid_fusion = config.HYBRID_FUSION,
+    hybrid_weights = config.HYBRID_WEIGHTS,
+    hybrid_fetch_k = config.HYBRID_FETCH_K,
+    mmr_lambda = config.MMR_LAMBDA,
+    mmr_fetch_k = config.MMR_FETCH_K,
+    filter_fields = config.METADATA_FILTER_FIELDS,
+    search_workers = config.SEARCH_WORKERS,
+    result_cache_backend = config.RESULT_CACHE_BACKEND,
+    result_cache_size = config.RESULT_CACHE_SIZE,
+    result_cache_ttl = config.RESULT_CACHE_TTL,
+    result_cache_path = config.RESULT_CACHE_PATH,
+)
+# 검색 체인 인자가 아닌 코퍼스 설정
+CORPUS_ONLY_SETTINGS = ("description", "db_dir", "parsing_output_dir", "parsing_output_root")
+
+def corpus_vectorstore_mode(corpus: str) -> str:
+    """
+    코퍼스의 벡터 저장소 모드 (워커가 여럿이면 인덱스를 페이지 캐시로 공유하도록 항상 mmap)
+    """
+    if server_workers > 1:
+        return "mmap"
+    return config.CORPORA[corpus].get("vectorstore_mode", config.VECTORSTORE_MODE)
+
+def load_corpus_documents(corpus: str, persist_directory: Path):
+    """
+    코퍼스의 파싱 결과(parsing_outputs)에서 문서를 불러오는 함수
+
+    Args:
+        corpus: 코퍼스 이름
+        persist_directory: 활성 인덱스 버전 디렉토리
+    Returns:
+        Langchain Document 객체 리스트, 파싱 결과가 필요 없으면 None
+    """
+    from rag.parsing_outputs import find_chunk_files, iter_chunks
 
-if not pkl_files:
-    print("❌ PARSING_OUTPUT_DIR에서 .pkl 파일을 찾을 수 없습니다.")
-else:
-    # 모든 .pkl 파일에서 문서 로드
-    all_documents = []
-    for pkl_file in pkl_files:
-        print(f"📄 {pkl_file} 파일 로드 중...")  # 한국어 코멘트
-        documents = load_documents_from_pkl(pkl_file)
-        all_documents.extend(documents)
+    settings = config.CORPORA[corpus]
+    parsing_output_dir = Path(settings["parsing_output_dir"])
+    manifest_name = settings.get("manifest_name")
 
-    print(f"✅ 총 {len(all_documents)}개의 문서가 로드되었습니다.")
+    if corpus_vectorstore_mode(corpus) == "mmap":
+        # mmap 모드에서는 청크 저장소에서 필요한 청크만 읽으므로 pkl 파일을 로드하지 않음
+        print(f"✅ [{corpus}] mmap 모드: 청크 저장소를 사용합니다.")
+        return None
+    if manifest_name and (persist_directory / manifest_name).exists():
+        # 증분 인덱싱된 벡터 저장소는 저장된 청크를 그대로 사용하므로 파싱 결과를 로드하지 않음
+        print(f"✅ [{corpus}] 증분 인덱스: 벡터 저장소의 청크를 사용합니다.")
+        return None
 
-rag_chain = KBSRetrievalChain(
-    persist_directory = str(DB_DIR),
-    db_index_name = config.DB_INDEX_NAME,
-    k = config.DEFAULT_TOP_K,
-    split_docs = all_documents,
-).initialize()
+    chunk_files = find_chunk_files(parsing_output_dir)
+    pkl_files = glob.glob(str(parsing_output_dir / "*.pkl"))
+
+    if chunk_files:
+        # 청크 파일(.parquet)을 배치 단위로 스트리밍하여 로드 (pickle 역직렬화 없음)
+        print(f"📄 [{corpus}] 청크 파일 {len(chunk_files)}개 로드 중...")
+        all_documents = list(iter_chunks(chunk_files))
+    elif not pkl_files:
+        print(f"❌ [{corpus}] {parsing_output_dir}에서 .pkl 파일을 찾을 수 없습니다.")
+        return None
+    else:
+        # 모든 .pkl 파일에서 문서 로드
+        all_documents = []
+        for pkl_file in pkl_files:
+            print(f"📄 {pkl_file} 파일 로드 중...")  # 한국어 코멘트
+            documents = load_documents_from_pkl(pkl_file)
+            all_documents.extend(documents)
+
+    print(f"✅ [{corpus}] 총 {len(all_documents)}개의 문서가 로드되었습니다.")
+    return all_documents
+
+def create_query_embedding():
+    """
+    모든 코퍼스가 공유하는 쿼리 임베딩 클라이언트와 캐시를 생성하는 함수
+    """
+    from rag import KBSRetrievalChain
+
+    return KBSRetrievalChain(
+        embedding_backend = CHAIN_SETTINGS["embedding_backend"],
+        embedding_options = CHAIN_SETTINGS["embedding_options"],
+        query_cache_size = config.QUERY_EMBEDDING_CACHE_SIZE,
+        query_cache_path = config.QUERY_EMBEDDING_CACHE_PATH,
+        query_cache_disk_size = config.QUERY_EMBEDDING_CACHE_DISK_SIZE,
+    ).create_query_embedding()
+
+# 백그라운드 초기화에서 생성
+query_embeddings = None
+corpus_registry = None
+
+def create_rag_chain(corpus: str, persist_directory: Path) -> "KBSRetrievalChain":
+    """
+    코퍼스의 인덱스 디렉토리에서 검색 체인을 생성하고 초기화하는 함수
+
+    Args:
+        corpus: 코퍼스 이름
+        persist_directory: 활성 인덱스 버전 디렉토리
+    Returns:
+        초기화된 KBSRetrievalChain
+    """
+    from rag import KBSRetrievalChain
+
+    settings = config.CORPORA[corpus]
+    chain_settings = {**CHAIN_SETTINGS, **{
+        key: value for key, value in settings.items() if key not in CORPUS_ONLY_SETTINGS
+    }}
+    chain_settings["vectorstore_mode"] = corpus_vectorstore_mode(corpus)
+    return KBSRetrievalChain(
+        persist_directory = str(persist_directory),
+        query_embeddings = query_embeddings,
+        split_docs = load_corpus_documents(corpus, Path(persist_directory)),
+        **chain_settings,
+    ).initialize()
+
+def load_query_embedding():
+    """
+    공유 쿼리 임베딩 생성 (검색 체인 모듈 import 포함)
+    """
+    global query_embeddings
+    query_embeddings = create_query_embedding()
+
+def create_corpus_registry():
+    """
+    여러 코퍼스를 한 프로세스에서 제공: 첫 검색 시 로드하고, 메모리 예산을 넘으면 오래 쓰지 않은 코퍼스를 내림
+    각 코퍼스는 인덱스 교체(hot swap) 가능: 요청은 현재 체인을 임대해 사용하고, 다시 로드하면 새 체인으로 교체됨
+    """
+    from rag.corpora import CorpusRegistry
+
+    global corpus_registry
+    corpus_registry = CorpusRegistry(
+        create_rag_chain,
+        config.CORPORA,
+        memory_budget = config.CORPUS_MEMORY_BUDGET_MB * 2 ** 20 if config.CORPUS_MEMORY_BUDGET_MB else None,
+    )
+
+def warm_corpus(corpus: str):
+    """
+    서버 준비 완료 전에 코퍼스를 미리 로드
+    """
+    with corpus_registry.lease(corpus):
+        pass
+
+# 포트를 먼저 열고 검색 체인은 백그라운드에서 초기화; 완료 전의 검색 요청은 바로 준비 중 상태를 반환
+startup = Startup([
+    ("tracing", setup_tracing),
+    ("query_embedding", load_query_embedding),
+    ("corpus_registry", create_corpus_registry),
+    *[(f"corpus:{corpus}", partial(warm_corpus, corpus)) for corpus in config.WARMUP_CORPORA],
+])
+
+def handle_reload_signal(signum, frame):
+    """
+    SIGHUP 수신 시 백그라운드에서 로드된 코퍼스의 활성 인덱스 버전을 다시 로드하는 함수
+    (`python index_tools.py reload` 로 전송)
+    """
+    if corpus_registry is None:
+        # 초기화 중에는 활성 인덱스 버전을 그대로 로드하므로 무시
+        print("⏳ 서버 초기화 중: 다시 로드 요청을 무시합니다.")
+        return
+    print("🔄 인덱스 다시 로드 요청을 받았습니다.")
+    corpus_registry.reload_in_background()
+
+signal.signal(signal.SIGHUP, handle_reload_signal)
 
 mcp = FastMCP(
     name="킹덤빌더스쿨(KBS) 검색(RAG)",
-    version="0.0.1",
-    description="킹덤빌더스쿨(KBS) 검색(RAG)",
+    instructions="킹덤빌더스쿨(KBS) 검색(RAG)",
     host="0.0.0.0",  # Host address (0.0.0.0 allows connections from any IP)
-    port=8001 
+    port=8001,
+    # streamable-http 전송: 세션 없이 요청마다 독립적으로 처리하므로 어느 복제본(replica)이든 응답 가능
+    stateless_http=True,
+    json_response=config.STREAMABLE_HTTP_JSON_RESPONSE,
 )
 
-def format_search_results(docs: List[Document]) -> str:
+def format_search_results(docs: List["Document"]) -> str:
     """
     Format search results as markdown.
     
@@ -79,49 +247,80 @@ def format_search_results(docs: List[Document]) -> str:
     if not docs:
         return "No relevant information found."
     
-    markdown_results = "## Search Results\n\n"
+    parts = ["## Search Results\n\n"]
     
     for i, doc in enumerate(docs, 1):
         source = doc.metadata.get("source", "Unknown source")
         page = doc.metadata.get("page", None)
         page_info = f" (Page: {page+1})" if page is not None else ""
         
-        markdown_results += f"### Result {i}{page_info}\n\n"
-        markdown_results += f"{doc.page_content}\n\n"
-        markdown_results += f"Source: {source}\n\n"
-        markdown_results += "---\n\n"
+        parts.append(f"### Result {i}{page_info}\n\n")
+        parts.append(f"{doc.page_content}\n\n")
+        parts.append(f"Source: {source}\n\n")
+        parts.append("---\n\n")
     
-    return markdown_results
+    return "".join(parts)
 
-def format_search_results_with_image_metadata(docs: List[Document]) -> str:
+def format_search_results_with_image_metadata(docs: List["Document"], query: str = "",
+                                              max_chars: Optional[int] = None,
+                                              max_tokens: Optional[int] = None,
+                                              output_format: str = "markdown") -> str:
     """
-    이미지 메타데이터를 활용한 검색 결과 포맷팅
+    이미지 메타데이터를 활용한 검색 결과 포맷팅 (markdown 또는 JSON)
+
+    Args:
+        docs: 검색 결과 문서
+        query: 검색 쿼리 (예산이 있으면 쿼리와 일치하는 구간만 남김)
+        max_chars: 응답 전체의 문자 수 예산
+        max_tokens: 응답 전체의 토큰 수 예산
+        output_format: "markdown" 또는 "json"
     """
-    if not docs:
-        return "No relevant information found."
-    
-    markdown_results = "## Search Results\n\n"
-    
-    for i, doc in enumerate(docs, 1):
-        source = doc.metadata.get("source", "Unknown source")
-        page = doc.metadata.get("page", None)
-        page_info = f" (Page: {page+1})" if page is not None else ""
-        
-        markdown_results += f"### Result {i}{page_info}\n\n"
-        markdown_results += f"{doc.page_content}\n\n"
-        
-        # 이미지 정보가 있는 경우 추가
-        if "images" in doc.metadata:
-            images = doc.metadata["images"]
-            if images:
-                markdown_results += "**Related Images:**\n"
-                for img in images:
-                    markdown_results += f"- {img}\n"
-                markdown_results += "\n"
-        
-        markdown_results += f"Source: {source}\n\n"
-        markdown_results += "---\n\n"
-    return markdown_results
+    from rag.packing import pack_results
+
+    return pack_results([query], [docs], max_chars=max_chars, max_tokens=max_tokens,
+                        output_format=output_format, grouped=False, encoding=config.SEARCH_TOKEN_ENCODING)
+
+def format_batch_search_results(queries: List[str], results: List[List["Document"]],
+                                max_chars: Optional[int] = None,
+                                max_tokens: Optional[int] = None,
+                                output_format: str = "markdown") -> str:
+    """
+    Format batched search results as markdown or JSON, grouped by query.
+
+    A chunk returned for several queries is printed in full only the first
+    time; later occurrences refer back to it.
+
+    Args:
+        queries: Search queries
+        results: Documents grouped by query
+        max_chars: Character budget of the whole response
+        max_tokens: Token budget of the whole response
+        output_format: "markdown" or "json"
+
+    Returns:
+        Formatted search results
+    """
+    from rag.packing import pack_results
+
+    return pack_results(queries, results, max_chars=max_chars, max_tokens=max_tokens,
+                        output_format=output_format, encoding=config.SEARCH_TOKEN_ENCODING)
+
+def search_filters(source: Optional[str] = None, pages: Optional[List[int]] = None) -> Optional[dict]:
+    """
+    검색 도구의 source / pages 인자를 메타데이터 필터로 변환 (pages는 결과에 표시되는 1부터 시작하는 번호)
+    """
+    filters = {}
+    if source:
+        filters["source"] = source
+    if pages:
+        filters["page"] = [page - 1 for page in pages]
+    return filters or None
+
+def metric_corpus_label(corpus: str) -> str:
+    """
+    메트릭의 corpus 레이블 (알 수 없는 이름은 하나로 모아 레이블 수 제한)
+    """
+    return corpus if corpus in config.CORPORA else "unknown"
 
 # @mcp.tool()
 # async def keyword_search(query: str, top_k: int = 3) -> str:
@@ -162,7 +361,57 @@ def format_search_results_with_image_metadata(docs: List[Document]) -> str:
 #         return f"An error occurred during search: {str(e)}"
 
 @mcp.tool()
-async def search(query: str, top_k: int = 4) -> str:
+async def list_corpora() -> str:
+    """
+    Lists the document collections (corpora) that can be searched.
+    Pass a corpus name as the `corpus` parameter of search and search_batch.
+
+    """
+
+    lines = ["## Corpora\n"]
+    for name in config.CORPORA:
+        description = config.CORPORA[name].get("description", "")
+        default = " (default)" if name == config.DEFAULT_CORPUS else ""
+        lines.append(f"- **{name}**{default}: {description}")
+    return "\n".join(lines)
+
+@mcp.tool()
+async def list_sources(corpus: str = config.DEFAULT_CORPUS) -> str:
+    """
+    Lists the source documents of a corpus.
+    Pass a source name as the `source` parameter of search and search_batch to search only that document.
+
+    Parameters:
+        corpus: Corpus to list (see list_corpora)
+
+    """
+
+    try:
+        startup.require()
+        async with corpus_registry.alease(corpus, config.CORPUS_LOAD_WAIT) as rag_chain:
+            if "source" not in rag_chain.filter_fields:
+                return (f"Source filtering is disabled for corpus '{corpus}': "
+                        "add \"source\" to METADATA_FILTER_FIELDS to list and filter by source.")
+            index = rag_chain.metadata_index
+            sources = index.values("source")
+            counts = {source: index.postings["source"][source].size for source in sources}
+        lines = [f"## Sources ({corpus})\n"]
+        lines.extend(f"- {source} ({counts[source]} chunks)" for source in sources)
+        return "\n".join(lines)
+    except (ServerNotReady, CorpusLoading) as e:
+        return str(e)
+    except Exception as e:
+        return f"An error occurred while listing sources: {str(e)}"
+
+@mcp.tool()
+async def search(query: str, top_k: int = 4, corpus: str = config.DEFAULT_CORPUS,
+                 max_chars: Optional[int] = config.SEARCH_MAX_CHARS,
+                 max_tokens: Optional[int] = config.SEARCH_MAX_TOKENS,
+                 output_format: str = config.SEARCH_OUTPUT_FORMAT,
+                 mmr_lambda: Optional[float] = None,
+                 mmr_fetch_k: Optional[int] = None,
+                 source: Optional[str] = None,
+                 pages: Optional[List[int]] = None) -> str:
     """
     Performs hybrid search (keyword + semantic) on MD documents.
     Combines exact keyword matching and semantic similarity to deliver optimal results.
@@ -171,15 +420,186 @@ async def search(query: str, top_k: int = 4) -> str:
     Parameters:
         query: Search query
         top_k: Number of results to return
+        corpus: Corpus to search (see list_corpora)
+        max_chars: Maximum size of the response in characters; each result is trimmed to the passage matching the query
+        max_tokens: Maximum size of the response in tokens (used when max_chars is not given)
+        output_format: "markdown" or "json" (compact)
+        mmr_lambda: Diversify the results by maximal marginal relevance, between 0 (most diverse) and 1 (relevance only); use about 0.5 to skip near-duplicate passages
+        mmr_fetch_k: Number of candidates the diverse results are picked from
+        source: Search only this source document (see list_sources)
+        pages: Search only these pages (as numbered in the results)
 
     """
 
     try:
-        results = rag_chain.search_hybrid(query, top_k)
-        # print(results)
-        return format_search_results_with_image_metadata(results)
+        startup.require()
+        with track_request("search", metric_corpus_label(corpus)):
+            async with corpus_registry.alease(corpus, config.CORPUS_LOAD_WAIT) as rag_chain:
+                results = await rag_chain.asearch_hybrid(query, top_k, mmr_lambda, mmr_fetch_k,
+                                                         search_filters(source, pages))
+            # print(results)
+            with stage_timer("format"):
+                response = format_search_results_with_image_metadata(results, query, max_chars, max_tokens,
+                                                                     output_format)
+            observe_result("search", [len(results)], response)
+            return response
+    except (ServerNotReady, CorpusLoading) as e:
+        return str(e)
     except Exception as e:
         return f"An error occurred during search: {str(e)}"
 
+@mcp.tool()
+async def search_batch(queries: List[str], top_k: int = 4, corpus: str = config.DEFAULT_CORPUS,
+                       max_chars: Optional[int] = config.SEARCH_MAX_CHARS,
+                       max_tokens: Optional[int] = config.SEARCH_MAX_TOKENS,
+                       output_format: str = config.SEARCH_OUTPUT_FORMAT,
+                       mmr_lambda: Optional[float] = None,
+                       mmr_fetch_k: Optional[int] = None,
+                       source: Optional[str] = None,
+                       pages: Optional[List[int]] = None) -> str:
+    """
+    Performs hybrid search (keyword + semantic) for several queries in one call.
+    Use this instead of calling search repeatedly when a question is split into sub-questions.
+    Results are grouped by query; a chunk matching several queries is shown once.
+    
+    Parameters:
+        queries: Search queries
+        top_k: Number of results to return per query
+        corpus: Corpus to search (see list_corpora)
+        max_chars: Maximum size of the whole response in characters; results are trimmed to the passages matching their query
+        max_tokens: Maximum size of the whole response in tokens (used when max_chars is not given)
+        output_format: "markdown" or "json" (compact)
+        mmr_lambda: Diversify the results of each query by maximal marginal relevance, between 0 (most diverse) and 1 (relevance only)
+        mmr_fetch_k: Number of candidates the diverse results are picked from
+        source: Search only this source document (see list_sources)
+        pages: Search only these pages (as numbered in the results)
+
+    """
+
+    try:
+        startup.require()
+        with track_request("search_batch", metric_corpus_label(corpus)):
+            async with corpus_registry.alease(corpus, config.CORPUS_LOAD_WAIT) as rag_chain:
+                results = await rag_chain.asearch_hybrid_batch(queries, top_k, mmr_lambda, mmr_fetch_k,
+                                                               search_filters(source, pages))
+            with stage_timer("format"):
+                response = format_batch_search_results(queries, results, max_chars, max_tokens, output_format)
+            observe_result("search_batch", [len(docs) for docs in results], response)
+            return response
+    except (ServerNotReady, CorpusLoading) as e:
+        return str(e)
+    except Exception as e:
+        return f"An error occurred during search: {str(e)}"
+
+@mcp.custom_route(config.METRICS_PATH, methods=["GET"])
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    Prometheus 형식의 메트릭 (단계별 소요 시간, 캐시 적중률, 처리 중인 요청, 결과 크기)
+    """
+    body, content_type = metrics_response()
+    return Response(body, media_type=content_type)
+
+@mcp.custom_route(config.HEALTH_PATH, methods=["GET"])
+async def health_endpoint(request: Request) -> Response:
+    """
+    프로세스 생존 확인 (초기화 중에도 200)
+    """
+    return JSONResponse({"status": "ok"})
+
+@mcp.custom_route(config.READY_PATH, methods=["GET"])
+async def ready_endpoint(request: Request) -> Response:
+    """
+    준비 상태: 초기화가 끝나면 200, 초기화 중이거나 실패하면 503 (상태, 진행 중인 단계, 경과 시간 포함)
+    """
+    return JSONResponse(startup.status(), status_code=200 if startup.ready else 503)
+
+def server_pid_path(port: int) -> Path:
+    """
+    PID 파일 경로 (기본 포트가 아닌 복제본은 포트별 파일 사용)
+    """
+    pid_path = Path(config.SERVER_PID_PATH)
+    if port == 8001:
+        return pid_path
+    return pid_path.with_name(f"{pid_path.stem}.{port}{pid_path.suffix}")
+
+def corpora_without_chunk_store() -> List[str]:
+    """
+    활성 인덱스 버전에 청크 저장소가 없어 mmap 모드로 열 수 없는 코퍼스
+    """
+    from rag.versions import current_index_directory
+
+    missing = []
+    for corpus, settings in config.CORPORA.items():
+        name = settings.get("chunk_store_name")
+        if not name or not (current_index_directory(settings["db_dir"]) / name).exists():
+            missing.append(corpus)
+    return missing
+
+def create_worker_app():
+    """
+    워커 프로세스의 ASGI 앱: 상태 없는 streamable-http 앱을 만들고 백그라운드 초기화 시작
+    """
+    startup.start()
+    return mcp.streamable_http_app()
+
+def run_workers(workers: int, app: str = "mcp_server:create_worker_app"):
+    """
+    streamable-http 앱을 여러 워커 프로세스로 실행 (uvicorn 이 연 하나의 소켓을 공유)
+    SIGHUP 은 워커를 다시 시작하지 않고 각 워커에 전달하므로, 워커는 요청을 계속 처리하면서 백그라운드에서 인덱스를 교체
+    """
+    import inspect
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    class ReloadingMultiprocess(Multiprocess):
+        def handle_hup(self):
+            # uvicorn 기본 동작(워커 재시작)은 인덱스를 처음부터 다시 로드하므로 대신 각 워커에 다시 로드 신호 전달
+            for process in self.processes:
+                if process.pid is not None:
+                    os.kill(process.pid, signal.SIGHUP)
+
+    os.environ[WORKERS_ENV] = str(workers)
+    uvicorn_config = uvicorn.Config(
+        app,
+        factory=True,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        workers=workers,
+        log_level=mcp.settings.log_level.lower(),
+    )
+    sock = uvicorn_config.bind_socket()
+    supervisor_options = dict(sockets=[sock])
+    # uvicorn 0.34 의 감독 프로세스는 워커가 실행할 함수를 인자로 받음 (이후 버전은 설정에서 직접 생성)
+    if "target" in inspect.signature(Multiprocess).parameters:
+        supervisor_options["target"] = uvicorn.Server(config=uvicorn_config).run
+    ReloadingMultiprocess(uvicorn_config, **supervisor_options).run()
+
 if __name__ == "__main__":
-    mcp.run('sse')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="킹덤빌더스쿨(KBS) 검색(RAG) MCP 서버")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default=config.SERVER_TRANSPORT,
+                        help="sse: 클라이언트별 장기 연결 / streamable-http: 상태 없는 HTTP (로드 밸런서 뒤 여러 복제본)")
+    parser.add_argument("--host", default=mcp.settings.host)
+    parser.add_argument("--port", type=int, default=mcp.settings.port)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                        help="streamable-http: 한 포트를 공유하는 워커 프로세스 수 (인덱스는 mmap 모드로 공유)")
+    args = parser.parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    if args.workers > 1:
+        if args.transport != "streamable-http":
+            parser.error("--workers 는 streamable-http 전송에서만 사용할 수 있습니다 (SSE 세션은 한 프로세스에 묶임).")
+        missing = corpora_without_chunk_store()
+        if missing:
+            parser.error(f"워커 프로세스는 mmap 모드로 인덱스를 공유하므로 청크 저장소가 필요합니다: {', '.join(missing)} "
+                         "(`python index_tools.py chunk-store` 로 생성)")
+
+    # index_tools.py 가 다시 로드 신호를 보낼 수 있도록 PID 기록
+    server_pid_path(args.port).write_text(str(os.getpid()))
+    if args.workers > 1:
+        # 각 워커 프로세스가 검색 체인을 백그라운드에서 초기화 (create_worker_app)
+        run_workers(args.workers)
+    else:
+        # 검색 체인은 백그라운드에서 초기화하고 포트는 바로 열기
+        startup.start()
+        # 메트릭, 상태 확인 엔드포인트는 같은 포트에서 제공 (SSE: /sse, streamable-http: /mcp/)
+        mcp.run(transport=args.transport)
\ No newline at end of file
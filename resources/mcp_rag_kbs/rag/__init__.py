@@ -1,9 +1,36 @@
-from rag.base import RetrievalChain
-from rag.pdf import PDFRetrievalChain
-from rag.kbs import KBSRetrievalChain
-
-__all__ = [
-    'RetrievalChain',
-    'PDFRetrievalChain',
-    'KBSRetrievalChain'
-]
\ No newline at end of file
+import importlib
+
+# Exported names and their modules; imported on first access so that light
+# modules such as rag.metrics or rag.startup do not pull in langchain and faiss
+_EXPORTS = {
+    'RetrievalChain': 'rag.base',
+    'PDFRetrievalChain': 'rag.pdf',
+    'KBSRetrievalChain': 'rag.kbs',
+    'BM25Index': 'rag.bm25',
+    'SparseBM25Retriever': 'rag.bm25',
+    'CachedQueryEmbeddings': 'rag.embedding_cache',
+    'SQLiteEmbeddingStore': 'rag.embedding_cache',
+    'HashingEmbeddings': 'rag.embeddings',
+    'create_embeddings': 'rag.embeddings',
+    'MemoryResultCache': 'rag.result_cache',
+    'SQLiteResultCache': 'rag.result_cache',
+    'SearchResultCache': 'rag.result_cache',
+    'ChunkStore': 'rag.chunk_store',
+    'pack_results': 'rag.packing',
+    'MetadataIndex': 'rag.metadata_index',
+    'MinHashDeduplicator': 'rag.dedup',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'rag' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
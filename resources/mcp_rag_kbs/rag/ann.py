@@ -0,0 +1,396 @@
+import math
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import faiss
+import numpy as np
+
+# Vector index variants, all sharing the row order (and so the docstore) of the flat index
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "fp16", "sq8", "pq", "ivf_pq")
+# Variants storing lossy vector codes, whose results can be re-ranked with the exact vectors
+QUANTIZED_INDEX_TYPES = ("fp16", "sq8", "pq", "ivf_pq")
+# Row subsets up to this size are searched exactly over their stored vectors instead of
+# through the index with an ID selector (HNSW and IVF miss results of very selective filters)
+EXACT_SEARCH_ROWS = 1024
+
+
+def index_variant_path(persist_directory: Union[str, Path], db_index_name: str, index_type: str) -> Path:
+    """
+    Return the file of a vector index variant.
+
+    The flat index is the ``<db_index_name>.faiss`` file written by
+    LangChain's FAISS store; other variants live next to it as
+    ``<db_index_name>_<index_type>.faiss``.
+
+    Args:
+        persist_directory: Vector store directory
+        db_index_name: Index name of the vector store
+        index_type: Index variant
+
+    Returns:
+        Path of the index file
+    """
+
+    if index_type == "flat":
+        return Path(persist_directory) / f"{db_index_name}.faiss"
+    return Path(persist_directory) / f"{db_index_name}_{index_type}.faiss"
+
+
+def vectors_path(persist_directory: Union[str, Path], db_index_name: str) -> Path:
+    """
+    Return the file of the exact float32 vectors used to re-rank quantized results.
+
+    Args:
+        persist_directory: Vector store directory
+        db_index_name: Index name of the vector store
+
+    Returns:
+        Path of the ``.npy`` vector file
+    """
+
+    return Path(persist_directory) / f"{db_index_name}_vectors.npy"
+
+
+def read_index(path: Union[str, Path], mmap: bool = False) -> Any:
+    """
+    Read a FAISS index file.
+
+    Args:
+        path: Index file
+        mmap: Memory map the index instead of reading it into memory
+
+    Returns:
+        The FAISS index
+    """
+
+    if not mmap:
+        return faiss.read_index(str(path))
+    # IO_FLAG_MMAP_IFC (faiss >= 1.11) maps every index type; older versions map inverted lists only.
+    # The two flags cannot be combined: IO_FLAG_MMAP then rejects the mapped file for IVF indexes
+    mmap_ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_ifc is not None:
+        try:
+            return faiss.read_index(str(path), mmap_ifc | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+
+def read_vectors(index: Any) -> np.ndarray:
+    """
+    Read back every vector stored in a flat index.
+
+    Args:
+        index: FAISS index with stored vectors
+
+    Returns:
+        Float32 array of shape ``(ntotal, d)``
+    """
+
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def reconstruct_rows(index: Any, rows: np.ndarray) -> np.ndarray:
+    """
+    Read the stored vectors of some rows of an index.
+
+    Quantized variants return their decoded (approximate) vectors. IVF
+    indexes get a direct map from rows to inverted list entries on first use.
+
+    Args:
+        index: FAISS index or RerankIndex
+        rows: Row ids
+
+    Returns:
+        Float32 array of shape ``(len(rows), d)``
+    """
+
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    try:
+        return index.reconstruct_batch(rows)
+    except RuntimeError:
+        faiss.extract_index_ivf(index).make_direct_map()
+        return index.reconstruct_batch(rows)
+
+
+def selector_params(index: Any, rows: np.ndarray, exclude: bool = False) -> Optional[Any]:
+    """
+    Build search parameters restricting a FAISS index to some rows.
+
+    The rows are passed as a bitmap selector (one bit per row, constant
+    time membership tests). The HNSW search depth and the IVF probe count
+    of the index are carried over, since search parameters replace them.
+
+    Args:
+        index: FAISS index (not a RerankIndex)
+        rows: Row ids to search
+        exclude: Search every row except ``rows`` instead (e.g. skip removed rows)
+
+    Returns:
+        The search parameters, or None if the index does not support selectors
+    """
+
+    if isinstance(index, faiss.IndexPQ):
+        return None
+    mask = np.full(index.ntotal, exclude, dtype=bool)
+    mask[rows] = not exclude
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(bitmap)
+    # The selector only points to the bitmap; keep the bitmap alive with it
+    selector.bitmap_array = bitmap
+    if hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    elif hasattr(index, "nprobe"):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.selector = selector
+    return params
+
+
+def search_rows(index: Any, x: np.ndarray, k: int, rows: np.ndarray) -> tuple:
+    """
+    Search only some rows of an index, e.g. the chunks matching a metadata filter.
+
+    Up to EXACT_SEARCH_ROWS rows (and any number for indexes without
+    selector support) are scored exactly against their stored vectors,
+    which only reads those rows. Larger subsets are searched through the
+    index with a bitmap ID selector, so rows outside the subset are
+    skipped before their distance is computed.
+
+    Args:
+        index: FAISS index or RerankIndex
+        x: Queries of shape ``(nq, d)``
+        k: Number of results per query
+        rows: Sorted row ids to search
+
+    Returns:
+        ``(distances, ids)`` arrays of shape ``(nq, k)`` in FAISS conventions
+    """
+
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    rows = np.ascontiguousarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        worst = -np.inf if index.metric_type == faiss.METRIC_INNER_PRODUCT else np.inf
+        return np.full((x.shape[0], k), worst, dtype=np.float32), np.full((x.shape[0], k), -1, dtype=np.int64)
+    params = None
+    if rows.size > EXACT_SEARCH_ROWS:
+        params = selector_params(index.index if isinstance(index, RerankIndex) else index, rows)
+    if params is not None:
+        return index.search(x, k, params=params)
+
+    distances, positions = faiss.knn(x, reconstruct_rows(index, rows), k, metric=index.metric_type)
+    return distances, np.where(positions >= 0, rows[np.maximum(positions, 0)], -1)
+
+
+def default_nlist(num_vectors: int) -> int:
+    """
+    Number of IVF cells for a corpus, about 4 * sqrt(n) and at most n / 39
+    so every cell gets enough training points.
+
+    Args:
+        num_vectors: Number of indexed vectors
+
+    Returns:
+        Number of IVF cells
+    """
+
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def build_index(vectors: np.ndarray,
+                index_type: str,
+                metric: int = faiss.METRIC_L2,
+                hnsw_m: int = 32,
+                hnsw_ef_construction: int = 200,
+                ivf_nlist: Optional[int] = None,
+                pq_m: int = 64,
+                pq_nbits: int = 8) -> Any:
+    """
+    Build a vector index variant over vectors, keeping their row order.
+
+    Args:
+        vectors: Float32 array of shape ``(n, d)``
+        index_type: One of INDEX_TYPES
+        metric: FAISS metric, e.g. faiss.METRIC_L2 or faiss.METRIC_INNER_PRODUCT
+        hnsw_m: HNSW graph degree
+        hnsw_ef_construction: HNSW build-time search depth
+        ivf_nlist: Number of IVF cells (default: default_nlist(n))
+        pq_m: Number of PQ sub-quantizers (bytes per vector at 8 bits); must divide the dimension
+        pq_nbits: Bits per PQ sub-quantizer code
+
+    Returns:
+        The built FAISS index
+
+    Raises:
+        ValueError: If the index type is unknown or the PQ settings do not fit the vectors
+    """
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    d = vectors.shape[1]
+
+    if index_type == "flat":
+        index = faiss.IndexFlat(d, metric)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = hnsw_ef_construction
+    elif index_type == "ivf_flat":
+        nlist = ivf_nlist or default_nlist(vectors.shape[0])
+        quantizer = faiss.IndexFlat(d, metric)
+        index = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        index.train(vectors)
+    elif index_type in ("fp16", "sq8"):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if index_type == "fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(d, qtype, metric)
+        index.train(vectors)
+    elif index_type in ("pq", "ivf_pq"):
+        if d % pq_m:
+            raise ValueError(f"pq_m ({pq_m}) must divide the vector dimension ({d}).")
+        if vectors.shape[0] < 2 ** pq_nbits:
+            raise ValueError(f"PQ training needs at least {2 ** pq_nbits} vectors, got {vectors.shape[0]}.")
+        if index_type == "pq":
+            index = faiss.IndexPQ(d, pq_m, pq_nbits, metric)
+        else:
+            nlist = ivf_nlist or default_nlist(vectors.shape[0])
+            quantizer = faiss.IndexFlat(d, metric)
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits, metric)
+            index.by_residual = True
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES}.")
+
+    index.add(vectors)
+    return index
+
+
+def apply_search_params(index: Any, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> Any:
+    """
+    Set the query-time accuracy/speed knobs of an index.
+
+    Args:
+        index: FAISS index
+        ef_search: HNSW search depth
+        nprobe: Number of IVF cells visited per query
+
+    Returns:
+        The same index
+    """
+
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    if nprobe is not None and hasattr(index, "nprobe"):
+        index.nprobe = nprobe
+    return index
+
+
+def index_memory_usage(index: Any) -> int:
+    """
+    Estimate the memory held by a vector index, in bytes.
+
+    Counts the stored vector codes plus the HNSW graph or IVF list ids;
+    the exact vectors of a re-ranking index are memory mapped and not counted.
+
+    Args:
+        index: FAISS index or RerankIndex
+
+    Returns:
+        Approximate size in bytes
+    """
+
+    if isinstance(index, RerankIndex):
+        return index_memory_usage(index.index)
+    index = faiss.downcast_index(index)
+    if hasattr(index, "hnsw"):
+        return index.hnsw.neighbors.size() * 4 + index_memory_usage(index.storage)
+    if hasattr(index, "invlists"):
+        return index.ntotal * (index.code_size + 8) + index_memory_usage(index.quantizer)
+    return index.ntotal * getattr(index, "code_size", index.d * 4)
+
+
+class RerankIndex:
+    """
+    Read-only index that re-ranks the shortlist of a quantized index with exact vectors.
+
+    A search fetches ``k * rerank_factor`` candidates from the quantized
+    index, then scores them against the exact float32 vectors, which are
+    usually a memory mapped ``.npy`` file: only the candidate rows are read,
+    so resident memory stays close to the size of the quantized codes.
+
+    Implements the parts of the FAISS index interface used by LangChain's
+    FAISS store for searching (``search``, ``reconstruct``, ``ntotal``, ``d``).
+    """
+
+    def __init__(self, index: Any, vectors: np.ndarray, rerank_factor: int = 4) -> None:
+        """
+        Initialize a re-ranking index.
+
+        Args:
+            index: Quantized FAISS index
+            vectors: Exact vectors in the row order of the index, shape ``(ntotal, d)``
+            rerank_factor: Shortlist size as a multiple of k
+
+        Raises:
+            ValueError: If the vectors do not match the index
+        """
+
+        if vectors.shape != (index.ntotal, index.d):
+            raise ValueError(f"Vectors of shape {vectors.shape} do not match the index ({index.ntotal}, {index.d}).")
+        self.index = index
+        self.vectors = vectors
+        self.rerank_factor = rerank_factor
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def d(self) -> int:
+        return self.index.d
+
+    @property
+    def metric_type(self) -> int:
+        return self.index.metric_type
+
+    def search(self, x: np.ndarray, k: int, params: Optional[Any] = None) -> tuple:
+        """
+        Search with the quantized index and re-rank the shortlist exactly.
+
+        Args:
+            x: Queries of shape ``(nq, d)``
+            k: Number of results per query
+            params: FAISS search parameters of the quantized index (e.g. an ID selector)
+
+        Returns:
+            ``(distances, ids)`` arrays of shape ``(nq, k)`` in FAISS conventions
+        """
+
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        _, candidates = self.index.search(x, k * self.rerank_factor, params=params)
+        valid = candidates >= 0
+        # Sorted row order keeps the reads from the memory mapped file sequential
+        rows, inverse = np.unique(candidates[valid], return_inverse=True)
+        candidate_vectors = np.zeros(candidates.shape + (self.d,), dtype=np.float32)
+        candidate_vectors[valid] = np.asarray(self.vectors[rows], dtype=np.float32)[inverse]
+
+        if self.metric_type == faiss.METRIC_INNER_PRODUCT:
+            scores = np.einsum("qd,qcd->qc", x, candidate_vectors)
+            scores[~valid] = -np.inf
+            order = np.argsort(-scores, axis=1)[:, :k]
+        else:
+            scores = np.square(candidate_vectors - x[:, None, :]).sum(axis=2)
+            scores[~valid] = np.inf
+            order = np.argsort(scores, axis=1)[:, :k]
+
+        distances = np.take_along_axis(scores, order, axis=1)
+        ids = np.where(np.take_along_axis(valid, order, axis=1), np.take_along_axis(candidates, order, axis=1), -1)
+        return distances, ids
+
+    def reconstruct(self, i: int) -> np.ndarray:
+        return np.asarray(self.vectors[i], dtype=np.float32)
+
+    def reconstruct_batch(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[np.asarray(ids, dtype=np.int64)], dtype=np.float32)
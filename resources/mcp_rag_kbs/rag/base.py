@@ -1,19 +1,46 @@
 from abc import ABC, abstractmethod
-import os
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Any, Hashable, Optional, Sequence, Tuple
 from pathlib import Path
 
-from langchain.retrievers.ensemble import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
+import numpy as np
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from langchain_openai import OpenAIEmbeddings
-from langchain_upstage import UpstageEmbeddings
 from dotenv import load_dotenv
 
+from rag.ann import RerankIndex, index_memory_usage, reconstruct_rows, search_rows, selector_params
+from rag.bm25 import BM25Index, SparseBM25Retriever, top_k_indices
+from rag.dedup import MinHashDeduplicator, collapse_duplicates, duplicate_stats, format_dedup_stats
+from rag.embedding_cache import CachedQueryEmbeddings, SQLiteEmbeddingStore, normalize_query
+from rag.embeddings import aembed_queries, create_embeddings, embed_queries
+from rag.metadata_index import DEFAULT_FILTER_FIELDS, MetadataIndex, filter_key
+from rag.metrics import stage_timer
+from rag.mmr import mmr_select
+from rag.result_cache import MemoryResultCache, SQLiteResultCache, SearchResultCache
+from rag.storage import corpus_fingerprint
+
 # API 키 정보 로드
 load_dotenv()
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
+
+def chunk_key(doc: Document) -> Tuple[str, str]:
+    """
+    Identify a chunk by its page content and metadata.
+    
+    Args:
+        doc: Chunk
+        
+    Returns:
+        Hashable key, equal for copies of the same chunk
+    """
+
+    return doc.page_content, json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False, default=str)
+
 
 class RetrievalChain(ABC):
     """
@@ -33,16 +60,31 @@ class RetrievalChain(ABC):
                 source_uri: Paths to source documents
                 k: Number of results to return (default: 5)
                 embedding_model: Model name for embeddings (default: OpenAI "text-embedding-3-small")
+                embedding_backend: Embedding backend, see rag.embeddings.create_embeddings (default: "openai")
+                embedding_options: Options of the embedding backend (default: {})
                 persist_directory: Directory to persist vector store
+                dedup_threshold: Collapse split chunks whose estimated Jaccard similarity to an
+                    earlier chunk reaches this threshold before indexing; None disables it (default: None)
+                hybrid_fusion: Hybrid fusion method, "rrf" or "minmax" (default: "rrf")
+                hybrid_weights: Weights of the keyword and semantic scores (default: [0.5, 0.5])
+                hybrid_fetch_k: Candidates fetched per sub-search in hybrid search (default: 20)
         """
 
         self.source_uri = kwargs.get("source_uri", [])
         self.k = kwargs.get("k", 5)
         self.embedding_model = kwargs.get("embedding_model", "text-embedding-3-small")
+        self.embedding_backend = kwargs.get("embedding_backend", "openai")
+        self.embedding_options = kwargs.get("embedding_options", None) or {}
         self.persist_directory = kwargs.get("persist_directory", None)
+        dedup_threshold = kwargs.get("dedup_threshold", None)
+        self.deduplicator = MinHashDeduplicator(dedup_threshold) if dedup_threshold else None
+        self.hybrid_fusion = kwargs.get("hybrid_fusion", "rrf")
+        self.hybrid_weights = kwargs.get("hybrid_weights", [0.5, 0.5])
+        self.hybrid_fetch_k = kwargs.get("hybrid_fetch_k", 20)
         self.embeddings = None
         self.vectorstore = None
         self.retrievers = None
+        self.hybrid_engine = None
         self.split_docs = None
     
     @abstractmethod
@@ -84,6 +126,21 @@ class RetrievalChain(ABC):
 
         return text_splitter.split_documents(docs)
     
+    def deduplicate_documents(self, split_docs: List[Document]) -> List[Document]:
+        """
+        Collapse near-duplicate chunks into their first occurrence, which keeps their source references.
+        
+        Args:
+            split_docs: Split document chunks
+            
+        Returns:
+            Chunks without near-duplicates
+        """
+
+        canonical = self.deduplicator.find_duplicates([doc.page_content for doc in split_docs])
+        print(f"Near-duplicate pass: {format_dedup_stats(duplicate_stats(split_docs, canonical))}")
+        return collapse_duplicates(split_docs, canonical)[0]
+    
     def create_embedding(self) -> Any:
         """
         Create an embedding model instance.
@@ -92,7 +149,10 @@ class RetrievalChain(ABC):
             An embeddings model instance
         """
 
-        return OpenAIEmbeddings(model=self.embedding_model)
+        options = dict(self.embedding_options)
+        if self.embedding_backend == "openai":
+            options.setdefault("model", self.embedding_model)
+        return create_embeddings(self.embedding_backend, "passage", **options)
     
     @abstractmethod
     def create_vectorstore(self, split_docs: List[Document]) -> Any:
@@ -134,26 +194,20 @@ class RetrievalChain(ABC):
             A keyword search retriever
         """
 
-        return BM25Retriever.from_documents(split_docs, k=self.k)
+        return SparseBM25Retriever.from_documents(split_docs, k=self.k)
     
-    def create_hybrid_retriever(self, split_docs: List[Document], vectorstore: Any) -> BaseRetriever:
+    def create_hybrid_engine(self) -> "HybridSearchEngine":
         """
-        Create a hybrid search retriever combining keyword and semantic search.
+        Create the engine fusing keyword and semantic search results.
         
-        Args:
-            split_docs: Split document chunks
-            vectorstore: Vector store instance
-            
         Returns:
-            A hybrid search retriever
+            A hybrid search engine
         """
 
-        bm25_retriever = self.create_keyword_retriever(split_docs)
-        dense_retriever = self.create_semantic_retriever(vectorstore)
-        
-        return EnsembleRetriever(
-            retrievers=[bm25_retriever, dense_retriever],
-            weights=[0.5, 0.5]
+        return HybridSearchEngine(
+            fusion=self.hybrid_fusion,
+            weights=self.hybrid_weights,
+            fetch_k=self.hybrid_fetch_k
         )
     
     def create_retrievers(self, split_docs: List[Document]) -> Dict[str, BaseRetriever]:
@@ -169,11 +223,11 @@ class RetrievalChain(ABC):
 
         self.embeddings = self.create_embedding()
         self.vectorstore = self.create_vectorstore(split_docs)
+        self.hybrid_engine = self.create_hybrid_engine()
         
         return {
             "semantic": self.create_semantic_retriever(self.vectorstore),
-            "keyword": self.create_keyword_retriever(split_docs),
-            "hybrid": self.create_hybrid_retriever(split_docs, self.vectorstore)
+            "keyword": self.create_keyword_retriever(split_docs)
         }
     
     def initialize(self) -> "RetrievalChain":
@@ -194,6 +248,8 @@ class RetrievalChain(ABC):
         print("create_text_splitter")
         self.split_docs = self.split_documents(docs, text_splitter)
         print("split_documents")
+        if self.deduplicator is not None:
+            self.split_docs = self.deduplicate_documents(self.split_docs)
         self.retrievers = self.create_retrievers(self.split_docs)
         print("create_retrievers")
         print(f"Initialization complete: {len(self.split_docs)} chunks created")
@@ -229,7 +285,7 @@ class RetrievalChain(ABC):
         
         Args:
             query: Search query
-            k: Number of results to return (Note: BM25Retriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
             
         Returns:
             Relevant documents
@@ -241,15 +297,21 @@ class RetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["keyword"].get_relevant_documents(query)
+        k = k or self.k
+        retriever = self.retrievers["keyword"]
+        return [doc for doc, _ in retriever.search_with_scores(query, k)]
     
     def search_hybrid(self, query: str, k: Optional[int] = None) -> List[Document]:
         """
         Perform hybrid search (keyword + semantic) on the loaded documents.
         
+        Both sub-searches fetch a candidate pool whose scores are fused by
+        the hybrid engine, and exactly k results are returned when the
+        pools hold at least k distinct chunks.
+        
         Args:
             query: Search query
-            k: Number of results to return (Note: EnsembleRetriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
             
         Returns:
             Relevant documents
@@ -261,7 +323,16 @@ class RetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["hybrid"].get_relevant_documents(query)
+        k = k or self.k
+        fetch_k = self.hybrid_engine.candidate_pool_size(k)
+        keyword = self.retrievers["keyword"].search_with_scores(query, fetch_k)
+        semantic = self.vectorstore.similarity_search_with_score(query, k=fetch_k)
+        if getattr(self.vectorstore, "distance_strategy", None) != DistanceStrategy.MAX_INNER_PRODUCT:
+            # Distances: lower is better
+            semantic = [(doc, -score) for doc, score in semantic]
+        # Vector store rows are unknown here; key by content and metadata so equal texts stay apart
+        ids = [[chunk_key(doc) for doc, _ in results] for results in (keyword, semantic)]
+        return [doc for doc, _ in self.hybrid_engine.fuse([keyword, semantic], k, ids)]
     
     def search(self, query: str, k: Optional[int] = None) -> List[Document]:
         """
@@ -278,6 +349,150 @@ class RetrievalChain(ABC):
         return self.search_semantic(query, k)
 
 
+class HybridSearchEngine:
+    """
+    Score-level fusion of keyword and semantic search results.
+    
+    Each sub-search over-fetches a candidate pool of ``fetch_k`` results.
+    Candidates are keyed by id (vector store row) when the caller knows
+    them, otherwise by page content; their scores are fused in NumPy
+    arrays and exactly ``k`` results are returned.
+    
+    Supported fusion methods:
+        rrf: Weighted reciprocal rank fusion, sum of weight / (rrf_k + rank)
+        minmax: Weighted sum of min-max normalized scores
+    """
+    
+    FUSION_METHODS = ("rrf", "minmax")
+    
+    def __init__(self,
+                 fusion: str = "rrf",
+                 weights: Sequence[float] = (0.5, 0.5),
+                 fetch_k: int = 20,
+                 rrf_k: int = 60) -> None:
+        """
+        Initialize a hybrid search engine.
+        
+        Args:
+            fusion: Fusion method, "rrf" or "minmax"
+            weights: Weight of each candidate list, in the order passed to fuse()
+            fetch_k: Number of candidates fetched from each sub-search
+            rrf_k: Rank offset used by reciprocal rank fusion
+            
+        Raises:
+            ValueError: If the fusion method is unknown
+        """
+        
+        if fusion not in self.FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method: {fusion}. Expected one of {self.FUSION_METHODS}.")
+        
+        self.fusion = fusion
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+    
+    def candidate_pool_size(self, k: int) -> int:
+        """
+        Number of candidates to fetch from each sub-search for k results.
+        
+        Args:
+            k: Number of results to return
+            
+        Returns:
+            Candidate pool size
+        """
+        
+        return max(self.fetch_k, k)
+    
+    def normalize(self, scores: np.ndarray) -> np.ndarray:
+        """
+        Convert the scores of one ranked candidate list into fusion scores.
+        
+        Args:
+            scores: Scores of the candidates, best first
+            
+        Returns:
+            Fusion scores of the candidates
+        """
+        
+        if self.fusion == "rrf":
+            return 1.0 / (self.rrf_k + np.arange(1, scores.shape[0] + 1))
+        
+        if scores.shape[0] == 0:
+            return scores
+        low, high = scores.min(), scores.max()
+        if high == low:
+            return np.ones_like(scores)
+        return (scores - low) / (high - low)
+    
+    def fuse(self,
+             candidates: Sequence[List[Tuple[Document, float]]],
+             k: int,
+             ids: Optional[Sequence[Sequence[Hashable]]] = None) -> List[Tuple[Document, float]]:
+        """
+        Fuse ranked candidate lists into a single top k list.
+        
+        Args:
+            candidates: One list of (document, score) pairs per sub-search,
+                best first, where a higher score is better
+            k: Number of results to return
+            ids: One sequence of candidate ids per list, identifying the same
+                chunk across lists (default: the page content)
+            
+        Returns:
+            List of (document, fused score) pairs, best first
+        """
+        
+        return [(doc, score) for doc, score, _ in self.fuse_with_ids(candidates, k, ids)]
+    
+    def fuse_with_ids(self,
+                      candidates: Sequence[List[Tuple[Document, float]]],
+                      k: int,
+                      ids: Optional[Sequence[Sequence[Hashable]]] = None) -> List[Tuple[Document, float, Hashable]]:
+        """
+        Fuse ranked candidate lists like ``fuse``, also returning the id of each result.
+        
+        Args:
+            candidates: One list of (document, score) pairs per sub-search,
+                best first, where a higher score is better
+            k: Number of results to return
+            ids: One sequence of candidate ids per list (default: the page content)
+            
+        Returns:
+            List of (document, fused score, id) triples, best first
+        """
+        
+        if ids is None:
+            ids = [[doc.page_content for doc, _ in results] for results in candidates]
+        
+        columns: Dict[Hashable, int] = {}
+        keys: List[Hashable] = []
+        documents: List[Document] = []
+        ranked_columns = []
+        
+        for results, result_ids in zip(candidates, ids):
+            cols = np.empty(len(results), dtype=np.int64)
+            for i, ((doc, _), key) in enumerate(zip(results, result_ids)):
+                col = columns.get(key)
+                if col is None:
+                    col = columns[key] = len(documents)
+                    keys.append(key)
+                    documents.append(doc)
+                cols[i] = col
+            ranked_columns.append(cols)
+        
+        fused = np.zeros(len(documents))
+        for weight, cols, results in zip(self.weights, ranked_columns, candidates):
+            scores = np.fromiter((score for _, score in results), dtype=np.float64, count=len(results))
+            contribution = np.zeros(len(documents))
+            # Duplicate chunks within one list count once, with their best score
+            np.maximum.at(contribution, cols, weight * self.normalize(scores))
+            fused += contribution
+        
+        top = top_k_indices(fused, k)
+        return [(documents[i], float(fused[i]), keys[i]) for i in top.tolist()]
+
+
 class PersistRetrievalChain(ABC):
     """
     Abstract base class for RAG search implementations.
@@ -297,28 +512,102 @@ class PersistRetrievalChain(ABC):
                 embedding_model: Model name for embeddings (default: OpenAI "text-embedding-3-small")
                 persist_directory: Directory to persist vector store
                 db_index_name: Index name of the vector store
+                keyword_index_name: Index name of the persisted keyword index
+                    (default: "<db_index_name>_bm25")
+                hybrid_fusion: Hybrid fusion method, "rrf" or "minmax" (default: "rrf")
+                hybrid_weights: Weights of the keyword and semantic scores (default: [0.5, 0.5])
+                hybrid_fetch_k: Candidates fetched per sub-search in hybrid search (default: 20)
+                mmr_lambda: Maximal marginal relevance trade-off applied to semantic and hybrid
+                    results, 1 ranks by relevance only; None disables the MMR stage (default: None)
+                mmr_fetch_k: Candidates the MMR stage selects from (default: 20)
+                filter_fields: Chunk metadata fields indexed at load for filtered search; empty
+                    disables filtering (default: ("source", "page", "images"))
+                query_cache_size: Query embeddings kept in memory, 0 disables the cache (default: 1024)
+                query_cache_path: SQLite file persisting query embeddings across restarts (default: None)
+                query_cache_disk_size: Maximum query embeddings kept on disk (default: 100000)
+                search_workers: Threads running CPU-bound search work for the async API (default: 4)
+                result_cache_backend: Search result cache backend, "memory", "sqlite" or None (default: None)
+                result_cache_size: Maximum cached result lists (default: 4096)
+                result_cache_ttl: Seconds a cached result list stays valid (default: 3600)
+                result_cache_path: SQLite file of the "sqlite" result cache backend
+                embedding_backend: Embedding backend, see rag.embeddings.create_embeddings (default: "upstage")
+                embedding_options: Options of the embedding backend (default: {})
+                query_embeddings: Query embedding model shared with other chains, used instead of
+                    creating one; it is left open when the chain is closed (default: None)
         """
         self.k = kwargs.get("k", 4)
         self.persist_directory = kwargs.get("persist_directory", None)
         self.split_docs = kwargs.get("split_docs", None)
         self.db_index_name = kwargs.get("db_index_name", None)
+        self.keyword_index_name = kwargs.get("keyword_index_name", None) or (
+            f"{self.db_index_name}_bm25" if self.db_index_name else None
+        )
+        self.hybrid_fusion = kwargs.get("hybrid_fusion", "rrf")
+        self.hybrid_weights = kwargs.get("hybrid_weights", [0.5, 0.5])
+        self.hybrid_fetch_k = kwargs.get("hybrid_fetch_k", 20)
+        self.mmr_lambda = kwargs.get("mmr_lambda", None)
+        self.mmr_fetch_k = kwargs.get("mmr_fetch_k", 20)
+        self.filter_fields = tuple(kwargs.get("filter_fields", DEFAULT_FILTER_FIELDS) or ())
+        self.query_cache_size = kwargs.get("query_cache_size", 1024)
+        self.query_cache_path = kwargs.get("query_cache_path", None)
+        self.query_cache_disk_size = kwargs.get("query_cache_disk_size", 100_000)
+        self.search_workers = kwargs.get("search_workers", 4)
+        self.result_cache_backend = kwargs.get("result_cache_backend", None)
+        self.result_cache_size = kwargs.get("result_cache_size", 4096)
+        self.result_cache_ttl = kwargs.get("result_cache_ttl", 3600)
+        self.result_cache_path = kwargs.get("result_cache_path", None)
+        self.embedding_backend = kwargs.get("embedding_backend", "upstage")
+        self.embedding_options = kwargs.get("embedding_options", None) or {}
+        self.shared_query_embeddings = kwargs.get("query_embeddings", None)
         self.embeddings = None
         self.vectorstore = None
         self.retrievers = None
+        self.hybrid_engine = None
+        self.index_version = None
+        self.result_cache = None
+        # Vector store rows that must never be returned (removed chunks), and FAISS search
+        # parameters skipping them, built by initialize()
+        self.tombstones = np.empty(0, dtype=np.int64)
+        self.live_search_params = None
+        # Whether keyword index ids are vector store rows, so MMR can read the vectors of keyword hits
+        self.keyword_ids_are_rows = False
+        # Metadata posting lists over vector store rows and over keyword index ids
+        # (one shared index when keyword ids are rows), built by initialize()
+        self.metadata_index = None
+        self.keyword_metadata_index = None
+        self._executor = None
     
     
     def create_query_embedding(self) -> Any:
         """
         Create an query embedding model instance.
         
+        Unless disabled, the model is wrapped in a query embedding cache so
+        repeated queries skip the embedding API.
+        
         Returns:
             An embeddings model instance
         """
-        embeddings = UpstageEmbeddings(
-            api_key=UPSTAGE_API_KEY,
-            model="solar-embedding-1-large-query"
-        )
-        return embeddings
+        embeddings = create_embeddings(self.embedding_backend, "query", **self.embedding_options)
+        return self.create_query_embedding_cache(embeddings)
+    
+    def create_query_embedding_cache(self, embeddings: Any) -> Any:
+        """
+        Wrap a query embedding model in a two-tier (memory + disk) cache.
+        
+        Args:
+            embeddings: Query embedding model instance
+            
+        Returns:
+            The cached embeddings, or the model itself if caching is disabled
+        """
+        if not self.query_cache_size and not self.query_cache_path:
+            return embeddings
+        
+        disk_store = None
+        if self.query_cache_path:
+            disk_store = SQLiteEmbeddingStore(self.query_cache_path, max_entries=self.query_cache_disk_size)
+        return CachedQueryEmbeddings(embeddings, max_size=self.query_cache_size, disk_store=disk_store)
     
     def create_passage_embedding(self) -> Any:
         """
@@ -327,11 +616,7 @@ class PersistRetrievalChain(ABC):
         Returns:
             An embeddings model instance
         """
-        embeddings = UpstageEmbeddings(
-            api_key=UPSTAGE_API_KEY,
-            model="solar-embedding-1-large-passage"
-        )
-        return embeddings
+        return create_embeddings(self.embedding_backend, "passage", **self.embedding_options)
     
     @abstractmethod
     def create_vectorstore(self) -> Any:
@@ -366,6 +651,10 @@ class PersistRetrievalChain(ABC):
         """
         Create a keyword-based search retriever.
         
+        The BM25 index is loaded (memory mapped) from the persist directory
+        when a valid one exists for these chunks; otherwise it is built and
+        persisted next to the vector store for the next start.
+        
         Args:
             split_docs: Split document chunks
             
@@ -373,26 +662,35 @@ class PersistRetrievalChain(ABC):
             A keyword search retriever
         """
 
-        return BM25Retriever.from_documents(split_docs, k=self.k)
+        if not self.persist_directory or not self.keyword_index_name:
+            return SparseBM25Retriever.from_documents(split_docs, k=self.k)
+
+        index_path = Path(self.persist_directory) / self.keyword_index_name
+        fingerprint = getattr(split_docs, "fingerprint", None) or corpus_fingerprint(
+            doc.page_content for doc in split_docs
+        )
+        index = BM25Index.load(index_path, fingerprint=fingerprint)
+        if index is not None:
+            print(f"Loading existing keyword index: {index_path}")
+        else:
+            print(f"Creating new keyword index: {index_path}")
+            index = BM25Index.from_texts(doc.page_content for doc in split_docs)
+            index.save(index_path)
+
+        return SparseBM25Retriever(index=index, docs=split_docs, k=self.k)
     
-    def create_hybrid_retriever(self, split_docs: List[Document], vectorstore: Any) -> BaseRetriever:
+    def create_hybrid_engine(self) -> HybridSearchEngine:
         """
-        Create a hybrid search retriever combining keyword and semantic search.
+        Create the engine fusing keyword and semantic search results.
         
-        Args:
-            split_docs: Split document chunks
-            vectorstore: Vector store instance
-            
         Returns:
-            A hybrid search retriever
+            A hybrid search engine
         """
 
-        bm25_retriever = self.create_keyword_retriever(split_docs)
-        dense_retriever = self.create_semantic_retriever(vectorstore)
-        
-        return EnsembleRetriever(
-            retrievers=[bm25_retriever, dense_retriever],
-            weights=[0.5, 0.5]
+        return HybridSearchEngine(
+            fusion=self.hybrid_fusion,
+            weights=self.hybrid_weights,
+            fetch_k=self.hybrid_fetch_k
         )
     
     def create_retrievers(self, split_docs: List[Document]) -> Dict[str, BaseRetriever]:
@@ -406,15 +704,60 @@ class PersistRetrievalChain(ABC):
             Dictionary of retrievers by search type
         """
 
-        self.embeddings = self.create_query_embedding()
+        self.embeddings = self.shared_query_embeddings or self.create_query_embedding()
         self.vectorstore = self.create_vectorstore()
+        self.hybrid_engine = self.create_hybrid_engine()
         
         return {
             "semantic": self.create_semantic_retriever(self.vectorstore),
-            "keyword": self.create_keyword_retriever(split_docs),
-            "hybrid": self.create_hybrid_retriever(split_docs, self.vectorstore)
+            "keyword": self.create_keyword_retriever(split_docs)
         }
     
+    def create_metadata_indexes(self) -> Tuple[Optional[MetadataIndex], Optional[MetadataIndex]]:
+        """
+        Index the metadata of the loaded chunks for filtered search.
+        
+        Removed rows (tombstones) are left out of the posting lists, so a
+        filtered search needs no over-fetch. When keyword index ids are not
+        vector store rows, the keyword documents get their own index.
+        
+        Returns:
+            Tuple of (vector store row index, keyword id index), both None if filtering is disabled
+        """
+
+        if not self.filter_fields:
+            return None, None
+        
+        keyword_docs = self.retrievers["keyword"].docs
+        if self.keyword_ids_are_rows:
+            index = MetadataIndex.build(keyword_docs, self.filter_fields, exclude=self.tombstones.tolist())
+            return index, index
+        
+        vectorstore = self.vectorstore
+        row_docs = (
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(vectorstore.index.ntotal)
+        )
+        return (
+            MetadataIndex.build(row_docs, self.filter_fields, exclude=self.tombstones.tolist()),
+            MetadataIndex.build(keyword_docs, self.filter_fields),
+        )
+    
+    def create_live_search_params(self) -> Optional[Any]:
+        """
+        Build FAISS search parameters that skip the removed rows (tombstones).
+        
+        Returns:
+            The search parameters, or None without tombstones or if the index
+            does not support ID selectors (then searches over-fetch instead)
+        """
+
+        if not self.tombstones.size:
+            return None
+        index = self.vectorstore.index
+        return selector_params(index.index if isinstance(index, RerankIndex) else index, self.tombstones,
+                               exclude=True)
+    
     def initialize(self) -> "PersistRetrievalChain":
         """
         Initialize the retrieval chain by loading documents, splitting them,
@@ -425,16 +768,136 @@ class PersistRetrievalChain(ABC):
         """
         self.retrievers = self.create_retrievers(self.split_docs)
         print("create_retrievers")
+        self.metadata_index, self.keyword_metadata_index = self.create_metadata_indexes()
+        self.live_search_params = self.create_live_search_params()
+        self.index_version = self.compute_index_version()
+        self.result_cache = self.create_result_cache()
         print(f"Initialization complete: {len(self.split_docs)} chunks created")
         return self
     
-    def search_semantic(self, query: str, k: Optional[int] = None) -> List[Document]:
+    def compute_index_version(self) -> str:
+        """
+        Derive a version identifier from the loaded vector and keyword indexes.
+        
+        The persisted index files (size and modification time), the number
+        of indexed vectors and the keyword index corpus fingerprint all feed
+        the version, so reloading either index yields a new one.
+        
+        Returns:
+            Index version identifier
+        """
+        digest = hashlib.sha256()
+        for path in self.index_artifact_paths():
+            if path.exists():
+                stat = path.stat()
+                digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        
+        index = getattr(self.vectorstore, "index", None)
+        digest.update(f"ntotal:{getattr(index, 'ntotal', 0)}".encode())
+        keyword_index = getattr(self.retrievers["keyword"], "index", None)
+        digest.update(f"keyword:{getattr(keyword_index, 'fingerprint', None)}".encode())
+        return digest.hexdigest()[:16]
+    
+    def index_artifact_paths(self) -> List[Path]:
+        """
+        Files of the persisted vector store that determine search results.
+        
+        Returns:
+            Paths of the vector store artifacts
+        """
+        if not self.persist_directory or not self.db_index_name:
+            return []
+        return [Path(self.persist_directory) / f"{self.db_index_name}{suffix}" for suffix in (".faiss", ".pkl")]
+    
+    def create_result_cache(self) -> Optional[SearchResultCache]:
+        """
+        Create the search result cache for the current index version.
+        
+        Returns:
+            A search result cache, or None if result caching is disabled
+            
+        Raises:
+            ValueError: If the backend is unknown or misconfigured
+        """
+        if not self.result_cache_backend:
+            return None
+        
+        if self.result_cache_backend == "memory":
+            backend = MemoryResultCache(max_entries=self.result_cache_size, ttl=self.result_cache_ttl)
+        elif self.result_cache_backend == "sqlite":
+            if not self.result_cache_path:
+                raise ValueError("result_cache_path is required for the sqlite result cache backend.")
+            backend = SQLiteResultCache(
+                self.result_cache_path,
+                max_entries=self.result_cache_size,
+                ttl=self.result_cache_ttl
+            )
+        else:
+            raise ValueError(f"Unknown result cache backend: {self.result_cache_backend}")
+        
+        return SearchResultCache(backend, self.index_version)
+    
+    @staticmethod
+    def _cache_mode(mode: str, mmr: Optional[Tuple[float, int]], filters: Optional[Dict[str, Any]] = None) -> str:
+        # Results diversified by MMR or restricted by a metadata filter are cached apart from plain ones
+        if mmr:
+            mode = f"{mode}:mmr={mmr[0]:g}/{mmr[1]}"
+        key = filter_key(filters)
+        return f"{mode}:filter={key}" if key else mode
+    
+    def _filter_scope(self, filters: Optional[Dict[str, Any]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        # (vector store rows, keyword index ids) matching a metadata filter, None without a filter
+        if not filters:
+            return None
+        if self.metadata_index is None:
+            raise ValueError("Metadata filtering is disabled: no filter_fields are indexed.")
+        rows = self.metadata_index.select(filters)
+        if self.keyword_metadata_index is self.metadata_index:
+            return rows, rows
+        return rows, self.keyword_metadata_index.select(filters)
+    
+    def _cached_search(self, mode: str, query: str, k: Optional[int], search_func: Any) -> List[Document]:
+        # Search the normalized query the cache key is built from, so equal keys mean equal results
+        query = normalize_query(query)
+        k = k or self.k
+        if self.result_cache is None:
+            return search_func(query, k)
+        docs = self.result_cache.get(query, mode, k)
+        if docs is None:
+            docs = search_func(query, k)
+            self.result_cache.set(query, mode, k, docs)
+        return docs
+    
+    async def _acached_search(self, mode: str, query: str, k: Optional[int], search_func: Any) -> List[Document]:
+        query = normalize_query(query)
+        k = k or self.k
+        cache = self.result_cache
+        if cache is None:
+            return await search_func(query, k)
+        if not cache.backend.blocking:
+            docs = cache.get(query, mode, k)
+            if docs is None:
+                docs = await search_func(query, k)
+                cache.set(query, mode, k, docs)
+            return docs
+        # SQLite reads and writes go through the search threads, never the event loop
+        docs = await self._run_in_executor(cache.get, query, mode, k)
+        if docs is None:
+            docs = await search_func(query, k)
+            await self._run_in_executor(cache.set, query, mode, k, docs)
+        return docs
+    
+    def search_semantic(self,
+                        query: str,
+                        k: Optional[int] = None,
+                        filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Perform semantic search on the loaded documents.
         
         Args:
             query: Search query
             k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
             
         Returns:
             Relevant documents
@@ -446,19 +909,22 @@ class PersistRetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        k = k or self.k
-        retriever = self.retrievers["semantic"]
-        retriever.search_kwargs["k"] = k
-        
-        return retriever.get_relevant_documents(query)
+        return self._cached_search(
+            self._cache_mode("semantic", self._mmr_settings(), filters), query, k,
+            lambda q, n: [doc for doc, _ in self.search_semantic_with_scores(q, n, filters)]
+        )
     
-    def search_keyword(self, query: str, k: Optional[int] = None) -> List[Document]:
+    def search_keyword(self,
+                       query: str,
+                       k: Optional[int] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Perform keyword-based search on the loaded documents.
         
         Args:
             query: Search query
-            k: Number of results to return (Note: BM25Retriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
             
         Returns:
             Relevant documents
@@ -470,18 +936,537 @@ class PersistRetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["keyword"].get_relevant_documents(query)
+        return self._cached_search(
+            self._cache_mode("keyword", None, filters), query, k,
+            lambda q, n: [doc for doc, _ in self.search_keyword_with_scores(q, n, filters)]
+        )
     
-    def search_hybrid(self, query: str, k: Optional[int] = None) -> List[Document]:
+    def search_semantic_with_scores(self,
+                                    query: str,
+                                    k: Optional[int] = None,
+                                    filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Perform semantic search and return similarity scores.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, score) pairs, best first, where a higher score is better
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        embedding = self._embed_query(query)
+        return self.search_semantic_by_vector(embedding, k, filters)
+    
+    def search_semantic_by_vector(self,
+                                  embedding: List[float],
+                                  k: Optional[int] = None,
+                                  filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Perform semantic search with an already computed query embedding.
+        
+        Args:
+            embedding: Query embedding
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, score) pairs, best first, where a higher score is better
+        """
+
+        return self.search_semantic_by_vectors([embedding], k, filters)[0]
+    
+    def search_semantic_by_vectors(self,
+                                   embeddings: List[List[float]],
+                                   k: Optional[int] = None,
+                                   filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Perform semantic search for several query embeddings in one FAISS call.
+        
+        With MMR enabled (``mmr_lambda``), ``mmr_fetch_k`` candidates are
+        fetched and k of them are selected by maximal marginal relevance.
+        With a metadata filter only the matching rows are searched
+        (see rag.ann.search_rows).
+        
+        Args:
+            embeddings: Query embeddings
+            k: Number of results to return per query, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            One list of (document, score) pairs per query, best first, where a higher score is better
+        """
+
+        if not embeddings:
+            return []
+        
+        k = k or self.k
+        mmr = self._mmr_settings()
+        scope = self._filter_scope(filters)
+        candidates = self._search_semantic_candidates(
+            embeddings, max(k, mmr[1]) if mmr else k, scope[0] if scope else None
+        )
+        if mmr is None:
+            return [results for results, _ in candidates]
+        return [
+            [results[i] for i in self._diversify(rows, np.array([score for _, score in results]), k, mmr[0])]
+            for results, rows in candidates
+        ]
+    
+    def _search_semantic_candidates(self,
+                                    embeddings: List[List[float]],
+                                    k: int,
+                                    rows: Optional[np.ndarray] = None) -> List[Tuple[List[Tuple[Document, float]], np.ndarray]]:
+        # (document, similarity) pairs and their vector store rows, per query; only among rows if given
+        with stage_timer("semantic"):
+            vectorstore = self.vectorstore
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            if getattr(vectorstore, "_normalize_L2", False):
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+            if rows is not None:
+                # Filtered rows never include tombstones
+                distances, ids = search_rows(vectorstore.index, vectors, k, rows)
+            elif self.live_search_params is not None:
+                # Tombstones are skipped inside the index, so their number does not add to the search cost
+                distances, ids = vectorstore.index.search(vectors, k, params=self.live_search_params)
+            else:
+                # Over-fetch by the number of tombstones so k live rows remain after filtering
+                distances, ids = vectorstore.index.search(vectors, k + self.tombstones.size)
+                if self.tombstones.size:
+                    ids[np.isin(ids, self.tombstones)] = -1
+        
+            candidates = []
+            for row_distances, row_ids in zip(distances, ids):
+                live = row_ids != -1
+                rows = row_ids[live][:k]
+                row = [
+                    (vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]), distance)
+                    for distance, i in zip(row_distances[live][:k].tolist(), rows.tolist())
+                ]
+                candidates.append((self._to_similarity(row), rows))
+            return candidates
+    
+    def _to_similarity(self, results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        # FAISS returns distances for L2 indexes (lower is better); flip them
+        strategy = getattr(self.vectorstore, "distance_strategy", DistanceStrategy.EUCLIDEAN_DISTANCE)
+        if strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return [(doc, float(score)) for doc, score in results]
+        return [(doc, -float(score)) for doc, score in results]
+    
+    def _mmr_settings(self,
+                      mmr_lambda: Optional[float] = None,
+                      mmr_fetch_k: Optional[int] = None) -> Optional[Tuple[float, int]]:
+        # (lambda, fetch_k) of the MMR stage, None when it is off; call arguments override the chain settings
+        lambda_mult = self.mmr_lambda if mmr_lambda is None else mmr_lambda
+        if lambda_mult is None:
+            return None
+        if not 0.0 <= lambda_mult <= 1.0:
+            raise ValueError(f"MMR lambda must be between 0 and 1, got {lambda_mult}.")
+        if lambda_mult == 1.0:
+            return None
+        return float(lambda_mult), mmr_fetch_k or self.mmr_fetch_k
+    
+    def _diversify(self, rows: np.ndarray, relevance: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+        # Indices of the candidates MMR selects; candidates without a row (-1) have no vector
+        with stage_timer("mmr"):
+            index = self.vectorstore.index
+            known = rows >= 0
+            vectors = np.zeros((rows.shape[0], index.d), dtype=np.float32)
+            vectors[known] = reconstruct_rows(index, rows[known])
+            return mmr_select(relevance, vectors, k, lambda_mult).tolist()
+    
+    def search_keyword_with_scores(self,
+                                   query: str,
+                                   k: Optional[int] = None,
+                                   filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Perform keyword-based search and return BM25 scores.
+        
+        With a metadata filter, only the matching documents are scored.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, score) pairs, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        scope = self._filter_scope(filters)
+        with stage_timer("keyword"):
+            return self.retrievers["keyword"].search_with_scores(query, k or self.k, scope[1] if scope else None)
+    
+    def search_hybrid_with_scores(self,
+                                  query: str,
+                                  k: Optional[int] = None,
+                                  mmr_lambda: Optional[float] = None,
+                                  mmr_fetch_k: Optional[int] = None,
+                                  filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Perform hybrid search (keyword + semantic) and return fused scores.
+        
+        Both sub-searches over-fetch a candidate pool once, and the fused
+        ranking is cut to exactly k results. With MMR, the top ``mmr_fetch_k``
+        fused candidates are re-ranked by maximal marginal relevance over
+        their stored vectors and k of them are returned.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, fused score) pairs, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        k = k or self.k
+        mmr = self._mmr_settings(mmr_lambda, mmr_fetch_k)
+        scope = self._filter_scope(filters)
+        keyword_candidates = self._search_keyword_candidates([query], self._hybrid_fetch_k(k, mmr), scope)
+        embedding = self._embed_query(query)
+        return self._fuse_hybrid(keyword_candidates[0], embedding, k, mmr, scope)
+    
+    def _hybrid_fetch_k(self, k: int, mmr: Optional[Tuple[float, int]]) -> int:
+        return self.hybrid_engine.candidate_pool_size(max(k, mmr[1]) if mmr else k)
+    
+    def _fuse_hybrid(self,
+                     keyword_candidates: Tuple[List[Tuple[Document, float]], np.ndarray],
+                     embedding: List[float],
+                     k: int,
+                     mmr: Optional[Tuple[float, int]] = None,
+                     scope: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Tuple[Document, float]]:
+        return self._fuse_hybrid_batch([keyword_candidates], [embedding], k, mmr, scope)[0]
+    
+    def _fuse_hybrid_batch(self,
+                           keyword_candidates: List[Tuple[List[Tuple[Document, float]], np.ndarray]],
+                           embeddings: List[List[float]],
+                           k: int,
+                           mmr: Optional[Tuple[float, int]] = None,
+                           scope: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[List[Tuple[Document, float]]]:
+        semantic_candidates = self._search_semantic_candidates(
+            embeddings, self._hybrid_fetch_k(k, mmr), scope[0] if scope else None
+        )
+        pool_size = max(k, mmr[1]) if mmr else k
+        with stage_timer("fuse"):
+            if self.keyword_ids_are_rows:
+                # Key by row, so distinct chunks with the same text stay apart
+                fused = [
+                    self.hybrid_engine.fuse_with_ids(
+                        [keyword, semantic], pool_size, [keyword_rows.tolist(), semantic_rows.tolist()]
+                    )
+                    for (keyword, keyword_rows), (semantic, semantic_rows) in zip(keyword_candidates, semantic_candidates)
+                ]
+            else:
+                fused = [
+                    self.hybrid_engine.fuse_with_ids([keyword, semantic], pool_size)
+                    for (keyword, _), (semantic, _) in zip(keyword_candidates, semantic_candidates)
+                ]
+        if mmr is None:
+            return [[(doc, score) for doc, score, _ in pool] for pool in fused]
+        
+        results = []
+        for pool, semantic in zip(fused, semantic_candidates):
+            if self.keyword_ids_are_rows:
+                rows = np.array([row for _, _, row in pool], dtype=np.int64)
+            else:
+                # Keyword hits have no row; semantic hits give the rows of their page content
+                row_of = {}
+                for (doc, _), row in zip(semantic[0], semantic[1].tolist()):
+                    row_of.setdefault(doc.page_content, row)
+                rows = np.array([row_of.get(key, -1) for _, _, key in pool], dtype=np.int64)
+            relevance = np.array([score for _, score, _ in pool])
+            results.append([pool[i][:2] for i in self._diversify(rows, relevance, k, mmr[0])])
+        return results
+    
+    def _search_keyword_candidates(self,
+                                   queries: List[str],
+                                   k: int,
+                                   scope: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Tuple[List[Tuple[Document, float]], np.ndarray]]:
+        # (document, BM25 score) pairs and their vector store rows (-1 if unknown), per query
+        retriever = self.retrievers["keyword"]
+        with stage_timer("keyword"):
+            hits = retriever.index.search_batch(queries, k, scope[1] if scope else None)
+        return [
+            (
+                [(retriever.docs[i], float(score)) for i, score in zip(ids.tolist(), scores.tolist())],
+                ids if self.keyword_ids_are_rows else np.full(ids.shape[0], -1, dtype=np.int64),
+            )
+            for ids, scores in hits
+        ]
+    
+    def _embed_query(self, query: str) -> List[float]:
+        with stage_timer("embed"):
+            return self.embeddings.embed_query(query)
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        with stage_timer("embed"):
+            return embed_queries(self.embeddings, queries)
+    
+    async def _aembed_query(self, query: str) -> List[float]:
+        with stage_timer("embed"):
+            return await self.embeddings.aembed_query(query)
+    
+    async def _aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        with stage_timer("embed"):
+            return await aembed_queries(self.embeddings, queries)
+    
+    def search_hybrid_batch_with_scores(self,
+                                        queries: List[str],
+                                        k: Optional[int] = None,
+                                        mmr_lambda: Optional[float] = None,
+                                        mmr_fetch_k: Optional[int] = None,
+                                        filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Perform hybrid search for several queries at once.
+        
+        All queries are embedded in one request, searched with one
+        multi-row FAISS call and scored with one vectorized BM25 pass.
+        
+        Args:
+            queries: Search queries
+            k: Number of results to return per query, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            One list of (document, fused score) pairs per query, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        return self.search_hybrid_batch_by_vectors(
+            queries, self._embed_queries(queries), k, mmr_lambda, mmr_fetch_k, filters
+        )
+    
+    def search_hybrid_batch_by_vectors(self,
+                                       queries: List[str],
+                                       embeddings: List[List[float]],
+                                       k: Optional[int] = None,
+                                       mmr_lambda: Optional[float] = None,
+                                       mmr_fetch_k: Optional[int] = None,
+                                       filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Perform hybrid search for several queries with already computed query embeddings.
+        
+        Only does local work (BM25 scoring, FAISS search and fusion).
+        
+        Args:
+            queries: Search queries
+            embeddings: Query embeddings, one per query
+            k: Number of results to return per query, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            One list of (document, fused score) pairs per query, best first
+        """
+
+        k = k or self.k
+        mmr = self._mmr_settings(mmr_lambda, mmr_fetch_k)
+        scope = self._filter_scope(filters)
+        keyword_candidates = self._search_keyword_candidates(queries, self._hybrid_fetch_k(k, mmr), scope)
+        return self._fuse_hybrid_batch(keyword_candidates, embeddings, k, mmr, scope)
+    
+    def search_hybrid_batch(self,
+                            queries: List[str],
+                            k: Optional[int] = None,
+                            mmr_lambda: Optional[float] = None,
+                            mmr_fetch_k: Optional[int] = None,
+                            filters: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        """
+        Perform hybrid search for several queries at once.
+        
+        Args:
+            queries: Search queries
+            k: Number of results to return per query, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            Relevant documents grouped by query, with the fused score in metadata["score"]
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        return [
+            self._with_score_metadata(results)
+            for results in self.search_hybrid_batch_with_scores(queries, k, mmr_lambda, mmr_fetch_k, filters)
+        ]
+    
+    @staticmethod
+    def _with_score_metadata(results: List[Tuple[Document, float]]) -> List[Document]:
+        return [
+            Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+            for doc, score in results
+        ]
+    
+    def search_hybrid(self,
+                      query: str,
+                      k: Optional[int] = None,
+                      mmr_lambda: Optional[float] = None,
+                      mmr_fetch_k: Optional[int] = None,
+                      filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
         Perform hybrid search (keyword + semantic) on the loaded documents.
         
         Args:
             query: Search query
-            k: Number of results to return (Note: EnsembleRetriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            Relevant documents, with the fused score in metadata["score"]
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        mode = self._cache_mode("hybrid", self._mmr_settings(mmr_lambda, mmr_fetch_k), filters)
+        return self._cached_search(
+            mode, query, k,
+            lambda q, n: self._with_score_metadata(
+                self.search_hybrid_with_scores(q, n, mmr_lambda, mmr_fetch_k, filters)
+            )
+        )
+    
+    def search(self, query: str, k: Optional[int] = None, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Default search method that uses semantic search.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
             
         Returns:
             Relevant documents
+        """
+        
+        return self.search_semantic(query, k, filters)
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Bounded thread pool running CPU-bound search work (FAISS, BM25, fusion)
+        for the async API, so it never blocks the event loop.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.search_workers,
+                thread_name_prefix="rag-search"
+            )
+        return self._executor
+    
+    def close(self) -> None:
+        """
+        Release the resources of the chain: search threads, cache connections
+        and the loaded indexes. The chain cannot be used afterwards.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self.result_cache is not None:
+            self.result_cache.backend.close()
+        disk_store = getattr(self.embeddings, "disk_store", None)
+        if disk_store is not None and self.embeddings is not self.shared_query_embeddings:
+            disk_store.close()
+        self.vectorstore = None
+        self.retrievers = None
+        self.metadata_index = None
+        self.keyword_metadata_index = None
+        self.result_cache = None
+        self.split_docs = None
+    
+    def memory_usage(self) -> int:
+        """
+        Estimate the memory held by the loaded indexes and chunks, in bytes.
+        
+        Counts the vector index, the keyword index arrays, the metadata
+        posting lists and the in-memory chunk texts; memory mapped files are
+        not counted.
+        
+        Returns:
+            Approximate size in bytes
+        """
+
+        size = 0
+        index = getattr(self.vectorstore, "index", None)
+        if index is not None:
+            size += index_memory_usage(index)
+        
+        keyword_index = getattr((self.retrievers or {}).get("keyword"), "index", None)
+        for array in vars(keyword_index).values() if keyword_index is not None else ():
+            if isinstance(array, np.ndarray) and not isinstance(array, np.memmap):
+                size += array.nbytes
+        for metadata_index in {id(index): index for index in (self.metadata_index, self.keyword_metadata_index)
+                               if index is not None}.values():
+            size += metadata_index.nbytes
+        
+        docstore = getattr(getattr(self.vectorstore, "docstore", None), "_dict", None) or {}
+        docs = list(docstore.values())
+        if isinstance(self.split_docs, list):
+            docs.extend(self.split_docs)
+        seen = set()
+        for doc in docs:
+            if id(doc) not in seen:
+                seen.add(id(doc))
+                size += sys.getsizeof(doc.page_content)
+        return size
+    
+    async def _run_in_executor(self, func: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+    
+    async def asearch_semantic_with_scores(self,
+                                           query: str,
+                                           k: Optional[int] = None,
+                                           filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Asynchronously perform semantic search and return similarity scores.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, score) pairs, best first, where a higher score is better
             
         Raises:
             ValueError: If the retrieval chain is not initialized
@@ -490,18 +1475,161 @@ class PersistRetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["hybrid"].get_relevant_documents(query)
+        embedding = await self._aembed_query(query)
+        return await self._run_in_executor(self.search_semantic_by_vector, embedding, k, filters)
     
-    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+    async def asearch_semantic(self,
+                               query: str,
+                               k: Optional[int] = None,
+                               filters: Optional[Dict[str, Any]] = None) -> List[Document]:
         """
-        Default search method that uses semantic search.
+        Asynchronously perform semantic search on the loaded documents.
         
         Args:
             query: Search query
             k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
             
         Returns:
             Relevant documents
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        async def search(q: str, n: int) -> List[Document]:
+            return [doc for doc, _ in await self.asearch_semantic_with_scores(q, n, filters)]
+        
+        return await self._acached_search(self._cache_mode("semantic", self._mmr_settings(), filters), query, k, search)
+    
+    async def asearch_keyword(self,
+                              query: str,
+                              k: Optional[int] = None,
+                              filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Asynchronously perform keyword-based search on the loaded documents.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            Relevant documents
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        async def search(q: str, n: int) -> List[Document]:
+            results = await self._run_in_executor(self.search_keyword_with_scores, q, n, filters)
+            return [doc for doc, _ in results]
+        
+        return await self._acached_search(self._cache_mode("keyword", None, filters), query, k, search)
+    
+    async def asearch_hybrid_with_scores(self,
+                                         query: str,
+                                         k: Optional[int] = None,
+                                         mmr_lambda: Optional[float] = None,
+                                         mmr_fetch_k: Optional[int] = None,
+                                         filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """
+        Asynchronously perform hybrid search and return fused scores.
+        
+        The query embedding request and BM25 scoring run concurrently.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            List of (document, fused score) pairs, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        k = k or self.k
+        mmr = self._mmr_settings(mmr_lambda, mmr_fetch_k)
+        scope = self._filter_scope(filters)
+        keyword_candidates, embedding = await asyncio.gather(
+            self._run_in_executor(self._search_keyword_candidates, [query], self._hybrid_fetch_k(k, mmr), scope),
+            self._aembed_query(query),
+        )
+        return await self._run_in_executor(self._fuse_hybrid, keyword_candidates[0], embedding, k, mmr, scope)
+    
+    async def asearch_hybrid(self,
+                             query: str,
+                             k: Optional[int] = None,
+                             mmr_lambda: Optional[float] = None,
+                             mmr_fetch_k: Optional[int] = None,
+                             filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Asynchronously perform hybrid search (keyword + semantic) on the loaded documents.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            Relevant documents, with the fused score in metadata["score"]
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        async def search(q: str, n: int) -> List[Document]:
+            return self._with_score_metadata(
+                await self.asearch_hybrid_with_scores(q, n, mmr_lambda, mmr_fetch_k, filters)
+            )
+        
+        mode = self._cache_mode("hybrid", self._mmr_settings(mmr_lambda, mmr_fetch_k), filters)
+        return await self._acached_search(mode, query, k, search)
+    
+    async def asearch_hybrid_batch(self,
+                                   queries: List[str],
+                                   k: Optional[int] = None,
+                                   mmr_lambda: Optional[float] = None,
+                                   mmr_fetch_k: Optional[int] = None,
+                                   filters: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
         """
+        Asynchronously perform hybrid search for several queries at once.
         
-        return self.search_semantic(query, k)
\ No newline at end of file
+        Args:
+            queries: Search queries
+            k: Number of results to return per query, overrides self.k
+            mmr_lambda: MMR trade-off for this call, 1 ranks by relevance only (default: self.mmr_lambda)
+            mmr_fetch_k: Candidates MMR selects from (default: self.mmr_fetch_k)
+            filters: Metadata filter applied before scoring, e.g. {"source": "a.pdf", "page": [0, 1]}
+            
+        Returns:
+            Relevant documents grouped by query, with the fused score in metadata["score"]
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        k = k or self.k
+        mmr = self._mmr_settings(mmr_lambda, mmr_fetch_k)
+        scope = self._filter_scope(filters)
+        keyword_candidates, embeddings = await asyncio.gather(
+            self._run_in_executor(self._search_keyword_candidates, queries, self._hybrid_fetch_k(k, mmr), scope),
+            self._aembed_queries(queries),
+        )
+        results = await self._run_in_executor(self._fuse_hybrid_batch, keyword_candidates, embeddings, k, mmr, scope)
+        return [self._with_score_metadata(group) for group in results]
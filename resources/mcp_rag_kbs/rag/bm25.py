@@ -0,0 +1,632 @@
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from rag.storage import atomic_directory, load_directory, update_fingerprint
+
+# Bump when the on-disk layout written by BM25Index.save changes
+BM25_FORMAT_VERSION = 2
+BM25_META_FILE = "meta.json"
+BM25_ARRAYS = ("indptr", "indices", "data", "tfs", "doc_lens", "deleted")
+
+
+def default_preprocessing_func(text: str) -> List[str]:
+    """
+    Default tokenizer, identical to the one used by LangChain's BM25Retriever.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of whitespace separated tokens
+    """
+
+    return text.split()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the k highest scores in descending score order.
+
+    Uses a partial sort (argpartition) so the cost is O(n + k log k)
+    instead of sorting the whole score array.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Indices of the top k scores
+    """
+
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _tokenize(texts: Iterable[str],
+              preprocess_func: Callable[[str], List[str]],
+              vocabulary: Dict[str, int],
+              digest: Any,
+              doc_offset: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Document-major postings (term id, doc id, term frequency) and document lengths;
+    # new terms are added to vocabulary and every text is fed to the fingerprint digest
+    term_ids: List[int] = []
+    doc_ids: List[int] = []
+    tfs: List[int] = []
+    doc_lens: List[int] = []
+
+    for doc_id, text in enumerate(texts, start=doc_offset):
+        update_fingerprint(digest, text)
+        tokens = preprocess_func(text)
+        doc_lens.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            term_id = vocabulary.setdefault(term, len(vocabulary))
+            term_ids.append(term_id)
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+
+    return (
+        np.asarray(term_ids, dtype=np.int64),
+        np.asarray(doc_ids, dtype=np.int32),
+        np.asarray(tfs, dtype=np.int32),
+        np.asarray(doc_lens, dtype=np.int32),
+    )
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index stored as a CSR term-document matrix.
+
+    Row ``t`` of the matrix holds the documents containing term ``t`` and
+    their precomputed BM25 term weights, so scoring a query only touches the
+    postings of the query terms and is done with vectorized NumPy operations.
+    Scores are identical to ``rank_bm25.BM25Okapi`` with the same parameters.
+
+    Raw term frequencies and document lengths are kept next to the weights,
+    so ``append`` and ``remove`` only tokenize the changed documents and
+    refresh the corpus statistics with one vectorized pass.
+    """
+
+    def __init__(self,
+                 indptr: np.ndarray,
+                 indices: np.ndarray,
+                 data: np.ndarray,
+                 vocabulary: Dict[str, int],
+                 num_docs: int,
+                 preprocess_func: Callable[[str], List[str]] = default_preprocessing_func,
+                 params: Optional[Dict[str, float]] = None,
+                 fingerprint: Optional[str] = None,
+                 tfs: Optional[np.ndarray] = None,
+                 doc_lens: Optional[np.ndarray] = None,
+                 deleted: Optional[np.ndarray] = None) -> None:
+        """
+        Initialize a BM25 index from its CSR arrays.
+
+        Args:
+            indptr: Row pointer array of length ``len(vocabulary) + 1``
+            indices: Document id of every posting
+            data: Precomputed BM25 weight of every posting
+            vocabulary: Mapping from term to row id
+            num_docs: Number of indexed documents, including removed ones
+            preprocess_func: Tokenizer applied to queries
+            params: BM25 parameters the weights were computed with
+            fingerprint: Fingerprint of the indexed corpus
+            tfs: Term frequency of every posting, required by append and remove
+            doc_lens: Token count of every document, required by append and remove
+            deleted: Mask of removed documents, which are never returned
+        """
+
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.vocabulary = vocabulary
+        self.num_docs = num_docs
+        self.preprocess_func = preprocess_func
+        self.params = params or {}
+        self.fingerprint = fingerprint
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.deleted = deleted if deleted is not None else np.zeros(num_docs, dtype=bool)
+
+    @classmethod
+    def from_texts(cls,
+                   texts: Iterable[str],
+                   preprocess_func: Callable[[str], List[str]] = default_preprocessing_func,
+                   k1: float = 1.5,
+                   b: float = 0.75,
+                   epsilon: float = 0.25) -> "BM25Index":
+        """
+        Build a BM25 index from raw texts.
+
+        Args:
+            texts: Texts to index, one per document
+            preprocess_func: Tokenizer applied to texts and queries
+            k1: BM25 term frequency saturation parameter
+            b: BM25 length normalization parameter
+            epsilon: Floor for negative IDF values, as a fraction of the average IDF
+
+        Returns:
+            A BM25 index instance
+        """
+
+        vocabulary: Dict[str, int] = {}
+        digest = hashlib.sha256()
+        term_arr, doc_arr, tf_arr, doc_len = _tokenize(texts, preprocess_func, vocabulary, digest)
+
+        return cls._from_postings(
+            term_arr,
+            doc_arr,
+            tf_arr,
+            doc_len,
+            np.zeros(doc_len.shape[0], dtype=bool),
+            vocabulary=vocabulary,
+            preprocess_func=preprocess_func,
+            params={"k1": k1, "b": b, "epsilon": epsilon},
+            fingerprint=digest.hexdigest(),
+        )
+
+    @classmethod
+    def _from_postings(cls,
+                       term_arr: np.ndarray,
+                       doc_arr: np.ndarray,
+                       tf_arr: np.ndarray,
+                       doc_len: np.ndarray,
+                       deleted: np.ndarray,
+                       vocabulary: Dict[str, int],
+                       preprocess_func: Callable[[str], List[str]],
+                       params: Dict[str, float],
+                       fingerprint: str) -> "BM25Index":
+        k1, b, epsilon = params["k1"], params["b"], params["epsilon"]
+        num_docs = doc_len.shape[0]
+        num_live = num_docs - int(deleted.sum())
+        num_terms = len(vocabulary)
+        tf_float = tf_arr.astype(np.float64)
+        doc_len_float = doc_len.astype(np.float64)
+
+        # IDF, matching rank_bm25.BM25Okapi over the live documents; terms left
+        # without live documents by remove() keep their id but stay out of the floor
+        df = np.bincount(term_arr, minlength=num_terms)
+        idf = np.log(num_live - df + 0.5) - np.log(df + 0.5)
+        if df.any():
+            idf[idf < 0] = epsilon * idf[df > 0].mean()
+
+        live_len = doc_len_float[~deleted]
+        avgdl = live_len.mean() if num_live and live_len.sum() else 1.0
+        norm = k1 * (1 - b + b * doc_len_float[doc_arr] / avgdl)
+        weights = idf[term_arr] * tf_float * (k1 + 1) / (tf_float + norm)
+
+        # Postings are collected document-major; reorder them term-major for CSR
+        order = np.argsort(term_arr, kind="stable")
+        indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        return cls(
+            indptr=indptr,
+            indices=doc_arr[order],
+            data=weights[order].astype(np.float32),
+            vocabulary=vocabulary,
+            num_docs=num_docs,
+            preprocess_func=preprocess_func,
+            params=params,
+            fingerprint=fingerprint,
+            tfs=tf_arr[order],
+            doc_lens=doc_len,
+            deleted=deleted,
+        )
+
+    def _postings(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.tfs is None or self.doc_lens is None:
+            raise ValueError("This BM25 index has no term frequencies; rebuild it with BM25Index.from_texts.")
+        term_arr = np.repeat(np.arange(len(self.vocabulary), dtype=np.int64), np.diff(self.indptr))
+        return term_arr, np.asarray(self.indices), np.asarray(self.tfs)
+
+    def append(self, texts: Iterable[str]) -> "BM25Index":
+        """
+        Return a new index with documents appended after the existing ones.
+
+        Only the new texts are tokenized; the weights of every posting are
+        then refreshed in one vectorized pass, since the IDF and average
+        document length change with the corpus.
+
+        Args:
+            texts: Texts to add, getting ids ``num_docs``, ``num_docs + 1``, ...
+
+        Returns:
+            The updated BM25 index
+        """
+
+        term_arr, doc_arr, tf_arr = self._postings()
+        vocabulary = dict(self.vocabulary)
+        digest = hashlib.sha256(f"{self.fingerprint}:append".encode())
+        new_terms, new_docs, new_tfs, new_lens = _tokenize(
+            texts, self.preprocess_func, vocabulary, digest, doc_offset=self.num_docs
+        )
+
+        return self._from_postings(
+            np.concatenate([term_arr, new_terms]),
+            np.concatenate([doc_arr, new_docs]),
+            np.concatenate([tf_arr, new_tfs]),
+            np.concatenate([np.asarray(self.doc_lens), new_lens]),
+            np.concatenate([np.asarray(self.deleted, dtype=bool), np.zeros(new_lens.shape[0], dtype=bool)]),
+            vocabulary=vocabulary,
+            preprocess_func=self.preprocess_func,
+            params=self.params,
+            fingerprint=digest.hexdigest(),
+        )
+
+    def remove(self, doc_ids: Iterable[int]) -> "BM25Index":
+        """
+        Return a new index with documents removed.
+
+        Removed documents keep their ids (so ids stay aligned with the
+        vector store) but lose their postings and are never returned.
+
+        Args:
+            doc_ids: Ids of the documents to remove
+
+        Returns:
+            The updated BM25 index
+        """
+
+        doc_ids = np.unique(np.asarray(list(doc_ids), dtype=np.int64))
+        term_arr, doc_arr, tf_arr = self._postings()
+        deleted = np.array(self.deleted, dtype=bool)
+        deleted[doc_ids] = True
+        keep = ~deleted[doc_arr]
+        doc_lens = np.array(self.doc_lens)
+        doc_lens[doc_ids] = 0
+
+        digest = hashlib.sha256(f"{self.fingerprint}:remove:".encode())
+        digest.update(doc_ids.tobytes())
+
+        return self._from_postings(
+            term_arr[keep],
+            doc_arr[keep],
+            tf_arr[keep],
+            doc_lens,
+            deleted,
+            vocabulary=dict(self.vocabulary),
+            preprocess_func=self.preprocess_func,
+            params=self.params,
+            fingerprint=digest.hexdigest(),
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Persist the index to a directory.
+
+        The CSR arrays are written as ``.npy`` files so they can be memory
+        mapped by ``load``. The directory is replaced atomically, so readers
+        never observe a partially written index.
+
+        Args:
+            path: Target directory
+        """
+
+        terms = [None] * len(self.vocabulary)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+
+        meta = {
+            "format_version": BM25_FORMAT_VERSION,
+            "num_docs": self.num_docs,
+            "fingerprint": self.fingerprint,
+            "tokenizer": getattr(self.preprocess_func, "__qualname__", repr(self.preprocess_func)),
+            "params": self.params,
+            "vocabulary": terms,
+        }
+
+        with atomic_directory(path) as tmp_path:
+            for name in BM25_ARRAYS:
+                np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+            with open(tmp_path / BM25_META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls,
+             path: Union[str, Path],
+             preprocess_func: Callable[[str], List[str]] = default_preprocessing_func,
+             fingerprint: Optional[str] = None,
+             mmap: bool = True) -> Optional["BM25Index"]:
+        """
+        Load an index written by ``save``.
+
+        Args:
+            path: Index directory
+            preprocess_func: Tokenizer applied to queries, must match the one used at build time
+            fingerprint: Expected corpus fingerprint; a mismatch makes the index stale
+            mmap: Memory map the CSR arrays instead of reading them into memory
+
+        Returns:
+            The loaded index, or None if it is missing, stale or of another format version
+        """
+
+        return load_directory(path, lambda directory: cls._load(directory, preprocess_func, fingerprint, mmap))
+
+    @classmethod
+    def _load(cls,
+              path: Path,
+              preprocess_func: Callable[[str], List[str]],
+              fingerprint: Optional[str],
+              mmap: bool) -> Optional["BM25Index"]:
+        meta_path = path / BM25_META_FILE
+        if not meta_path.exists():
+            return None
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        tokenizer = getattr(preprocess_func, "__qualname__", repr(preprocess_func))
+        if meta.get("format_version") != BM25_FORMAT_VERSION or meta.get("tokenizer") != tokenizer:
+            return None
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            return None
+
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in BM25_ARRAYS
+        }
+        vocabulary = {term: term_id for term_id, term in enumerate(meta["vocabulary"])}
+
+        return cls(
+            vocabulary=vocabulary,
+            num_docs=meta["num_docs"],
+            preprocess_func=preprocess_func,
+            params=meta.get("params"),
+            fingerprint=meta.get("fingerprint"),
+            **arrays,
+        )
+
+    def query_term_ids(self, query: str) -> np.ndarray:
+        """
+        Tokenize a query and map its tokens to row ids.
+
+        Repeated tokens are kept so they are counted once per occurrence,
+        and out-of-vocabulary tokens are dropped.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Array of row ids
+        """
+
+        vocabulary = self.vocabulary
+        return np.asarray(
+            [vocabulary[token] for token in self.preprocess_func(query) if token in vocabulary],
+            dtype=np.int64,
+        )
+
+    def get_scores(self, query: str, doc_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Compute the BM25 score of every document for a query.
+
+        Args:
+            query: Search query
+            doc_ids: Sorted ids of the only documents to score (default: all)
+
+        Returns:
+            Array of ``num_docs`` scores, or one score per id of ``doc_ids``
+        """
+
+        return self.get_scores_batch([query], doc_ids)[0]
+
+    def get_scores_batch(self, queries: List[str], doc_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Compute the BM25 scores of every document for several queries at once.
+
+        The postings of all query terms are gathered and accumulated in a
+        single vectorized pass, without a Python loop over postings. With
+        ``doc_ids``, only the postings of those documents are gathered
+        (see ``_scoped_postings``) and the scores are laid out over
+        ``doc_ids``, so a small scope costs little however large the corpus.
+
+        Args:
+            queries: Search queries
+            doc_ids: Sorted ids of the only documents to score (default: all)
+
+        Returns:
+            Array of shape ``(len(queries), num_docs)``, or ``(len(queries), len(doc_ids))``
+        """
+
+        width = self.num_docs if doc_ids is None else doc_ids.shape[0]
+        query_term_ids = [self.query_term_ids(query) for query in queries]
+        term_ids = np.concatenate(query_term_ids) if query_term_ids else np.empty(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(queries)), [ids.size for ids in query_term_ids])
+
+        if doc_ids is not None:
+            positions, columns, rows = self._scoped_postings(term_ids, rows, doc_ids)
+        else:
+            starts = self.indptr[term_ids]
+            lengths = self.indptr[term_ids + 1] - starts
+            total = int(lengths.sum())
+            # Positions of every posting of every query term
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            positions = offsets + np.arange(total)
+            columns = self.indices[positions]
+            rows = np.repeat(rows, lengths)
+        if positions.size == 0:
+            return np.zeros((len(queries), width), dtype=np.float64)
+
+        scores = np.bincount(
+            rows * width + columns,
+            weights=self.data[positions],
+            minlength=len(queries) * width,
+        )
+        return scores.reshape(len(queries), width)
+
+    def _scoped_postings(self,
+                         term_ids: np.ndarray,
+                         rows: np.ndarray,
+                         doc_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Positions, doc_ids columns and query rows of the postings of term_ids that belong to doc_ids.
+        # The postings of a term are sorted by document, so each term is intersected with doc_ids by
+        # binary search over the longer of the two: O(min(m log p, p log m)) for m ids and p postings.
+        positions, columns, owners = [], [], []
+        for row, term in zip(rows.tolist(), term_ids.tolist()):
+            start, end = int(self.indptr[term]), int(self.indptr[term + 1])
+            if end == start or doc_ids.size == 0:
+                continue
+            docs = self.indices[start:end]
+            if end - start > doc_ids.size:
+                found = np.minimum(np.searchsorted(docs, doc_ids), end - start - 1)
+                hit = np.flatnonzero(docs[found] == doc_ids)
+                positions.append(start + found[hit])
+                columns.append(hit)
+            else:
+                slots = np.minimum(np.searchsorted(doc_ids, docs), doc_ids.size - 1)
+                hit = np.flatnonzero(doc_ids[slots] == docs)
+                positions.append(start + hit)
+                columns.append(slots[hit])
+            owners.append(np.full(hit.size, row, dtype=np.int64))
+        if not positions:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        return np.concatenate(positions), np.concatenate(columns), np.concatenate(owners)
+
+    def search(self, query: str, k: int, doc_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the top k documents for a query.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            doc_ids: Sorted ids of the only documents to search (default: all)
+
+        Returns:
+            Tuple of (document ids, scores), best first
+        """
+
+        return self._top_k(self.get_scores(query, doc_ids), k, doc_ids)
+
+    def search_batch(self,
+                     queries: List[str],
+                     k: int,
+                     doc_ids: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Return the top k documents for each of several queries.
+
+        Args:
+            queries: Search queries
+            k: Number of results to return per query
+            doc_ids: Sorted ids of the only documents to search (default: all)
+
+        Returns:
+            One (document ids, scores) tuple per query, best first
+        """
+
+        return [self._top_k(scores, k, doc_ids) for scores in self.get_scores_batch(queries, doc_ids)]
+
+    def _top_k(self,
+               scores: np.ndarray,
+               k: int,
+               doc_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # scores are laid out over doc_ids when given
+        deleted = self.deleted if doc_ids is None else self.deleted[doc_ids]
+        if not deleted.any():
+            ids = top_k_indices(scores, k)
+            return (ids if doc_ids is None else doc_ids[ids]), scores[ids]
+        scores[deleted] = -np.inf
+        ids = top_k_indices(scores, k)
+        ids = ids[np.isfinite(scores[ids])]
+        return (ids if doc_ids is None else doc_ids[ids]), scores[ids]
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+
+class SparseBM25Retriever(BaseRetriever):
+    """
+    Drop-in replacement for LangChain's BM25Retriever backed by a BM25Index.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: Any
+    # Documents by id: a list, or a ChunkStore resolving them lazily
+    docs: Any
+    k: int = 4
+
+    @classmethod
+    def from_documents(cls,
+                       documents: List[Document],
+                       k: int = 4,
+                       preprocess_func: Callable[[str], List[str]] = default_preprocessing_func,
+                       bm25_params: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> "SparseBM25Retriever":
+        """
+        Build a retriever from documents.
+
+        Args:
+            documents: Documents to index
+            k: Number of results to return
+            preprocess_func: Tokenizer applied to documents and queries
+            bm25_params: Optional BM25 parameters (k1, b, epsilon)
+            **kwargs: Additional keyword arguments for the retriever
+
+        Returns:
+            A keyword search retriever
+        """
+
+        documents = list(documents)
+        index = BM25Index.from_texts(
+            (doc.page_content for doc in documents),
+            preprocess_func=preprocess_func,
+            **(bm25_params or {}),
+        )
+        return cls(index=index, docs=documents, k=k, **kwargs)
+
+    def search_with_scores(self,
+                           query: str,
+                           k: Optional[int] = None,
+                           doc_ids: Optional[np.ndarray] = None) -> List[Tuple[Document, float]]:
+        """
+        Return the top k documents together with their BM25 scores.
+
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            doc_ids: Sorted ids of the only documents to search (default: all)
+
+        Returns:
+            List of (document, score) pairs, best first
+        """
+
+        ids, scores = self.index.search(query, k or self.k, doc_ids)
+        return [(self.docs[i], float(s)) for i, s in zip(ids.tolist(), scores.tolist())]
+
+    def search_batch_with_scores(self, queries: List[str], k: Optional[int] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Return the top k documents and BM25 scores for each of several queries.
+
+        Args:
+            queries: Search queries
+            k: Number of results to return per query, overrides self.k
+
+        Returns:
+            One list of (document, score) pairs per query, best first
+        """
+
+        return [
+            [(self.docs[i], float(s)) for i, s in zip(ids.tolist(), scores.tolist())]
+            for ids, scores in self.index.search_batch(queries, k or self.k)
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        ids, _ = self.index.search(query, self.k)
+        return [self.docs[i] for i in ids.tolist()]
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Union
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+from rag.storage import atomic_directory, load_directory, update_fingerprint
+
+# Bump when the on-disk layout written by ChunkStore.write changes
+CHUNK_STORE_FORMAT_VERSION = 1
+CHUNK_STORE_META_FILE = "meta.json"
+CHUNK_STORE_DATA_FILE = "chunks.bin"
+CHUNK_STORE_OFFSETS_FILE = "offsets.npy"
+
+
+class ChunkStore:
+    """
+    Compact on-disk store of chunks addressed by integer id.
+
+    Records are UTF-8 JSON objects (page content and metadata) concatenated
+    in ``chunks.bin``; ``offsets.npy`` holds the byte offset of every record.
+    Both files are memory mapped, so opening a store costs the same for any
+    corpus size and a chunk is only decoded when it is requested.
+    """
+
+    def __init__(self, path: Union[str, Path], offsets: np.ndarray, data: Any, meta: dict) -> None:
+        """
+        Initialize a chunk store from opened files. Use ``ChunkStore.open``.
+
+        Args:
+            path: Store directory
+            offsets: Record offsets, length ``len(store) + 1``
+            data: Memory mapped record bytes
+            meta: Store metadata
+        """
+
+        self.path = Path(path)
+        self.offsets = offsets
+        self.data = data
+        self.meta = meta
+
+    @classmethod
+    def write(cls, path: Union[str, Path], docs: Iterable[Document]) -> "ChunkStore":
+        """
+        Write documents to a new chunk store, streaming them to disk.
+
+        Args:
+            path: Store directory, replaced atomically
+            docs: Documents in id order
+
+        Returns:
+            The opened chunk store
+        """
+
+        offsets = [0]
+        digest = hashlib.sha256()
+
+        with atomic_directory(path) as tmp_path:
+            with open(tmp_path / CHUNK_STORE_DATA_FILE, "wb") as f:
+                for doc in docs:
+                    record = json.dumps(
+                        {"page_content": doc.page_content, "metadata": doc.metadata},
+                        ensure_ascii=False,
+                        default=str,
+                    ).encode("utf-8")
+                    f.write(record)
+                    offsets.append(offsets[-1] + len(record))
+                    update_fingerprint(digest, doc.page_content)
+
+            np.save(tmp_path / CHUNK_STORE_OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+            meta = {
+                "format_version": CHUNK_STORE_FORMAT_VERSION,
+                "num_chunks": len(offsets) - 1,
+                "fingerprint": digest.hexdigest(),
+            }
+            with open(tmp_path / CHUNK_STORE_META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "ChunkStore":
+        """
+        Open an existing chunk store with memory mapped I/O.
+
+        Args:
+            path: Store directory
+
+        Returns:
+            The opened chunk store
+
+        Raises:
+            ValueError: If the store is missing or of another format version
+        """
+
+        return load_directory(path, cls._open)
+
+    @classmethod
+    def _open(cls, path: Path) -> "ChunkStore":
+        meta_path = path / CHUNK_STORE_META_FILE
+        if not meta_path.exists():
+            raise ValueError(f"No chunk store found: {path}")
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != CHUNK_STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store format version: {meta.get('format_version')}")
+
+        offsets = np.load(path / CHUNK_STORE_OFFSETS_FILE, mmap_mode="r")
+        data = b""
+        if int(offsets[-1]) > 0:
+            with open(path / CHUNK_STORE_DATA_FILE, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, offsets, data, meta)
+
+    @property
+    def fingerprint(self) -> str:
+        """Fingerprint of the stored page contents, compatible with ``corpus_fingerprint``."""
+        return self.meta["fingerprint"]
+
+    def _record(self, i: int) -> dict:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self.data[start:end].decode("utf-8"))
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, i: int) -> Document:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Chunk id out of range: {i}")
+        record = self._record(i)
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def __iter__(self) -> Iterator[Document]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_many(self, ids: Iterable[int]) -> List[Document]:
+        """
+        Resolve several chunk ids.
+
+        Args:
+            ids: Chunk ids
+
+        Returns:
+            Documents in the order of ``ids``
+        """
+
+        return [self[i] for i in ids]
+
+
+class ChunkStoreDocstore(Docstore):
+    """
+    Read-only LangChain docstore resolving FAISS ids through a ChunkStore.
+    """
+
+    def __init__(self, store: ChunkStore) -> None:
+        self.store = store
+
+    def search(self, search: Union[int, str]) -> Union[str, Document]:
+        try:
+            return self.store[int(search)]
+        except (IndexError, ValueError):
+            return f"ID {search} not found."
+
+
+class IdentityIndexMapping:
+    """
+    Read-only ``index_to_docstore_id`` mapping where FAISS row i is chunk id i.
+
+    Replaces the pickled dict of a FAISS store, which holds one entry per chunk.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+    def __getitem__(self, i: int) -> int:
+        if not 0 <= i < self.size:
+            raise KeyError(i)
+        return i
+
+    def get(self, i: int, default: Any = None) -> Any:
+        return i if 0 <= i < self.size else default
+
+    def __contains__(self, i: Any) -> bool:
+        return isinstance(i, int) and 0 <= i < self.size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.size))
+
+    def items(self) -> Iterator:
+        return ((i, i) for i in range(self.size))
+
+    def values(self) -> Iterator[int]:
+        return iter(range(self.size))
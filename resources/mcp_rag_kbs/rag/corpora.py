@@ -0,0 +1,331 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from rag.hot_swap import ChainManager
+
+
+class CorpusLoading(ValueError):
+    """
+    Raised when a request gives up waiting for its corpus to load.
+    """
+
+
+class CorpusRegistry:
+    """
+    Host several named corpora in one process, loading each on its first query.
+
+    Every corpus is served by its own ChainManager (so it can be reloaded
+    independently), while the factory can share one query embedding client
+    and cache between them. When the estimated memory of the loaded corpora
+    exceeds the budget, the least recently used corpora that no request is
+    using are unloaded (right away, or as soon as their requests finish);
+    they load again on their next query.
+    """
+
+    def __init__(self,
+                 factory: Callable[[str, Any], Any],
+                 corpora: Dict[str, Dict[str, Any]],
+                 memory_budget: Optional[int] = None) -> None:
+        """
+        Initialize a corpus registry. Nothing is loaded until a corpus is leased.
+
+        Args:
+            factory: Builds an initialized retrieval chain from a corpus name and index directory
+            corpora: Corpus settings by name; each needs a "db_dir" (see rag.versions)
+            memory_budget: Bytes the loaded corpora may use, None disables eviction
+        """
+
+        self.corpora = corpora
+        self.memory_budget = memory_budget
+        self.managers = {
+            name: ChainManager(partial(factory, name), settings["db_dir"])
+            for name, settings in corpora.items()
+        }
+        self._lock = threading.Lock()
+        # Held while a corpus loads, reloads or unloads; requests never wait on it
+        self._load_locks = {name: threading.Lock() for name in corpora}
+        # Background loads in progress
+        self._loads: Dict[str, Future] = {}
+        self._memory: Dict[str, int] = {}
+        # Loaded corpora, least recently used first
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+
+    def names(self) -> List[str]:
+        """
+        Return the names of the hosted corpora.
+
+        Returns:
+            Corpus names
+        """
+
+        return list(self.corpora)
+
+    def is_loaded(self, name: str) -> bool:
+        """
+        Check whether a corpus is loaded.
+
+        Args:
+            name: Corpus name
+
+        Returns:
+            True if its retrieval chain is in memory
+        """
+
+        return self._manager(name).chain is not None
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Return the estimated memory of the loaded corpora.
+
+        Returns:
+            Bytes by corpus name
+        """
+
+        with self._lock:
+            return {name: self._memory[name] for name in self._recent}
+
+    def _manager(self, name: str) -> ChainManager:
+        manager = self.managers.get(name)
+        if manager is None:
+            raise ValueError(f"Unknown corpus: {name}. Available corpora: {', '.join(self.corpora)}")
+        return manager
+
+    def _enter_lease(self, name: str, stack: ExitStack) -> Optional[Any]:
+        # Lease the live chain without the load lock, so a reload never holds up requests:
+        # the manager swaps chains atomically and unloading retires leased chains
+        try:
+            chain = stack.enter_context(self._manager(name).lease())
+        except ValueError:
+            return None
+        with self._lock:
+            if name in self._memory:
+                self._recent[name] = None
+                self._recent.move_to_end(name)
+        return chain
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Any]:
+        """
+        Borrow the retrieval chain of a corpus for one request, loading it in this thread if needed.
+
+        Use ``alease`` from a coroutine.
+
+        Args:
+            name: Corpus name
+
+        Yields:
+            The retrieval chain, kept loaded until the lease is returned
+
+        Raises:
+            ValueError: If the corpus is unknown
+        """
+
+        self._manager(name)
+        with ExitStack() as stack:
+            chain = self._enter_lease(name, stack)
+            while chain is None:
+                self.load(name)
+                chain = self._enter_lease(name, stack)
+            yield chain
+        # Corpora skipped while they were in use may be evictable now
+        self.evict()
+
+    @asynccontextmanager
+    async def alease(self, name: str, wait: Optional[float] = None) -> AsyncIterator[Any]:
+        """
+        Borrow the retrieval chain of a corpus for one request without blocking the event loop.
+
+        A loaded corpus is leased right away, also while it is being reloaded
+        (requests keep the previous chain until the new one is swapped in).
+        An unloaded corpus is loaded in a background thread, which concurrent
+        requests share.
+
+        Args:
+            name: Corpus name
+            wait: Seconds to wait for a load before giving up, None waits until it finishes
+
+        Yields:
+            The retrieval chain, kept loaded until the lease is returned
+
+        Raises:
+            ValueError: If the corpus is unknown
+            CorpusLoading: If the corpus is still loading after ``wait`` seconds
+        """
+
+        self._manager(name)
+        with ExitStack() as stack:
+            chain = self._enter_lease(name, stack)
+            while chain is None:
+                load = asyncio.wrap_future(self.load_in_background(name))
+                try:
+                    await asyncio.wait_for(asyncio.shield(load), wait)
+                except asyncio.TimeoutError:
+                    raise CorpusLoading(f"Corpus {name} is loading. Try again in a moment.") from None
+                chain = self._enter_lease(name, stack)
+            yield chain
+        if self.memory_budget is not None:
+            # Unloading closes chains, keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.evict)
+
+    def load(self, name: str) -> None:
+        """
+        Load a corpus unless it is loaded, in the calling thread.
+
+        Args:
+            name: Corpus name
+
+        Raises:
+            ValueError: If the corpus is unknown
+        """
+
+        manager = self._manager(name)
+        with self._load_locks[name]:
+            if manager.chain is not None:
+                return
+            manager.reload()
+            self._record_memory(name, manager.chain)
+            with self._lock:
+                self._recent[name] = None
+                self._recent.move_to_end(name)
+        self.evict(keep=name)
+
+    def load_in_background(self, name: str) -> Future:
+        """
+        Load a corpus in a background thread, or join the load already running.
+
+        Args:
+            name: Corpus name
+
+        Returns:
+            Future resolved when the load finishes (with its error if it fails)
+        """
+
+        self._manager(name)
+        with self._lock:
+            future = self._loads.get(name)
+            if future is not None:
+                return future
+            future = self._loads[name] = Future()
+
+        def run() -> None:
+            try:
+                self.load(name)
+            except BaseException as e:
+                error = e
+            else:
+                error = None
+            with self._lock:
+                self._loads.pop(name, None)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        threading.Thread(target=run, name=f"rag-load-{name}", daemon=True).start()
+        return future
+
+    def _record_memory(self, name: str, chain: Any) -> None:
+        memory_usage = getattr(chain, "memory_usage", None)
+        size = memory_usage() if memory_usage is not None else 0
+        with self._lock:
+            self._memory[name] = size
+        print(f"Corpus loaded: {name} (~{size / 2 ** 20:.1f}MB)")
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Unload least recently used corpora until the loaded ones fit the memory budget.
+
+        Corpora in use by a request are skipped.
+
+        Args:
+            keep: Corpus never to evict, e.g. the one just loaded
+
+        Returns:
+            Names of the unloaded corpora
+        """
+
+        evicted = []
+        if self.memory_budget is None:
+            return evicted
+        while True:
+            with self._lock:
+                if sum(self._memory[name] for name in self._recent) <= self.memory_budget:
+                    return evicted
+                candidates = [name for name in self._recent if name != keep]
+            for name in candidates:
+                if self._unload(name):
+                    evicted.append(name)
+                    break
+            else:
+                return evicted
+
+    def unload(self, name: str) -> bool:
+        """
+        Unload a corpus unless a request is using it.
+
+        Args:
+            name: Corpus name
+
+        Returns:
+            True if the corpus was unloaded
+        """
+
+        self._manager(name)
+        return self._unload(name)
+
+    def _unload(self, name: str) -> bool:
+        lock = self._load_locks[name]
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            manager = self.managers[name]
+            if manager.chain is None or manager.in_use():
+                return False
+            manager.unload()
+            with self._lock:
+                self._recent.pop(name, None)
+                self._memory.pop(name, None)
+        finally:
+            lock.release()
+        print(f"Corpus unloaded: {name}")
+        return True
+
+    def reload(self, name: str) -> None:
+        """
+        Reload a loaded corpus from its active index version; unloaded corpora are left alone.
+
+        Args:
+            name: Corpus name
+        """
+
+        manager = self._manager(name)
+        with self._load_locks[name]:
+            if manager.chain is None:
+                return
+            manager.reload()
+            self._record_memory(name, manager.chain)
+        self.evict(keep=name)
+
+    def reload_in_background(self) -> threading.Thread:
+        """
+        Reload all loaded corpora in a background thread; errors are logged per corpus.
+
+        Returns:
+            The started thread
+        """
+
+        def run() -> None:
+            for name in self.names():
+                try:
+                    self.reload(name)
+                except Exception as e:
+                    print(f"Reload of corpus {name} failed, keeping the current retrieval chain: {e}")
+
+        thread = threading.Thread(target=run, name="rag-reload", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,444 @@
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.storage import atomic_directory, load_directory
+
+# Metadata key listing the source references of the chunks collapsed into a canonical chunk
+DUPLICATES_KEY = "duplicates"
+# Metadata fields kept as the source reference of a collapsed chunk
+REFERENCE_FIELDS = ("source", "page")
+# Layout of the signature store written by save_signatures
+SIGNATURES_META_FILE = "meta.json"
+SIGNATURES_FILE = "signatures.npy"
+BAND_KEYS_FILE = "band_keys.npy"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    # (bands, rows per band) whose candidate S-curve rises closest below the threshold,
+    # so pairs above it are very likely to share a band
+    pairs = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [pair for pair in pairs if (1 / pair[0]) ** (1 / pair[1]) <= threshold]
+    return max(below or pairs[:1], key=lambda pair: (1 / pair[0]) ** (1 / pair[1]))
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate chunk detection with MinHash signatures and LSH banding.
+
+    Chunks are compared by the Jaccard similarity of their character
+    shingles (whitespace collapsed, case folded), estimated from MinHash
+    signatures. Signatures are cut into bands; chunks sharing a band are
+    candidates, and a candidate pair is a duplicate when its estimated
+    similarity reaches the threshold. Every duplicate maps to the earliest
+    chunk of its group, so the first occurrence stays canonical.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.9,
+                 num_perm: int = 128,
+                 shingle_size: int = 5,
+                 seed: int = 1,
+                 batch_chars: int = 1 << 15) -> None:
+        """
+        Initialize a deduplicator.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of duplicate chunks, in (0, 1]
+            num_perm: MinHash permutations per signature
+            shingle_size: Characters per shingle
+            seed: Seed of the permutations
+            batch_chars: Characters hashed at once, bounding the memory of ``signatures``
+
+        Raises:
+            ValueError: If the threshold is not in (0, 1] or a size is not positive
+        """
+
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}.")
+        if num_perm < 1 or shingle_size < 1:
+            raise ValueError(f"num_perm and shingle_size must be positive, got {num_perm} and {shingle_size}.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.batch_chars = batch_chars
+        self.bands, self.band_rows = _lsh_bands(num_perm, threshold)
+        # Permutations x -> a * x + b (mod 2 ** 32, a odd) of the 32-bit shingle hashes
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 1 << 31, num_perm, dtype=np.uint32) * np.uint32(2) + np.uint32(1))[:, None]
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64).astype(np.uint32)[:, None]
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Settings that determine the detected duplicates."""
+        return {"threshold": self.threshold, "num_perm": self.num_perm,
+                "shingle_size": self.shingle_size, "seed": self.seed}
+
+    def _codes(self, text: str) -> np.ndarray:
+        text = _WHITESPACE.sub(" ", text).strip().lower().ljust(self.shingle_size)
+        return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Compute the MinHash signatures of texts.
+
+        Args:
+            texts: Chunk texts
+
+        Returns:
+            Array of shape (len(texts), num_perm)
+        """
+
+        n = self.shingle_size
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(texts):
+            codes, end, size = [], start, 0
+            while end < len(texts) and (end == start or size < self.batch_chars):
+                codes.append(self._codes(texts[end]))
+                size += codes[-1].size
+                end += 1
+            lengths = np.array([c.size for c in codes])
+            joined = np.concatenate(codes).astype(np.uint64)
+
+            # Polynomial hash of every window of n characters (wrapping uint64 arithmetic)
+            width = joined.size - n + 1
+            hashes = np.zeros(width, dtype=np.uint64)
+            for j in range(n):
+                hashes = hashes * np.uint64(1_000_003) + joined[j:j + width]
+            # Keep the windows inside one text; every text has at least one
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            windows = lengths - n + 1
+            keep = np.repeat(offsets - np.concatenate([[0], np.cumsum(windows)[:-1]]), windows)
+            hashes = hashes[np.arange(windows.sum()) + keep]
+            hashes = ((hashes * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)).astype(np.uint32)
+
+            # One row per permutation, so the minimum per text reduces contiguous memory
+            permuted = self._a * hashes[None, :] + self._b
+            window_offsets = np.concatenate([[0], np.cumsum(windows)[:-1]])
+            signatures[start:end] = np.minimum.reduceat(permuted, window_offsets, axis=1).T
+            start = end
+        return signatures
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Hash every LSH band of signatures into one key.
+
+        Args:
+            signatures: MinHash signatures (see ``signatures``)
+
+        Returns:
+            Array of shape (len(signatures), bands); rows sharing a key in a band are candidates
+        """
+
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for band in range(self.bands):
+            block = np.asarray(signatures[:, band * self.band_rows:(band + 1) * self.band_rows], dtype=np.uint64)
+            for column in block.T:
+                keys[:, band] = keys[:, band] * np.uint64(0x100000001B3) ^ column
+        return keys
+
+    def candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        Find candidate pairs: rows sharing at least one LSH band.
+
+        Each row of a band bucket is paired with the first row of the bucket.
+
+        Args:
+            signatures: MinHash signatures (see ``signatures``)
+
+        Returns:
+            Array of (earlier row, later row) pairs, without repeats
+        """
+
+        pairs = []
+        all_keys = self.band_keys(signatures)
+        for band in range(self.bands):
+            keys = all_keys[:, band]
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+            first = np.repeat(order[starts], np.diff(np.append(starts, len(order))))
+            later = first != order
+            pairs.append(np.stack([first[later], order[later]], axis=1))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.unique(np.concatenate(pairs), axis=0)
+
+    def find_duplicates(self, texts: Sequence[str], num_fixed: int = 0) -> np.ndarray:
+        """
+        Map every text to the canonical text of its near-duplicate group.
+
+        A text maps to the earliest text it (or, transitively, a text it
+        duplicates) resembles, as long as it also resembles that canonical
+        text. The first ``num_fixed`` texts (e.g. chunks already indexed) are
+        never collapsed, but later texts may collapse into them.
+
+        Args:
+            texts: Chunk texts in row order
+            num_fixed: Number of leading texts that stay canonical
+
+        Returns:
+            Canonical position of every text; ``canonical[i] == i`` for kept texts
+        """
+
+        canonical = np.arange(len(texts))
+        if len(texts) < 2:
+            return canonical
+        signatures = self.signatures(texts)
+        pairs = self.candidate_pairs(signatures)
+        pairs = pairs[pairs[:, 1] >= num_fixed]
+        similar = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1) >= self.threshold
+        pairs = pairs[similar]
+
+        # Resolve in row order, so earlier rows already point at their canonical row
+        for earlier, later in pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]:
+            root = canonical[earlier]
+            if root >= canonical[later]:
+                continue
+            if root == earlier or (signatures[root] == signatures[later]).mean() >= self.threshold:
+                canonical[later] = root
+        return canonical
+
+    def find_new_duplicates(self,
+                            signatures: np.ndarray,
+                            keys: np.ndarray,
+                            live: np.ndarray,
+                            new_signatures: np.ndarray) -> np.ndarray:
+        """
+        Map new texts to the canonical text of their group among stored rows and earlier new texts.
+
+        Gives the result of ``find_duplicates`` over the stored texts followed
+        by the new ones with every stored row fixed, but stored rows are only
+        matched through their saved band keys: they are never hashed again,
+        and only the signatures of candidate rows are read.
+
+        Args:
+            signatures: Signatures of the stored rows, e.g. memory mapped (see ``load_signatures``)
+            keys: Band keys of the stored rows (see ``band_keys``)
+            live: Mask of the stored rows new texts may collapse into (False for removed rows)
+            new_signatures: Signatures of the new texts, in row order
+
+        Returns:
+            Canonical position of every new text: a stored row, or
+            ``len(signatures) + j`` for new text j
+        """
+
+        num_rows = len(signatures)
+        new_keys = self.band_keys(new_signatures)
+        pairs = [self.candidate_pairs(new_signatures) + num_rows]
+        live_rows = np.flatnonzero(live)
+        for band in range(self.bands):
+            # Pair each new text with the earliest live row of its bucket
+            band_keys = np.asarray(keys[live_rows, band])
+            hit = np.isin(band_keys, new_keys[:, band])
+            if not hit.any():
+                continue
+            bucket_keys, first = np.unique(band_keys[hit], return_index=True)
+            position = np.minimum(np.searchsorted(bucket_keys, new_keys[:, band]), len(bucket_keys) - 1)
+            matched = np.flatnonzero(bucket_keys[position] == new_keys[:, band])
+            pairs.append(np.stack([live_rows[hit][first[position[matched]]], matched + num_rows], axis=1))
+        pairs = np.unique(np.concatenate(pairs), axis=0)
+
+        def signature(i: int) -> np.ndarray:
+            return signatures[i] if i < num_rows else new_signatures[i - num_rows]
+
+        stored = pairs[:, 0] < num_rows
+        earlier_signatures = np.empty((len(pairs), self.num_perm), dtype=np.uint32)
+        earlier_signatures[stored] = signatures[pairs[stored, 0]]
+        earlier_signatures[~stored] = new_signatures[pairs[~stored, 0] - num_rows]
+        similar = (earlier_signatures == new_signatures[pairs[:, 1] - num_rows]).mean(axis=1) >= self.threshold
+        pairs = pairs[similar]
+
+        # Resolve in row order, like find_duplicates; stored rows are their own canonical row
+        canonical = np.arange(num_rows, num_rows + len(new_signatures))
+        for earlier, later in pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]:
+            root = earlier if earlier < num_rows else canonical[earlier - num_rows]
+            if root >= canonical[later - num_rows]:
+                continue
+            if root == earlier or (signature(root) == new_signatures[later - num_rows]).mean() >= self.threshold:
+                canonical[later - num_rows] = root
+        return canonical
+
+
+def save_signatures(path: Union[str, Path],
+                    deduplicator: MinHashDeduplicator,
+                    signatures: np.ndarray,
+                    keys: np.ndarray) -> None:
+    """
+    Save the MinHash signatures and band keys of stored rows, replacing the directory atomically.
+
+    Args:
+        path: Store directory
+        deduplicator: Deduplicator that computed them
+        signatures: Signatures, one row per stored row
+        keys: Band keys of the signatures
+    """
+
+    with atomic_directory(path) as tmp_path:
+        np.save(tmp_path / SIGNATURES_FILE, np.ascontiguousarray(signatures))
+        np.save(tmp_path / BAND_KEYS_FILE, np.ascontiguousarray(keys))
+        with open(tmp_path / SIGNATURES_META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"settings": deduplicator.settings, "num_rows": len(signatures)}, f)
+
+
+def load_signatures(path: Union[str, Path],
+                    deduplicator: MinHashDeduplicator) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Load the signatures and band keys written by ``save_signatures``, memory mapped.
+
+    Args:
+        path: Store directory
+        deduplicator: Deduplicator whose settings the store must match
+
+    Returns:
+        Tuple of (signatures, band keys), or None if the store is missing or was made with other settings
+    """
+
+    def load(directory: Path) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        meta_path = directory / SIGNATURES_META_FILE
+        if not meta_path.exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("settings") != deduplicator.settings:
+                return None
+        return (np.load(directory / SIGNATURES_FILE, mmap_mode="r"),
+                np.load(directory / BAND_KEYS_FILE, mmap_mode="r"))
+
+    return load_directory(path, load)
+
+
+def source_reference(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the source reference of a chunk, as listed in the ``duplicates`` metadata.
+
+    Args:
+        metadata: Chunk metadata
+
+    Returns:
+        The reference fields present in the metadata
+    """
+
+    return {field: metadata[field] for field in REFERENCE_FIELDS if field in metadata}
+
+
+def release_reference(doc: Document, reference: Dict[str, Any]) -> bool:
+    """
+    Drop one source reference from a chunk that near-duplicates collapsed into.
+
+    A collapsed reference is removed from the ``duplicates`` list. When the
+    reference is the chunk's own source, the first collapsed reference is
+    promoted to be its source and page instead. The metadata is updated in
+    place.
+
+    Args:
+        doc: Canonical chunk
+        reference: Source reference to drop (see ``source_reference``)
+
+    Returns:
+        True if the chunk held the reference
+    """
+
+    references = list(doc.metadata.get(DUPLICATES_KEY) or [])
+    if reference in references:
+        references.remove(reference)
+        metadata = dict(doc.metadata)
+    elif references and source_reference(doc.metadata) == reference:
+        metadata = {key: value for key, value in doc.metadata.items() if key not in REFERENCE_FIELDS}
+        metadata.update(references.pop(0))
+    else:
+        return False
+    if references:
+        metadata[DUPLICATES_KEY] = references
+    else:
+        metadata.pop(DUPLICATES_KEY, None)
+    doc.metadata = metadata
+    return True
+
+
+def collapse_duplicates(docs: Sequence[Document],
+                        canonical: np.ndarray,
+                        num_fixed: int = 0) -> Tuple[List[Document], np.ndarray]:
+    """
+    Drop duplicate chunks, keeping their source references on the canonical chunk.
+
+    The source and page of every collapsed chunk are appended to the
+    ``duplicates`` metadata list of its canonical chunk, whose metadata is
+    updated in place.
+
+    Args:
+        docs: Chunks in row order
+        canonical: Canonical position of every chunk (see ``MinHashDeduplicator.find_duplicates``)
+        num_fixed: Number of leading chunks that are already stored and not returned
+
+    Returns:
+        Tuple of (kept chunks after the fixed ones, row of every chunk), where
+        fixed chunks keep their position and the kept chunks follow them
+    """
+
+    kept = canonical == np.arange(len(canonical))
+    kept[:num_fixed] = True
+    rows = np.cumsum(kept) - 1
+    rows = rows[canonical]
+    for i in np.flatnonzero(~kept):
+        target = docs[canonical[i]]
+        references = list(target.metadata.get(DUPLICATES_KEY, []))
+        references.append(source_reference(docs[i].metadata))
+        references.extend(docs[i].metadata.get(DUPLICATES_KEY, []))
+        target.metadata = {**target.metadata, DUPLICATES_KEY: references}
+    return [docs[i] for i in np.flatnonzero(kept[num_fixed:]) + num_fixed], rows
+
+
+def duplicate_stats(docs: Sequence[Document], canonical: np.ndarray, num_fixed: int = 0) -> Dict[str, int]:
+    """
+    Measure what collapsing duplicates saves, for the chunks after the fixed ones.
+
+    Embedding spend is proportional to the embedded characters and the index
+    size to the number of vectors.
+
+    Args:
+        docs: Chunks in row order
+        canonical: Canonical position of every chunk
+        num_fixed: Number of leading chunks that are already stored
+
+    Returns:
+        Counts of chunks and characters, and of duplicate chunks and their characters
+    """
+
+    duplicate = canonical[num_fixed:] != np.arange(num_fixed, len(canonical))
+    chars = np.array([len(doc.page_content) for doc in docs[num_fixed:]], dtype=np.int64)
+    return {
+        "chunks": int(duplicate.size),
+        "duplicate_chunks": int(duplicate.sum()),
+        "chars": int(chars.sum()),
+        "duplicate_chars": int(chars[duplicate].sum()),
+    }
+
+
+def format_dedup_stats(stats: Dict[str, int], dim: Optional[int] = None) -> str:
+    """
+    Summarize duplicate statistics in one line.
+
+    Args:
+        stats: Statistics of ``duplicate_stats``
+        dim: Vector dimension, to estimate the float32 index bytes saved
+
+    Returns:
+        The summary
+    """
+
+    chunks = max(stats["chunks"], 1)
+    chars = max(stats["chars"], 1)
+    summary = (f"{stats['duplicate_chunks']} of {stats['chunks']} chunks are near-duplicates "
+               f"({stats['duplicate_chunks'] / chunks:.1%} fewer vectors, "
+               f"{stats['duplicate_chars'] / chars:.1%} fewer characters embedded")
+    if dim:
+        summary += f", {stats['duplicate_chunks'] * dim * 4 / 2 ** 20:.1f} MiB smaller flat index"
+    return summary + ")"
@@ -0,0 +1,450 @@
+import asyncio
+import json
+import random
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+import openai
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag.chunk_store import ChunkStore
+from rag.dedup import MinHashDeduplicator, collapse_duplicates, duplicate_stats, source_reference
+from rag.ingest import IngestManifest, content_hash, load_source_documents
+from rag.storage import atomic_file
+
+# Bump when the checkpoint layout written by EmbeddingBuilder changes
+CHECKPOINT_FORMAT_VERSION = 1
+CHECKPOINT_PLAN_FILE = "plan.json"
+# HTTP statuses of embedding API errors worth retrying
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether an embedding API error is transient: a rate limit, a timeout,
+    a connection failure or a server error.
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        True if the request should be retried
+    """
+
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, ConnectionError, TimeoutError))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Read the delay requested by a rate limited response (``Retry-After`` header).
+
+    Args:
+        error: Raised exception
+
+    Returns:
+        Seconds to wait, or None if the response does not say
+    """
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class EmbeddingBuilder:
+    """
+    Embed the chunks of parsing outputs into a new vector store, resumably.
+
+    Chunks are streamed source by source and embedded in fixed-size batches,
+    with at most ``concurrency`` requests in flight. Transient errors are
+    retried with exponential backoff (or the delay the API asks for). Every
+    finished batch is saved to the checkpoint directory, so an interrupted
+    build resumes with the batches still missing. ``write`` then assembles
+    the FAISS index, its docstore, the chunk store, the keyword index and an
+    ingest manifest, so later updates can use incremental ingestion.
+
+    With a deduplicator, near-duplicate chunks (e.g. the same passage in
+    overlapping parsing outputs) are neither embedded nor indexed: each
+    collapses into its first occurrence, which keeps their source references.
+    """
+
+    def __init__(self,
+                 embeddings: Any,
+                 checkpoint_directory: Union[str, Path],
+                 batch_size: int = 64,
+                 concurrency: int = 4,
+                 max_retries: int = 8,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 60.0,
+                 text_splitter: Optional[RecursiveCharacterTextSplitter] = None,
+                 deduplicator: Optional[MinHashDeduplicator] = None) -> None:
+        """
+        Initialize an embedding builder.
+
+        Args:
+            embeddings: Passage embedding model with ``aembed_documents``; its own retries
+                should be disabled so the builder's backoff applies
+            checkpoint_directory: Directory keeping the embedded batches until the build is written
+            batch_size: Chunks per embedding request
+            concurrency: Maximum embedding requests in flight
+            max_retries: Retries of a batch before the build fails
+            backoff_base: First retry delay in seconds, doubled per retry
+            backoff_max: Maximum retry delay in seconds
+            text_splitter: Splitter for markdown outputs
+            deduplicator: Near-duplicate detection; None embeds every chunk
+
+        Raises:
+            ValueError: If the batch size or concurrency is not positive
+        """
+
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError(f"batch_size and concurrency must be positive, got {batch_size} and {concurrency}.")
+        self.embeddings = embeddings
+        self.checkpoint_directory = Path(checkpoint_directory)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.text_splitter = text_splitter
+        self.deduplicator = deduplicator
+        # (source keys, canonical chunk positions) of the last duplicate detection
+        self._duplicates = None
+
+    def plan(self, sources: Dict[str, Path]) -> Dict[str, Any]:
+        """
+        Describe a build, so a checkpoint is only resumed for the same inputs.
+
+        Args:
+            sources: Parsing outputs by source key (see rag.ingest.discover_sources)
+
+        Returns:
+            The embedding model, batch size, deduplication settings and the stat of every source
+        """
+
+        files = []
+        for key, path in sources.items():
+            stat = Path(path).stat()
+            files.append({"key": key, "file": Path(path).name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        return {
+            "format_version": CHECKPOINT_FORMAT_VERSION,
+            "model": getattr(self.embeddings, "model", type(self.embeddings).__name__),
+            "batch_size": self.batch_size,
+            "dedup": self.deduplicator.settings if self.deduplicator else None,
+            "sources": files,
+        }
+
+    def open_checkpoint(self, sources: Dict[str, Path], restart: bool = False) -> int:
+        """
+        Create the checkpoint of a build, or check that an existing one belongs to it.
+
+        Args:
+            sources: Parsing outputs by source key
+            restart: Discard an existing checkpoint instead of resuming it
+
+        Returns:
+            Number of batches already embedded
+
+        Raises:
+            ValueError: If an existing checkpoint was made for other sources or settings
+        """
+
+        plan = self.plan(sources)
+        plan_path = self.checkpoint_directory / CHECKPOINT_PLAN_FILE
+        if restart:
+            shutil.rmtree(self.checkpoint_directory, ignore_errors=True)
+        if plan_path.exists():
+            with open(plan_path, "r", encoding="utf-8") as f:
+                if json.load(f) != plan:
+                    raise ValueError(
+                        f"Checkpoint {self.checkpoint_directory} was made for other sources or settings. "
+                        "Restart the build to discard it."
+                    )
+            return len(list(self.checkpoint_directory.glob("batch_*.npy")))
+
+        self.checkpoint_directory.mkdir(parents=True, exist_ok=True)
+        with atomic_file(plan_path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(plan, f, ensure_ascii=False)
+        return 0
+
+    def clear_checkpoint(self) -> None:
+        """
+        Delete the checkpoint once the build is written.
+        """
+
+        shutil.rmtree(self.checkpoint_directory, ignore_errors=True)
+
+    def batch_path(self, batch: int) -> Path:
+        """
+        Return the checkpoint file of an embedded batch.
+
+        Args:
+            batch: Batch number
+
+        Returns:
+            Path of the ``.npy`` file
+        """
+
+        return self.checkpoint_directory / f"batch_{batch:06d}.npy"
+
+    def find_duplicates(self, sources: Dict[str, Path]) -> Optional[np.ndarray]:
+        """
+        Map every chunk of the sources to the first occurrence of its near-duplicate group, once.
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Returns:
+            Canonical position of every chunk in source order, or None without a deduplicator
+        """
+
+        if self.deduplicator is None:
+            return None
+        if self._duplicates is None or self._duplicates[0] != list(sources):
+            texts = [doc.page_content for _, _, docs in self.iter_sources(sources) for doc in docs]
+            self._duplicates = (list(sources), self.deduplicator.find_duplicates(texts))
+        return self._duplicates[1]
+
+    def duplicate_stats(self, sources: Dict[str, Path]) -> Optional[Dict[str, int]]:
+        """
+        Measure the chunks and characters the deduplicator saves from embedding and indexing.
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Returns:
+            Statistics of rag.dedup.duplicate_stats, or None without a deduplicator
+        """
+
+        canonical = self.find_duplicates(sources)
+        if canonical is None:
+            return None
+        return duplicate_stats([doc for _, _, docs in self.iter_sources(sources) for doc in docs], canonical)
+
+    def iter_sources(self, sources: Dict[str, Path]) -> Iterator[Tuple[str, Path, List[Document]]]:
+        """
+        Load the chunks of the sources one at a time.
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Yields:
+            (source key, file, chunks) tuples
+        """
+
+        for key, path in sources.items():
+            yield key, Path(path), load_source_documents(path, self.text_splitter)
+
+    def iter_batches(self, sources: Dict[str, Path]) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Stream the chunk texts of the sources in batches, in row order, skipping near-duplicates.
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Yields:
+            (batch number, texts) pairs
+        """
+
+        canonical = self.find_duplicates(sources)
+        batch, texts, position = 0, [], -1
+        for _, _, docs in self.iter_sources(sources):
+            for doc in docs:
+                position += 1
+                if canonical is not None and canonical[position] != position:
+                    continue
+                texts.append(doc.page_content)
+                if len(texts) == self.batch_size:
+                    yield batch, texts
+                    batch, texts = batch + 1, []
+        if texts:
+            yield batch, texts
+
+    def backoff_delay(self, attempt: int, error: BaseException) -> float:
+        """
+        Compute the delay before retrying a failed batch.
+
+        Args:
+            attempt: Number of the failed attempt, from 0
+            error: Raised exception
+
+        Returns:
+            Seconds to wait: the requested ``Retry-After`` if any, else
+            exponential backoff with jitter
+        """
+
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.backoff_max)
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def aembed_batch(self, batch: int, texts: List[str], stats: Dict[str, int]) -> None:
+        """
+        Embed one batch, retrying transient errors, and save it to the checkpoint.
+
+        Args:
+            batch: Batch number
+            texts: Chunk texts of the batch
+            stats: Build counters, updated in place
+
+        Raises:
+            ValueError: If the API returns a wrong number of embeddings
+        """
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                vectors = await self.embeddings.aembed_documents(texts)
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                stats["retries"] += 1
+                print(f"Batch {batch}: {type(e).__name__}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] != len(texts):
+            raise ValueError(f"Batch {batch}: expected {len(texts)} embeddings, got {vectors.shape[0]}.")
+        with atomic_file(self.batch_path(batch)) as tmp_path:
+            np.save(tmp_path, vectors)
+        stats["embedded_batches"] += 1
+        stats["embedded_chunks"] += len(texts)
+
+    async def aembed(self, sources: Dict[str, Path]) -> Dict[str, int]:
+        """
+        Embed every batch missing from the checkpoint, with bounded concurrency.
+
+        Call ``open_checkpoint`` first. If a batch fails for good, no new
+        batches are started; batches in flight finish (and are checkpointed)
+        before the error is raised.
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Returns:
+            Counts of embedded, resumed (already checkpointed) batches and
+            chunks, and of retries
+        """
+
+        stats = dict.fromkeys(("embedded_batches", "resumed_batches", "embedded_chunks", "retries"), 0)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        error = None
+
+        async def run(batch: int, texts: List[str]) -> None:
+            try:
+                await self.aembed_batch(batch, texts, stats)
+            finally:
+                semaphore.release()
+
+        for batch, texts in self.iter_batches(sources):
+            if self.batch_path(batch).exists():
+                stats["resumed_batches"] += 1
+                continue
+            await semaphore.acquire()
+            for task in [task for task in pending if task.done()]:
+                pending.discard(task)
+                error = error or task.exception()
+            if error is not None:
+                semaphore.release()
+                break
+            pending.add(asyncio.ensure_future(run(batch, texts)))
+
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            error = error or (result if isinstance(result, BaseException) else None)
+        if error is not None:
+            raise error
+        return stats
+
+    def embed(self, sources: Dict[str, Path]) -> Dict[str, int]:
+        """
+        Embed every batch missing from the checkpoint (see ``aembed``).
+
+        Args:
+            sources: Parsing outputs by source key
+
+        Returns:
+            Build counters
+        """
+
+        return asyncio.run(self.aembed(sources))
+
+    def write(self, chain: Any, sources: Dict[str, Path]) -> Dict[str, int]:
+        """
+        Write the vector store of a completed checkpoint to the directory of a KBS chain.
+
+        Writes the FAISS index with its pickled docstore, the chunk store,
+        the keyword index and the ingest manifest, named after the chain's
+        settings. Near-duplicate chunks are collapsed as they were skipped
+        when embedding.
+
+        Args:
+            chain: KBSRetrievalChain whose persist directory receives the vector store
+            sources: Parsing outputs by source key, as embedded
+
+        Returns:
+            Counts of sources and chunks written (without near-duplicates)
+
+        Raises:
+            ValueError: If batches are missing from the checkpoint
+        """
+
+        persist_directory = Path(chain.persist_directory)
+        persist_directory.mkdir(parents=True, exist_ok=True)
+        manifest = IngestManifest(persist_directory / chain.manifest_name)
+        docs: List[Document] = []
+        spans = []
+        for key, path, source_docs in self.iter_sources(sources):
+            spans.append((key, path, content_hash(source_docs), len(docs), len(docs) + len(source_docs)))
+            docs.extend(source_docs)
+        references = [source_reference(doc.metadata) for doc in docs]
+
+        # Sources sharing a collapsed chunk all record its row
+        canonical = self.find_duplicates(sources)
+        rows = np.arange(len(docs))
+        if canonical is not None:
+            docs, rows = collapse_duplicates(docs, canonical)
+        for key, path, digest, start, end in spans:
+            manifest.record(key, path, digest, rows[start:end].tolist(), references[start:end])
+
+        num_batches = -(-len(docs) // self.batch_size)
+        missing = [batch for batch in range(num_batches) if not self.batch_path(batch).exists()]
+        if missing:
+            raise ValueError(f"{len(missing)} of {num_batches} batches are not embedded yet (first: {missing[0]}).")
+
+        index = None
+        for batch in range(num_batches):
+            vectors = np.load(self.batch_path(batch))
+            if index is None:
+                index = faiss.IndexFlatL2(vectors.shape[1])
+            index.add(vectors)
+        if index is None or index.ntotal != len(docs):
+            raise ValueError(f"Checkpoint holds {0 if index is None else index.ntotal} vectors for {len(docs)} chunks.")
+
+        vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(docs)}),
+            index_to_docstore_id={i: str(i) for i in range(len(docs))},
+        )
+        chain.save_vectorstore(vectorstore)
+        if chain.chunk_store_name:
+            ChunkStore.write(persist_directory / chain.chunk_store_name, docs)
+        keyword_index = chain.build_row_keyword_index(docs, [])
+        keyword_index.save(persist_directory / chain.keyword_index_name)
+        manifest.keyword_fingerprint = keyword_index.fingerprint
+        manifest.save()
+        return {"sources": len(sources), "chunks": len(docs)}
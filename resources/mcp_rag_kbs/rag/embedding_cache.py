@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.embeddings import aembed_queries, embed_queries
+from rag.metrics import CACHE_LOOKUPS
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query so trivially different spellings share a cache entry.
+
+    Applies Unicode NFKC normalization, strips the text and collapses runs
+    of whitespace into a single space.
+
+    Args:
+        text: Query text
+
+    Returns:
+        Normalized query text
+    """
+
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class SQLiteEmbeddingStore:
+    """
+    Size-bounded on-disk embedding store backed by SQLite.
+
+    Vectors are stored as float32 blobs. When the store grows beyond
+    ``max_entries``, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 100_000) -> None:
+        """
+        Open (or create) an embedding store.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum number of stored embeddings
+        """
+
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """
+        Look up an embedding and refresh its access time.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The embedding, or None if it is not stored
+        """
+
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE embeddings SET last_access = ? WHERE key = ?", (time.time(), key))
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, key: str, vector: List[float]) -> None:
+        """
+        Store an embedding, evicting the least recently used ones if needed.
+
+        Args:
+            key: Cache key
+            vector: Embedding to store
+        """
+
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                (key, blob, time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Query embedding wrapper with an in-process LRU and an optional disk tier.
+
+    ``embed_query``/``aembed_query`` look up the LRU first, then the disk
+    store, and only call the wrapped model on a miss. Queries are
+    normalized (``normalize_query``) before both the lookup and the model
+    call, so a cached vector is always the embedding of its key's text.
+    Keys include the model name, so caches for different models never mix. ``embed_queries`` batches the misses of several
+    queries into one request. ``embed_documents`` is passed through uncached.
+    The async methods read and write the disk store in a thread, so the
+    event loop never waits on SQLite.
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 max_size: int = 1024,
+                 disk_store: Optional[SQLiteEmbeddingStore] = None,
+                 model_name: Optional[str] = None) -> None:
+        """
+        Initialize a cached query embedding model.
+
+        Args:
+            embeddings: Embedding model to wrap
+            max_size: Maximum number of embeddings kept in memory
+            disk_store: Optional persistent store shared across restarts
+            model_name: Model name used in cache keys (default: embeddings.model)
+        """
+
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.disk_store = disk_store
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def cache_key(self, text: str) -> str:
+        """
+        Build the cache key of a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Cache key
+        """
+
+        digest = hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def lookup(self, text: str) -> Optional[List[float]]:
+        """
+        Return a cached embedding without calling the model.
+
+        Args:
+            text: Query text
+
+        Returns:
+            The cached embedding, or None on a miss
+        """
+
+        key = self.cache_key(text)
+        vector = self._memory_lookup(key)
+        if vector is None and self.disk_store is not None:
+            vector = self._disk_lookup(key)
+        if vector is None:
+            self._count_miss()
+        return vector
+
+    async def alookup(self, text: str) -> Optional[List[float]]:
+        """
+        Return a cached embedding without calling the model, reading the disk store in a thread.
+
+        Args:
+            text: Query text
+
+        Returns:
+            The cached embedding, or None on a miss
+        """
+
+        key = self.cache_key(text)
+        vector = self._memory_lookup(key)
+        if vector is None and self.disk_store is not None:
+            vector = await asyncio.to_thread(self._disk_lookup, key)
+        if vector is None:
+            self._count_miss()
+        return vector
+
+    def _memory_lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.labels("query_embedding", "memory_hit").inc()
+        return vector
+
+    def _disk_lookup(self, key: str) -> Optional[List[float]]:
+        vector = self.disk_store.get(key)
+        if vector is not None:
+            self._remember(key, vector)
+            with self._lock:
+                self.hits += 1
+                self.disk_hits += 1
+            CACHE_LOOKUPS.labels("query_embedding", "disk_hit").inc()
+        return vector
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+        CACHE_LOOKUPS.labels("query_embedding", "miss").inc()
+
+    def store(self, text: str, vector: List[float]) -> None:
+        """
+        Add an embedding to both cache tiers.
+
+        Args:
+            text: Query text
+            vector: Embedding of the query
+        """
+
+        key = self.cache_key(text)
+        self._remember(key, vector)
+        if self.disk_store is not None:
+            self.disk_store.put(key, vector)
+
+    async def astore(self, text: str, vector: List[float]) -> None:
+        """
+        Add an embedding to both cache tiers, writing the disk store in a thread.
+
+        Args:
+            text: Query text
+            vector: Embedding of the query
+        """
+
+        key = self.cache_key(text)
+        self._remember(key, vector)
+        if self.disk_store is not None:
+            await asyncio.to_thread(self.disk_store.put, key, vector)
+
+    def embed_query(self, text: str) -> List[float]:
+        text = normalize_query(text)
+        vector = self.lookup(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.store(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        text = normalize_query(text)
+        vector = await self.alookup(text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await self.astore(text, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, sending only the cache misses in one batch.
+
+        Args:
+            texts: Queries to embed
+
+        Returns:
+            One embedding per query
+        """
+
+        texts = [normalize_query(text) for text in texts]
+        vectors = [self.lookup(text) for text in texts]
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        return self._fill_misses(texts, vectors, misses, embed_queries(self.embeddings, misses))
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Asynchronously embed several queries, sending only the cache misses in one batch.
+
+        Args:
+            texts: Queries to embed
+
+        Returns:
+            One embedding per query
+        """
+
+        texts = [normalize_query(text) for text in texts]
+        vectors = await asyncio.gather(*(self.alookup(text) for text in texts))
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        computed = dict(zip(misses, await aembed_queries(self.embeddings, misses)))
+        await asyncio.gather(*(self.astore(text, vector) for text, vector in computed.items()))
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+
+    def _fill_misses(self,
+                     texts: List[str],
+                     vectors: List[Optional[List[float]]],
+                     misses: List[str],
+                     embedded: List[List[float]]) -> List[List[float]]:
+        computed = dict(zip(misses, embedded))
+        for text, vector in computed.items():
+            self.store(text, vector)
+        return [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, disk_hits, misses, hit_rate and sizes
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_size": len(self._memory),
+                "disk_size": len(self.disk_store) if self.disk_store is not None else 0,
+            }
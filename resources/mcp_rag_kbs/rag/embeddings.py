@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from langchain_upstage import UpstageEmbeddings
+
+# Embedding backends by name (see create_embeddings); select one with config.DEFAULT_EMBEDDING_MODEL
+EMBEDDING_BACKENDS: Dict[str, Callable[..., Any]] = {}
+EMBEDDING_ROLES = ("query", "passage")
+
+
+def _upstage_query_params(embeddings: UpstageEmbeddings) -> dict:
+    # UpstageEmbeddings strips the -query/-passage suffix and re-adds it per call;
+    # embed_documents always uses the passage model, so queries need the suffix here
+    params = embeddings._invocation_params
+    params["model"] = params["model"] + "-query"
+    return params
+
+
+def embed_queries(embeddings: Any, texts: List[str]) -> List[List[float]]:
+    """
+    Embed several queries with the query model, batching requests when possible.
+
+    Args:
+        embeddings: Query embedding model instance
+        texts: Queries to embed
+
+    Returns:
+        One embedding per query
+    """
+
+    if not texts:
+        return []
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, UpstageEmbeddings):
+        params = _upstage_query_params(embeddings)
+        vectors = []
+        for i in range(0, len(texts), embeddings.embed_batch_size):
+            data = embeddings.client.create(input=texts[i:i + embeddings.embed_batch_size], **params).data
+            vectors.extend(r.embedding for r in data)
+        return vectors
+    return [embeddings.embed_query(text) for text in texts]
+
+
+async def aembed_queries(embeddings: Any, texts: List[str]) -> List[List[float]]:
+    """
+    Asynchronously embed several queries with the query model.
+
+    Args:
+        embeddings: Query embedding model instance
+        texts: Queries to embed
+
+    Returns:
+        One embedding per query
+    """
+
+    if not texts:
+        return []
+    if hasattr(embeddings, "aembed_queries"):
+        return await embeddings.aembed_queries(texts)
+    if isinstance(embeddings, UpstageEmbeddings):
+        params = _upstage_query_params(embeddings)
+        vectors = []
+        for i in range(0, len(texts), embeddings.embed_batch_size):
+            response = await embeddings.async_client.create(input=texts[i:i + embeddings.embed_batch_size], **params)
+            vectors.extend(r.embedding for r in response.data)
+        return vectors
+    return list(await asyncio.gather(*(embeddings.aembed_query(text) for text in texts)))
+
+
+def register_embedding_backend(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Register an embedding backend factory under a name.
+
+    The factory is called as ``factory(role, **options)`` with role
+    "query" or "passage" and returns a LangChain embeddings model.
+
+    Args:
+        name: Backend name
+
+    Returns:
+        Decorator registering the factory
+    """
+
+    def register(factory: Callable[..., Any]) -> Callable[..., Any]:
+        EMBEDDING_BACKENDS[name] = factory
+        return factory
+
+    return register
+
+
+def create_embeddings(backend: str, role: str = "query", **options: Any) -> Any:
+    """
+    Create an embedding model from a registered backend.
+
+    Args:
+        backend: Backend name, e.g. "upstage", "openai" or "hashing"
+        role: "query" or "passage"; asymmetric models embed them with different models
+        **options: Backend options
+
+    Returns:
+        An embeddings model instance
+
+    Raises:
+        ValueError: If the backend or role is unknown
+    """
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {tuple(EMBEDDING_BACKENDS)}.")
+    if role not in EMBEDDING_ROLES:
+        raise ValueError(f"Unknown embedding role: {role}. Expected one of {EMBEDDING_ROLES}.")
+    return EMBEDDING_BACKENDS[backend](role, **options)
+
+
+@register_embedding_backend("upstage")
+def create_upstage_embeddings(role: str, model: str = "solar-embedding-1-large", **options: Any) -> UpstageEmbeddings:
+    options.setdefault("api_key", os.getenv("UPSTAGE_API_KEY"))
+    return UpstageEmbeddings(model=f"{model}-{role}", **options)
+
+
+@register_embedding_backend("openai")
+def create_openai_embeddings(role: str, model: str = "text-embedding-3-small", **options: Any) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=model, **options)
+
+
+@register_embedding_backend("hashing")
+def create_hashing_embeddings(role: str, **options: Any) -> "HashingEmbeddings":
+    return HashingEmbeddings(**options)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic local embeddings from feature hashing, for offline runs and benchmarks.
+
+    Words and their character n-grams are hashed into signed buckets of a
+    fixed-size vector, which is L2 normalized. Texts sharing words get
+    similar vectors, so search results stay meaningful, and the default
+    dimension matches the Upstage model, so index sizes and search costs
+    are realistic. Queries and passages are embedded the same way.
+    """
+
+    def __init__(self,
+                 dim: int = 4096,
+                 ngram_size: int = 3,
+                 batch_size: int = 256,
+                 num_threads: int = 1,
+                 cache_size: int = 1_000_000) -> None:
+        """
+        Initialize hashing embeddings.
+
+        Args:
+            dim: Embedding dimension
+            ngram_size: Length of the character n-grams hashed besides whole words, 0 disables them
+            batch_size: Texts embedded per task when using several threads
+            num_threads: Threads embedding batches in parallel
+            cache_size: Maximum words whose hashed features are cached
+        """
+
+        self.dim = dim
+        self.ngram_size = ngram_size
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.cache_size = cache_size
+        self.model = f"hashing-{dim}"
+        self._word_cache: Dict[str, tuple] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def word_features(self, word: str) -> tuple:
+        """
+        Hash a word and its character n-grams into signed buckets.
+
+        Words repeat across texts, so the result is cached per instance.
+
+        Args:
+            word: Lowercased word
+
+        Returns:
+            (bucket ids, signs) arrays
+        """
+
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+        features = [word]
+        if self.ngram_size and len(word) > self.ngram_size:
+            padded = f"<{word}>"
+            features.extend(padded[i:i + self.ngram_size] for i in range(len(padded) - self.ngram_size + 1))
+        hashes = np.frombuffer(
+            b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features),
+            dtype=np.uint64,
+        )
+        cached = (
+            (hashes % np.uint64(self.dim)).astype(np.int64),
+            np.where(hashes >> np.uint64(63), -1.0, 1.0),
+        )
+        if len(self._word_cache) < self.cache_size:
+            self._word_cache[word] = cached
+        return cached
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [self.word_features(word) for word in re.findall(r"\w+", text.lower())]
+            if words:
+                buckets = np.concatenate([ids for ids, _ in words])
+                signs = np.concatenate([signs for _, signs in words])
+                vectors[row] = np.bincount(buckets, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into a float32 array, in batches spread over the worker threads.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape ``(len(texts), dim)``
+        """
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.num_threads <= 1 or len(batches) == 1:
+            return np.concatenate([self._embed_batch(batch) for batch in batches])
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="hashing-embed")
+        return np.concatenate(list(self._executor.map(self._embed_batch, batches)))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_queries, texts)
@@ -0,0 +1,149 @@
+import gc
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from rag.versions import current_index_directory
+
+
+class ChainManager:
+    """
+    Serve a retrieval chain and replace it with a freshly loaded one without downtime.
+
+    Requests take a lease on the live chain for their duration. A reload
+    builds the new chain off the request path, then swaps it in between
+    requests; searches already running finish on the old chain, which is
+    closed (and its memory released) once its last lease is returned.
+    """
+
+    def __init__(self, factory: Callable[[Path], Any], db_dir: Union[str, Path]) -> None:
+        """
+        Initialize a chain manager. Call ``reload`` to load the first chain.
+
+        Args:
+            factory: Builds an initialized retrieval chain from an index directory
+            db_dir: Index root directory, see rag.versions
+        """
+
+        self.factory = factory
+        self.db_dir = Path(db_dir)
+        self.chain = None
+        self.directory: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        """
+        Borrow the live chain for one request.
+
+        Yields:
+            The retrieval chain, kept open until the lease is returned
+
+        Raises:
+            ValueError: If no chain has been loaded yet
+        """
+
+        with self._lock:
+            chain = self.chain
+            if chain is None:
+                raise ValueError("No retrieval chain loaded. Call reload() first.")
+            self._leases[id(chain)] = self._leases.get(id(chain), 0) + 1
+        try:
+            yield chain
+        finally:
+            self._release(chain)
+
+    def _release(self, chain: Any) -> None:
+        key = id(chain)
+        with self._lock:
+            self._leases[key] -= 1
+            if self._leases[key]:
+                return
+            del self._leases[key]
+            retired = self._retired.pop(key, None)
+        if retired is not None:
+            self._close(retired)
+
+    def reload(self) -> Path:
+        """
+        Load the active index version and swap it in.
+
+        Only one reload runs at a time. If loading fails, the live chain
+        keeps serving and the error is raised.
+
+        Returns:
+            Index directory of the new chain
+        """
+
+        with self._reload_lock:
+            directory = current_index_directory(self.db_dir)
+            print(f"Loading retrieval chain: {directory}")
+            chain = self.factory(directory)
+
+            with self._lock:
+                old, self.chain, self.directory = self.chain, chain, directory
+                if old is not None and self._leases.get(id(old)):
+                    # Closed by the last in-flight request
+                    self._retired[id(old)] = old
+                    old = None
+            if old is not None:
+                self._close(old)
+
+        print(f"Retrieval chain swapped: {directory} (index version {getattr(chain, 'index_version', None)})")
+        return directory
+
+    def in_use(self) -> bool:
+        """
+        Check whether requests currently hold a lease on the live chain.
+
+        Returns:
+            True if the live chain is leased
+        """
+
+        with self._lock:
+            return self.chain is not None and bool(self._leases.get(id(self.chain)))
+
+    def unload(self) -> None:
+        """
+        Drop the live chain to free its memory; ``reload`` loads it again.
+
+        Requests still holding a lease finish on it before it is closed.
+        """
+
+        with self._reload_lock:
+            with self._lock:
+                old, self.chain, self.directory = self.chain, None, None
+                if old is not None and self._leases.get(id(old)):
+                    self._retired[id(old)] = old
+                    old = None
+            if old is not None:
+                self._close(old)
+
+    def reload_in_background(self) -> threading.Thread:
+        """
+        Reload in a background thread; errors are logged and the live chain is kept.
+
+        Returns:
+            The started thread
+        """
+
+        def run() -> None:
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Reload failed, keeping the current retrieval chain: {e}")
+
+        thread = threading.Thread(target=run, name="rag-reload", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _close(chain: Any) -> None:
+        close = getattr(chain, "close", None)
+        if close is not None:
+            close()
+        gc.collect()
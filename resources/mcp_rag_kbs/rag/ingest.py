@@ -0,0 +1,271 @@
+import hashlib
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag.parsing_outputs import CHUNK_FILE_SUFFIX, find_chunk_files, iter_chunks
+from rag.storage import atomic_file, update_fingerprint
+
+# Bump when the layout written by IngestManifest.save changes
+MANIFEST_FORMAT_VERSION = 1
+
+
+def discover_sources(directories: Iterable[Union[str, Path]]) -> Dict[str, Path]:
+    """
+    Find the parsing outputs to index in parsing output directories.
+
+    A directory contributes its chunk files (``.parquet``, or ``.pkl`` when
+    no chunk file of the same name exists); directories without any chunk
+    file contribute their ``.md`` outputs instead.
+
+    Args:
+        directories: Parsing output directories
+
+    Returns:
+        Mapping from source key (``<directory name>/<file stem>``) to file
+    """
+
+    sources = {}
+    for directory in directories:
+        directory = Path(directory)
+        chunk_files = find_chunk_files(directory)
+        stems = {path.stem for path in chunk_files}
+        files = chunk_files + [path for path in sorted(directory.glob("*.pkl")) if path.stem not in stems]
+        if not files:
+            files = sorted(directory.glob("*.md"))
+        for path in files:
+            sources[f"{directory.name}/{path.stem}"] = path
+    return sources
+
+
+def load_source_documents(path: Union[str, Path],
+                          text_splitter: Optional[RecursiveCharacterTextSplitter] = None) -> List[Document]:
+    """
+    Load the chunks of one parsing output.
+
+    Args:
+        path: Chunk file (``.parquet`` or ``.pkl``) or markdown output (``.md``)
+        text_splitter: Splitter for markdown outputs
+
+    Returns:
+        Chunks of the output
+    """
+
+    path = Path(path)
+    if path.suffix == CHUNK_FILE_SUFFIX:
+        return list(iter_chunks([path]))
+    if path.suffix == ".pkl":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    text_splitter = text_splitter or RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=50)
+    text = path.read_text(encoding="utf-8")
+    return text_splitter.create_documents([text], metadatas=[{"source": f"{path.stem}.pdf"}])
+
+
+def content_hash(docs: Iterable[Document]) -> str:
+    """
+    Hash the chunks of a source, independently of the file format they were read from.
+
+    Args:
+        docs: Chunks of the source
+
+    Returns:
+        Hex digest of the contents and metadata
+    """
+
+    digest = hashlib.sha256()
+    for doc in docs:
+        update_fingerprint(digest, doc.page_content)
+        update_fingerprint(digest, json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False, default=str))
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Record of the sources indexed in a vector store and their FAISS rows.
+
+    Each source entry keeps the content hash of its chunks, the file stat
+    seen at the last ingest (so unchanged files are not even read) and the
+    rows its chunks were appended at (or collapsed into, for near-duplicates
+    of chunks already indexed). Rows of removed or changed sources
+    become tombstones: their vectors stay in the index but are never
+    returned.
+    """
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 sources: Optional[Dict[str, Dict[str, Any]]] = None,
+                 tombstones: Optional[List[int]] = None,
+                 keyword_fingerprint: Optional[str] = None) -> None:
+        """
+        Initialize a manifest.
+
+        Args:
+            path: Manifest file
+            sources: Source entries by source key
+            tombstones: Removed rows
+            keyword_fingerprint: Fingerprint of the keyword index matching the rows
+        """
+
+        self.path = Path(path)
+        self.sources = sources or {}
+        self.tombstones = tombstones or []
+        self.keyword_fingerprint = keyword_fingerprint
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["IngestManifest"]:
+        """
+        Load a manifest.
+
+        Args:
+            path: Manifest file
+
+        Returns:
+            The manifest, or None if it does not exist
+
+        Raises:
+            ValueError: If the manifest is of another format version
+        """
+
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format_version") != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported ingest manifest format version: {data.get('format_version')}")
+        return cls(path, data["sources"], data["tombstones"], data.get("keyword_fingerprint"))
+
+    def save(self) -> None:
+        """
+        Write the manifest atomically.
+        """
+
+        data = {
+            "format_version": MANIFEST_FORMAT_VERSION,
+            "sources": self.sources,
+            "tombstones": sorted(self.tombstones),
+            "keyword_fingerprint": self.keyword_fingerprint,
+        }
+        with atomic_file(self.path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+
+    def is_unchanged(self, key: str, path: Path) -> bool:
+        """
+        Check from the file stat alone whether a source is unchanged since the last ingest.
+
+        Args:
+            key: Source key
+            path: Source file
+
+        Returns:
+            True if the same file was ingested with the same size and modification time
+        """
+
+        entry = self.sources.get(key)
+        if entry is None or entry.get("file") != path.name:
+            return False
+        stat = path.stat()
+        return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+    def record(self,
+               key: str,
+               path: Path,
+               digest: str,
+               rows: List[int],
+               references: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Record an ingested source.
+
+        Args:
+            key: Source key
+            path: Source file
+            digest: Content hash of its chunks
+            rows: Rows its chunks are stored at
+            references: Source reference of every chunk (see rag.dedup.source_reference)
+        """
+
+        stat = path.stat()
+        self.sources[key] = {
+            "file": path.name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": digest,
+            "rows": rows,
+        }
+        if references is not None:
+            self.sources[key]["references"] = references
+
+    def remove(self, key: str) -> Tuple[List[int], List[Tuple[int, Dict[str, Any]]]]:
+        """
+        Forget a source and tombstone its rows.
+
+        Rows still recorded for another source (a near-duplicate chunk
+        collapsed into one row, see rag.dedup) stay live; the references the
+        removed source holds on them are returned, so they can be dropped
+        from the row metadata.
+
+        Args:
+            key: Source key
+
+        Returns:
+            Tuple of (tombstoned rows, (shared row, source reference) pairs)
+        """
+
+        entry = self.sources.pop(key)
+        shared = {row for other in self.sources.values() for row in other["rows"]}
+        rows = sorted({row for row in entry["rows"] if row not in shared})
+        self.tombstones.extend(rows)
+        # Entries recorded without references keep their references on shared rows
+        references = entry.get("references") or [None] * len(entry["rows"])
+        released = [
+            (row, reference) for row, reference in zip(entry["rows"], references)
+            if row in shared and reference is not None
+        ]
+        return rows, released
+
+
+def rows_by_content(row_docs: Iterable[Tuple[int, Document]]) -> Dict[str, List[int]]:
+    """
+    Index the rows of an existing vector store by chunk content.
+
+    Args:
+        row_docs: (row, document) pairs of the vector store
+
+    Returns:
+        Mapping from page content to rows, in row order
+    """
+
+    by_content: Dict[str, List[int]] = {}
+    for row, doc in row_docs:
+        by_content.setdefault(doc.page_content, []).append(row)
+    return by_content
+
+
+def claim_existing_rows(docs: List[Document], by_content: Dict[str, List[int]]) -> Optional[List[int]]:
+    """
+    Find the rows of an existing vector store already holding the chunks of a source.
+
+    Used to adopt a vector store built before ingest manifests existed,
+    so its sources are not embedded again.
+
+    Args:
+        docs: Chunks of the source
+        by_content: Unclaimed rows by content (see rows_by_content); claimed rows are removed
+
+    Returns:
+        One row per chunk, or None if some chunk is not in the vector store
+    """
+
+    needed: Dict[str, int] = {}
+    for doc in docs:
+        needed[doc.page_content] = needed.get(doc.page_content, 0) + 1
+    if any(len(by_content.get(content, ())) < count for content, count in needed.items()):
+        return None
+    return [by_content[doc.page_content].pop(0) for doc in docs]
@@ -1,8 +1,45 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable, Tuple, Union
 import os
+import pickle
+import shutil
+from pathlib import Path
+
+import faiss
+import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from rag.ann import (
+    INDEX_TYPES,
+    QUANTIZED_INDEX_TYPES,
+    RerankIndex,
+    apply_search_params,
+    index_variant_path,
+    read_index,
+    vectors_path,
+)
 from rag.base import PersistRetrievalChain
+from rag.bm25 import BM25Index, SparseBM25Retriever
+from rag.chunk_store import ChunkStore, ChunkStoreDocstore, IdentityIndexMapping
+from rag.dedup import (
+    MinHashDeduplicator,
+    collapse_duplicates,
+    duplicate_stats,
+    format_dedup_stats,
+    load_signatures,
+    release_reference,
+    save_signatures,
+    source_reference,
+)
+from rag.ingest import (
+    IngestManifest,
+    claim_existing_rows,
+    content_hash,
+    discover_sources,
+    load_source_documents,
+    rows_by_content,
+)
+from rag.storage import atomic_file
 
 class KBSRetrievalChain(PersistRetrievalChain):
     """
@@ -12,10 +49,20 @@ class KBSRetrievalChain(PersistRetrievalChain):
     for retrieval.
     """
     
+    VECTORSTORE_MODES = ("pickle", "mmap")
+    
     def __init__(self, 
                  persist_directory: Optional[str] = None,
                  db_index_name: Optional[str] = None,
                  split_docs: Optional[List[Document]] = None,
+                 vectorstore_mode: str = "pickle",
+                 chunk_store_name: Optional[str] = None,
+                 index_type: str = "flat",
+                 ef_search: Optional[int] = None,
+                 nprobe: Optional[int] = None,
+                 rerank_factor: Optional[int] = None,
+                 manifest_name: Optional[str] = None,
+                 dedup_threshold: Optional[float] = None,
                  **kwargs) -> None:
         """
         Initialize a KBS retrieval chain.
@@ -23,10 +70,555 @@ class KBSRetrievalChain(PersistRetrievalChain):
         Args:
             persist_directory: Directory to persist vector store
             db_index_name: Index name of the vector store
+            split_docs: Split document chunks; in "mmap" mode the chunk store is used when omitted
+            vectorstore_mode: "pickle" loads the FAISS store with its pickled docstore,
+                "mmap" memory maps the FAISS index and resolves chunks lazily from the chunk store
+            chunk_store_name: Directory name of the chunk store (default: "<db_index_name>_chunks")
+            index_type: Vector index variant, "flat" (exact), "hnsw", "ivf_flat" or one of the
+                quantized variants "fp16", "sq8", "pq", "ivf_pq"
+                (build them with `python index_tools.py build-ann`)
+            ef_search: HNSW search depth
+            nprobe: Number of IVF cells visited per query
+            rerank_factor: For quantized variants, re-rank ``k * rerank_factor`` candidates
+                with the exact vectors; None or 0 disables re-ranking
+            manifest_name: File name of the ingest manifest (default: "<db_index_name>_manifest.json")
+            dedup_threshold: When ingesting, collapse new chunks whose estimated Jaccard similarity
+                to an indexed (or earlier new) chunk reaches this threshold; None disables it.
+                The MinHash signatures of indexed chunks are kept in "<db_index_name>_minhash",
+                so an ingest only hashes its new chunks
             **kwargs: Additional keyword arguments for the base RetrievalChain
+            
+        Raises:
+            ValueError: If the vector store mode or index type is unknown
         """
 
+        if vectorstore_mode not in self.VECTORSTORE_MODES:
+            raise ValueError(f"Unknown vector store mode: {vectorstore_mode}. Expected one of {self.VECTORSTORE_MODES}.")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES}.")
+
         super().__init__(persist_directory=persist_directory, db_index_name=db_index_name, split_docs=split_docs, **kwargs)
+        self.vectorstore_mode = vectorstore_mode
+        self.chunk_store_name = chunk_store_name or (f"{db_index_name}_chunks" if db_index_name else None)
+        self.chunk_store = None
+        self.index_type = index_type
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor if index_type in QUANTIZED_INDEX_TYPES else None
+        self.manifest_name = manifest_name or (f"{db_index_name}_manifest.json" if db_index_name else None)
+        self.manifest = None
+        self.deduplicator = MinHashDeduplicator(dedup_threshold) if dedup_threshold else None
+        self.signatures_name = f"{db_index_name}_minhash" if db_index_name else None
+    
+    def create_retrievers(self, split_docs: Optional[List[Document]]) -> Any:
+        """
+        Create all retriever types.
+        
+        In "mmap" mode without split documents, the keyword index is built
+        over (and resolves documents from) the chunk store.
+        
+        Args:
+            split_docs: Split document chunks
+            
+        Returns:
+            Dictionary of retrievers by search type
+        """
+
+        if split_docs is None and self.vectorstore_mode == "mmap":
+            split_docs = self.split_docs = self.open_chunk_store()
+            # Chunk store ids are vector store rows
+            self.keyword_ids_are_rows = True
+        
+        self.manifest = self.load_manifest()
+        self.tombstones = np.asarray(self.manifest.tombstones if self.manifest else [], dtype=np.int64)
+        return super().create_retrievers(split_docs)
+    
+    def load_manifest(self) -> Optional[IngestManifest]:
+        """
+        Load the ingest manifest of the vector store, if sources were ingested incrementally.
+        
+        Returns:
+            The manifest, or None
+        """
+
+        if not self.persist_directory or not self.manifest_name:
+            return None
+        return IngestManifest.load(Path(self.persist_directory) / self.manifest_name)
+    
+    def row_documents(self, vectorstore: Optional[Any] = None) -> Any:
+        """
+        Return the documents of the vector store in row order.
+        
+        Args:
+            vectorstore: Vector store to read (default: the loaded one)
+            
+        Returns:
+            A list of documents, or the chunk store in "mmap" mode
+        """
+
+        if vectorstore is None and self.vectorstore_mode == "mmap":
+            return self.open_chunk_store()
+        vectorstore = vectorstore or self.vectorstore
+        return [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(vectorstore.index.ntotal)
+        ]
+    
+    def create_keyword_retriever(self, split_docs: Any) -> Any:
+        """
+        Create a keyword-based search retriever.
+        
+        Once sources are ingested incrementally, the keyword index covers
+        the vector store rows (tombstones included, never returned) and is
+        validated against the fingerprint recorded in the manifest.
+        
+        Args:
+            split_docs: Split document chunks
+            
+        Returns:
+            A keyword search retriever
+        """
+
+        if self.manifest is None:
+            return super().create_keyword_retriever(split_docs)
+        
+        docs = self.split_docs = self.row_documents()
+        self.keyword_ids_are_rows = True
+        index_path = Path(self.persist_directory) / self.keyword_index_name
+        index = BM25Index.load(index_path, fingerprint=self.manifest.keyword_fingerprint)
+        if index is not None and index.num_docs == len(docs):
+            print(f"Loading existing keyword index: {index_path}")
+        else:
+            print(f"Creating new keyword index: {index_path}")
+            index = self.build_row_keyword_index(docs, self.tombstones)
+            index.save(index_path)
+            self.manifest.keyword_fingerprint = index.fingerprint
+            self.manifest.save()
+        
+        return SparseBM25Retriever(index=index, docs=docs, k=self.k)
+    
+    def build_row_keyword_index(self, docs: Iterable[Document], tombstones: Iterable[int]) -> BM25Index:
+        """
+        Build the keyword index over vector store rows from scratch.
+        
+        Args:
+            docs: Documents in row order
+            tombstones: Removed rows
+            
+        Returns:
+            A BM25 index
+        """
+
+        index = BM25Index.from_texts(doc.page_content for doc in docs)
+        tombstones = list(tombstones)
+        return index.remove(tombstones) if tombstones else index
+    
+    def ingest(self,
+               directories: Iterable[Union[str, Path]],
+               text_splitter: Optional[RecursiveCharacterTextSplitter] = None) -> Dict[str, int]:
+        """
+        Incrementally index new, changed and removed parsing outputs.
+        
+        Sources are compared with the ingest manifest by file stat, then by
+        content hash, so only new or changed chunks are embedded (with the
+        passage model) and appended to the FAISS index, its approximate
+        variants and the keyword index. Chunks of changed or removed sources
+        are tombstoned. A vector store built before manifests existed is
+        adopted: sources whose chunks it already holds are not embedded again.
+        With a deduplicator, new chunks that near-duplicate a live row (or an
+        earlier new chunk) are not embedded but collapsed into it; the
+        references of changed or removed sources are dropped from the rows
+        other sources still share.
+        
+        If the chain is initialized, it is reloaded afterwards.
+        
+        Args:
+            directories: Parsing output directories to scan; sources of other
+                directories recorded in the manifest are left untouched
+            text_splitter: Splitter for markdown outputs
+            
+        Returns:
+            Counts of added, updated, removed, adopted and unchanged sources,
+            of embedded, tombstoned and collapsed duplicate chunks, and of
+            references dropped from shared rows
+            
+        Raises:
+            ValueError: If there is no persist directory or keyword index name
+        """
+
+        if not self.persist_directory or not self.keyword_index_name:
+            raise ValueError("Incremental ingestion requires a persist directory and a keyword index name.")
+        
+        directories = [Path(directory) for directory in directories]
+        persist_directory = Path(self.persist_directory)
+        persist_directory.mkdir(parents=True, exist_ok=True)
+        stats = dict.fromkeys(
+            ("added", "updated", "removed", "adopted", "unchanged", "embedded_chunks", "tombstoned_chunks",
+             "duplicate_chunks", "released_references"), 0
+        )
+        
+        flat_path = index_variant_path(persist_directory, self.db_index_name, "flat")
+        vectorstore = self.load_pickled_vectorstore() if flat_path.exists() else None
+        num_rows = vectorstore.index.ntotal if vectorstore is not None else 0
+        
+        manifest = self.load_manifest()
+        by_content = None
+        if manifest is None:
+            manifest = IngestManifest(persist_directory / self.manifest_name)
+            if vectorstore is not None:
+                by_content = rows_by_content(enumerate(self.row_documents(vectorstore)))
+        old_tombstones = list(manifest.tombstones)
+        
+        # Diff the sources against the manifest
+        sources = discover_sources(directories)
+        pending = []
+        tombstoned = []
+        released = []
+        for key, path in sources.items():
+            if manifest.is_unchanged(key, path):
+                stats["unchanged"] += 1
+                continue
+            
+            docs = load_source_documents(path, text_splitter)
+            digest = content_hash(docs)
+            entry = manifest.sources.get(key)
+            if entry is not None and entry["content_hash"] == digest:
+                # Touched or converted (e.g. .pkl -> .parquet) without content changes
+                manifest.record(key, path, digest, entry["rows"], entry.get("references"))
+                stats["unchanged"] += 1
+                continue
+            if entry is None and by_content is not None:
+                rows = claim_existing_rows(docs, by_content)
+                if rows is not None:
+                    manifest.record(key, path, digest, rows, [source_reference(doc.metadata) for doc in docs])
+                    stats["adopted"] += 1
+                    continue
+            
+            if entry is not None:
+                rows, references = manifest.remove(key)
+                tombstoned.extend(rows)
+                released.extend(references)
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            pending.append((key, path, digest, docs))
+        
+        scanned = {directory.name for directory in directories}
+        for key in list(manifest.sources):
+            if key.split("/", 1)[0] in scanned and key not in sources:
+                rows, references = manifest.remove(key)
+                tombstoned.extend(rows)
+                released.extend(references)
+                stats["removed"] += 1
+        
+        # Shared rows stop listing (or are relabelled away from) the sources that left them
+        if released:
+            stats["released_references"] = sum(
+                release_reference(vectorstore.docstore.search(vectorstore.index_to_docstore_id[row]), reference)
+                for row, reference in released
+            )
+        
+        new_docs = [doc for _, _, _, docs in pending for doc in docs]
+        new_rows = list(range(num_rows, num_rows + len(new_docs)))
+        signatures = None
+        if self.deduplicator is not None and new_docs:
+            new_docs, new_rows, dedup_stats, signatures = self.collapse_new_duplicates(
+                vectorstore, manifest.tombstones, new_docs
+            )
+            stats["duplicate_chunks"] = dedup_stats["duplicate_chunks"]
+            dim = vectorstore.index.d if vectorstore is not None else None
+            print(f"Near-duplicate pass: {format_dedup_stats(dedup_stats, dim)}")
+        stats["embedded_chunks"] = len(new_docs)
+        stats["tombstoned_chunks"] = len(tombstoned)
+        
+        position = 0
+        for key, path, digest, docs in pending:
+            references = [source_reference(doc.metadata) for doc in docs]
+            manifest.record(key, path, digest, new_rows[position:position + len(docs)], references)
+            position += len(docs)
+        
+        keyword_path = persist_directory / self.keyword_index_name
+        keyword_index = None
+        if manifest.keyword_fingerprint:
+            keyword_index = BM25Index.load(keyword_path, fingerprint=manifest.keyword_fingerprint, mmap=False)
+        
+        if (not new_docs and not tombstoned and not stats["duplicate_chunks"] and not stats["released_references"]
+                and keyword_index is not None):
+            manifest.save()
+            return stats
+        
+        # Vectors: embed and append only the new chunks
+        if new_docs:
+            print(f"Embedding {len(new_docs)} new chunks")
+            texts = [doc.page_content for doc in new_docs]
+            vectors = self.create_passage_embedding().embed_documents(texts)
+            text_embeddings = list(zip(texts, vectors))
+            metadatas = [doc.metadata for doc in new_docs]
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(
+                    text_embeddings,
+                    self.embeddings or self.create_query_embedding(),
+                    metadatas=metadatas,
+                )
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+            
+            self.save_vectorstore(vectorstore)
+            self.append_index_variants(vectorstore.index.reconstruct_n(num_rows, len(new_docs)))
+            if signatures is not None:
+                save_signatures(persist_directory / self.signatures_name, self.deduplicator, *signatures)
+        elif stats["duplicate_chunks"] or stats["released_references"]:
+            # Only the source references of indexed chunks changed
+            self.save_vectorstore(vectorstore)
+        
+        # Keyword index: tokenize only the new chunks
+        if keyword_index is None or keyword_index.num_docs != num_rows:
+            row_docs = self.row_documents(vectorstore)[:num_rows] if vectorstore is not None else []
+            keyword_index = self.build_row_keyword_index(row_docs, old_tombstones)
+        if new_docs:
+            keyword_index = keyword_index.append(doc.page_content for doc in new_docs)
+        if tombstoned:
+            keyword_index = keyword_index.remove(tombstoned)
+        keyword_index.save(keyword_path)
+        manifest.keyword_fingerprint = keyword_index.fingerprint
+        
+        if self.chunk_store_name and (persist_directory / self.chunk_store_name).exists():
+            self.chunk_store = None
+            self.export_chunk_store()
+        
+        manifest.save()
+        print(f"Ingest complete: {stats}")
+        
+        if self.retrievers is not None:
+            self.initialize()
+        return stats
+    
+    def collapse_new_duplicates(self,
+                                vectorstore: Optional[Any],
+                                tombstones: Iterable[int],
+                                new_docs: List[Document]) -> Tuple[List[Document], List[int], Dict[str, int], Tuple]:
+        """
+        Collapse new chunks that near-duplicate a live row of the vector store or an earlier new chunk.
+        
+        Only the new chunks are hashed: indexed rows are matched through
+        their stored signatures (see ``load_row_signatures``). The source
+        references of collapsed chunks are added to the metadata of the
+        chunk they collapse into, in place for indexed rows.
+        
+        Args:
+            vectorstore: Pickled vector store, or None before the first ingest
+            tombstones: Removed rows, never collapsed into
+            new_docs: New chunks in row order
+            
+        Returns:
+            Tuple of (chunks to embed, row of every new chunk, duplicate statistics,
+            (signatures, band keys) of the rows once the kept chunks are appended)
+        """
+
+        num_rows = vectorstore.index.ntotal if vectorstore is not None else 0
+        signatures, keys = self.load_row_signatures(vectorstore)
+        live = np.ones(num_rows, dtype=bool)
+        live[np.fromiter(tombstones, dtype=np.int64)] = False
+        new_signatures = self.deduplicator.signatures([doc.page_content for doc in new_docs])
+        canonical = self.deduplicator.find_new_duplicates(signatures, keys, live, new_signatures)
+        
+        # Only the indexed rows new chunks collapse into take part, in front of the new chunks
+        target_rows = np.unique(canonical[canonical < num_rows])
+        canonical = np.concatenate([
+            np.arange(len(target_rows)),
+            np.where(canonical < num_rows,
+                     np.searchsorted(target_rows, canonical),
+                     canonical - num_rows + len(target_rows)),
+        ])
+        docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[row]) for row in target_rows.tolist()]
+        docs += new_docs
+        dedup_stats = duplicate_stats(docs, canonical, num_fixed=len(target_rows))
+        kept, positions = collapse_duplicates(docs, canonical, num_fixed=len(target_rows))
+        # Positions of indexed rows map back to their rows, kept chunks are appended after the existing rows
+        rows = np.concatenate([target_rows, np.arange(num_rows, num_rows + len(kept), dtype=np.int64)])
+        rows = rows[positions[len(target_rows):]]
+        
+        kept_signatures = new_signatures[canonical[len(target_rows):] == np.arange(len(target_rows), len(canonical))]
+        kept_keys = self.deduplicator.band_keys(kept_signatures)
+        return kept, rows.tolist(), dedup_stats, (np.concatenate([signatures, kept_signatures]),
+                                                  np.concatenate([keys, kept_keys]))
+    
+    def load_row_signatures(self, vectorstore: Optional[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Load the MinHash signatures and band keys of every vector store row.
+        
+        If they are missing, stale (rows were added without deduplication) or
+        made with other settings, they are computed from the stored chunks and
+        saved, once.
+        
+        Args:
+            vectorstore: Pickled vector store, or None before the first ingest
+            
+        Returns:
+            Tuple of (signatures, band keys), one row per vector store row
+        """
+
+        num_rows = vectorstore.index.ntotal if vectorstore is not None else 0
+        path = Path(self.persist_directory) / self.signatures_name
+        loaded = load_signatures(path, self.deduplicator)
+        if loaded is not None and len(loaded[0]) == num_rows:
+            return loaded
+        
+        print(f"Computing MinHash signatures of {num_rows} indexed chunks")
+        texts = [doc.page_content for doc in self.row_documents(vectorstore)] if num_rows else []
+        signatures = self.deduplicator.signatures(texts)
+        keys = self.deduplicator.band_keys(signatures)
+        save_signatures(path, self.deduplicator, signatures, keys)
+        return signatures, keys
+    
+    def save_vectorstore(self, vectorstore: Any) -> None:
+        """
+        Persist the FAISS index and its pickled docstore.
+        
+        Each file is replaced atomically, but not both together: a crash in
+        between leaves an index and docstore of different lengths, which
+        ``load_pickled_vectorstore`` refuses to load. Write to an inactive
+        index version (as ``index_tools.py ingest`` does, see rag.versions)
+        to update a served index atomically.
+        
+        Args:
+            vectorstore: Vector store to save
+        """
+
+        tmp_directory = Path(self.persist_directory) / f".{self.db_index_name}.tmp-{os.getpid()}"
+        try:
+            vectorstore.save_local(str(tmp_directory), self.db_index_name)
+            for suffix in (".faiss", ".pkl"):
+                os.replace(
+                    tmp_directory / f"{self.db_index_name}{suffix}",
+                    Path(self.persist_directory) / f"{self.db_index_name}{suffix}",
+                )
+        finally:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+    
+    def append_index_variants(self, vectors: np.ndarray) -> None:
+        """
+        Append vectors to every built index variant and to the re-ranking vectors.
+        
+        Args:
+            vectors: Vectors of the new rows, as stored in the flat index
+        """
+
+        for index_type in INDEX_TYPES[1:]:
+            path = index_variant_path(self.persist_directory, self.db_index_name, index_type)
+            if path.exists():
+                index = read_index(path)
+                index.add(vectors)
+                with atomic_file(path) as tmp_path:
+                    faiss.write_index(index, str(tmp_path))
+        
+        exact_path = vectors_path(self.persist_directory, self.db_index_name)
+        if exact_path.exists():
+            existing = np.load(exact_path, mmap_mode="r")
+            with atomic_file(exact_path) as tmp_path:
+                np.save(tmp_path, np.concatenate([existing, vectors.astype(np.float32)]))
+    
+    def close(self) -> None:
+        """
+        Release the resources of the chain, including the memory mapped chunk store.
+        """
+
+        super().close()
+        self.chunk_store = None
+    
+    def open_chunk_store(self) -> ChunkStore:
+        """
+        Open the chunk store of the vector store, once.
+        
+        Returns:
+            The memory mapped chunk store
+        """
+
+        if self.chunk_store is None:
+            self.chunk_store = ChunkStore.open(Path(self.persist_directory) / self.chunk_store_name)
+        return self.chunk_store
+    
+    def export_chunk_store(self) -> ChunkStore:
+        """
+        Write the chunks of the pickled FAISS docstore to a chunk store, in FAISS id order.
+        
+        This converts an existing vector store for the "mmap" loading mode.
+        
+        Returns:
+            The written chunk store
+        """
+
+        vectorstore = self.load_pickled_vectorstore()
+        docs = (
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in range(vectorstore.index.ntotal)
+        )
+        self.chunk_store = ChunkStore.write(Path(self.persist_directory) / self.chunk_store_name, docs)
+        return self.chunk_store
+    
+    def load_pickled_vectorstore(self, index: Optional[Any] = None) -> Any:
+        """
+        Load the FAISS vector store together with its pickled docstore.
+        
+        Args:
+            index: Index to use instead of reading the flat index file
+        
+        Returns:
+            A vector store instance
+            
+        Raises:
+            ValueError: If the index and the docstore do not have the same number of rows
+        """
+
+        if index is not None:
+            # Same layout as FAISS.save_local: (docstore, index_to_docstore_id)
+            with open(Path(self.persist_directory) / f"{self.db_index_name}.pkl", "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            vectorstore = FAISS(
+                embedding_function=self.embeddings or self.create_query_embedding(),
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id,
+            )
+        else:
+            vectorstore = FAISS.load_local(
+                folder_path=self.persist_directory,
+                index_name=self.db_index_name,
+                embeddings=self.embeddings or self.create_query_embedding(),
+                allow_dangerous_deserialization=True,
+            )
+        
+        if len(vectorstore.index_to_docstore_id) != vectorstore.index.ntotal:
+            raise ValueError(
+                f"The docstore of {self.db_index_name} has {len(vectorstore.index_to_docstore_id)} chunks but its "
+                f"index has {vectorstore.index.ntotal} vectors (interrupted write?); rebuild it or activate "
+                "another index version."
+            )
+        return vectorstore
+    
+    def load_mmap_vectorstore(self) -> Any:
+        """
+        Load the FAISS index with memory mapped I/O and resolve chunks from the chunk store.
+        
+        Returns:
+            A vector store instance
+            
+        Raises:
+            ValueError: If the chunk store does not match the FAISS index
+        """
+
+        index = read_index(index_variant_path(self.persist_directory, self.db_index_name, "flat"), mmap=True)
+        
+        store = self.open_chunk_store()
+        if len(store) != index.ntotal:
+            raise ValueError(f"Chunk store has {len(store)} chunks but the FAISS index has {index.ntotal} vectors.")
+        
+        return FAISS(
+            embedding_function=self.embeddings or self.create_query_embedding(),
+            index=index,
+            docstore=ChunkStoreDocstore(store),
+            index_to_docstore_id=IdentityIndexMapping(len(store)),
+        )
     
     def create_vectorstore(self) -> Any:
         """
@@ -51,10 +643,59 @@ class KBSRetrievalChain(PersistRetrievalChain):
                 print(f"Loading existing vector store: {self.persist_directory}")
 
                 # 저장된 데이터를 로드
-                vectorstore = FAISS.load_local(
-                    folder_path=self.persist_directory,
-                    index_name=self.db_index_name,
-                    embeddings=self.create_query_embedding(),
-                    allow_dangerous_deserialization=True,
-                )
-        return vectorstore
\ No newline at end of file
+                if self.vectorstore_mode == "mmap":
+                    vectorstore = self.load_mmap_vectorstore()
+                    if self.index_type != "flat":
+                        vectorstore.index = self.load_index_variant()
+                elif self.index_type != "flat":
+                    # Skip reading the full precision flat index
+                    vectorstore = self.load_pickled_vectorstore(index=self.load_index_variant())
+                else:
+                    vectorstore = self.load_pickled_vectorstore()
+        return vectorstore
+    
+    def load_index_variant(self) -> Any:
+        """
+        Load the configured approximate index variant in place of the flat index.
+        
+        Variants keep the row order of the flat index, so the docstore
+        mapping of the vector store stays valid. Quantized variants are
+        wrapped in a RerankIndex when re-ranking is enabled.
+        
+        Returns:
+            The FAISS index with its search parameters applied
+            
+        Raises:
+            ValueError: If the variant (or its re-ranking vectors) has not been built
+        """
+
+        path = index_variant_path(self.persist_directory, self.db_index_name, self.index_type)
+        if not path.exists():
+            raise ValueError(f"Index variant not found: {path}. Build it with `python index_tools.py build-ann`.")
+        
+        print(f"Loading {self.index_type} index: {path}")
+        index = read_index(path, mmap=self.vectorstore_mode == "mmap")
+        index = apply_search_params(index, ef_search=self.ef_search, nprobe=self.nprobe)
+        
+        if self.rerank_factor:
+            exact_path = vectors_path(self.persist_directory, self.db_index_name)
+            if not exact_path.exists():
+                raise ValueError(f"Re-ranking vectors not found: {exact_path}. Build them with `python index_tools.py build-ann`.")
+            index = RerankIndex(index, np.load(exact_path, mmap_mode="r"), self.rerank_factor)
+        return index
+    
+    def index_artifact_paths(self) -> List[Path]:
+        """
+        Files of the persisted vector store that determine search results,
+        including the loaded index variant.
+        
+        Returns:
+            Paths of the vector store artifacts
+        """
+
+        paths = super().index_artifact_paths()
+        if self.persist_directory and self.index_type != "flat":
+            paths.append(index_variant_path(self.persist_directory, self.db_index_name, self.index_type))
+        if self.persist_directory and self.rerank_factor:
+            paths.append(vectors_path(self.persist_directory, self.db_index_name))
+        return paths
@@ -0,0 +1,202 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.dedup import DUPLICATES_KEY, REFERENCE_FIELDS
+
+# Chunk metadata fields indexed for filtered search
+DEFAULT_FILTER_FIELDS = ("source", "page", "images")
+
+
+def _index_value(value: Any) -> Any:
+    # List-valued metadata (e.g. images) is indexed by whether it is non-empty
+    if isinstance(value, (list, tuple, set, dict)):
+        return bool(value)
+    return value
+
+
+def filter_key(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Canonical string of a metadata filter, e.g. for cache keys.
+
+    Args:
+        filters: Metadata filter, or None
+
+    Returns:
+        The filter as sorted JSON, or None for no (or an empty) filter
+    """
+
+    if not filters:
+        return None
+    return json.dumps(filters, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class MetadataIndex:
+    """
+    Posting lists from chunk metadata values to row ids, for filtered search.
+
+    Every indexed field maps each of its values to the sorted array of the
+    rows carrying it. A filter is resolved by merging the posting lists of
+    the requested values, so its cost depends on the size of those lists
+    and not on the size of the corpus.
+
+    Rows holding collapsed near-duplicates are posted under the source and
+    page of every copy. Their references are kept as well, so a filter on
+    both fields only matches a row if one copy has both values.
+    """
+
+    def __init__(self,
+                 postings: Dict[str, Dict[Any, np.ndarray]],
+                 num_rows: int,
+                 references: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> None:
+        """
+        Initialize a metadata index from posting lists. Use ``MetadataIndex.build``.
+
+        Args:
+            postings: Sorted row ids by value, by field
+            num_rows: Number of rows covered by the index
+            references: Indexed source and page of every copy, for the rows holding near-duplicates
+        """
+
+        self.postings = postings
+        self.num_rows = num_rows
+        self.references = references or {}
+        self._reference_rows = np.fromiter(sorted(self.references), dtype=np.int64, count=len(self.references))
+
+    @classmethod
+    def build(cls,
+              docs: Iterable[Document],
+              fields: Sequence[str] = DEFAULT_FILTER_FIELDS,
+              exclude: Iterable[int] = ()) -> "MetadataIndex":
+        """
+        Index the metadata of documents in row order.
+
+        Scalar values are indexed as they are and list values by whether
+        they are non-empty, so ``{"images": True}`` selects the chunks with
+        images. Missing (None) values are not indexed. The source references
+        of near-duplicates collapsed into a chunk (see rag.dedup) are indexed
+        as values of the chunk too, and kept per copy so that source and page
+        filters are matched against one copy at a time.
+
+        Args:
+            docs: Documents in row order
+            fields: Metadata fields to index
+            exclude: Rows left out of every posting list (removed chunks)
+
+        Returns:
+            The metadata index
+        """
+
+        excluded = {int(i) for i in exclude}
+        rows: Dict[str, Dict[Any, List[int]]] = {field: {} for field in fields}
+        references: Dict[int, List[Dict[str, Any]]] = {}
+        reference_fields = [field for field in fields if field in REFERENCE_FIELDS]
+        num_rows = 0
+        for i, doc in enumerate(docs):
+            num_rows = i + 1
+            metadata = getattr(doc, "metadata", None)
+            if i in excluded or not metadata:
+                continue
+            copies = [metadata, *metadata.get(DUPLICATES_KEY, ())]
+            if len(copies) > 1 and len(reference_fields) > 1:
+                references[i] = [
+                    {field: _index_value(copy[field]) for field in reference_fields if copy.get(field) is not None}
+                    for copy in copies
+                ]
+            for reference in copies:
+                for field in fields:
+                    value = reference.get(field)
+                    if value is None:
+                        continue
+                    ids = rows[field].setdefault(_index_value(value), [])
+                    if not ids or ids[-1] != i:
+                        ids.append(i)
+
+        postings = {
+            field: {value: np.asarray(ids, dtype=np.int64) for value, ids in values.items()}
+            for field, values in rows.items()
+        }
+        return cls(postings, num_rows, references)
+
+    @property
+    def fields(self) -> List[str]:
+        """Indexed metadata fields."""
+        return list(self.postings)
+
+    def values(self, field: str) -> List[Any]:
+        """
+        Return the distinct indexed values of a field.
+
+        Args:
+            field: Metadata field
+
+        Returns:
+            Values in first-seen row order
+        """
+
+        return list(self.postings.get(field, {}))
+
+    def select(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Return the rows matching a filter.
+
+        A field matches any of the values given as a list (or tuple or set);
+        all fields of the filter must match. Rows without a field never
+        match a filter on it. Source and page must match the same copy of
+        a row holding near-duplicates.
+
+        Args:
+            filters: Wanted value (or values) by metadata field, at least one field
+
+        Returns:
+            Sorted row ids
+
+        Raises:
+            ValueError: If the filter is empty or a field is not indexed
+        """
+
+        if not filters:
+            raise ValueError("The metadata filter is empty.")
+        unknown = [field for field in filters if field not in self.postings]
+        if unknown:
+            raise ValueError(f"Cannot filter on {unknown}. Indexed metadata fields: {self.fields}.")
+
+        matches = []
+        wanted_references = {}
+        for field, wanted in filters.items():
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            if field in REFERENCE_FIELDS:
+                wanted_references[field] = {_index_value(value) for value in values}
+            lists = [self.postings[field].get(_index_value(value)) for value in values]
+            lists = [rows for rows in lists if rows is not None]
+            if not lists:
+                return np.empty(0, dtype=np.int64)
+            matches.append(lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists)))
+
+        # Intersect the shortest lists first
+        matches.sort(key=len)
+        rows = matches[0]
+        for other in matches[1:]:
+            if rows.size == 0:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+
+        # Fields of one copy were posted independently of the other copies: re-check those rows
+        if len(wanted_references) > 1 and rows.size and self._reference_rows.size:
+            mismatched = [
+                row for row in np.intersect1d(rows, self._reference_rows, assume_unique=True).tolist()
+                if not any(
+                    all(reference.get(field) in values for field, values in wanted_references.items())
+                    for reference in self.references[row]
+                )
+            ]
+            if mismatched:
+                rows = np.setdiff1d(rows, mismatched, assume_unique=True)
+        return rows
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the posting lists in bytes."""
+        return sum(rows.nbytes for values in self.postings.values() for rows in values.values())
@@ -0,0 +1,120 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Time spent in one retrieval stage (embed, keyword, semantic, fuse, mmr, format)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total",
+    "Cache lookups by cache and result (memory_hit, disk_hit, hit, miss)",
+    ["cache", "result"],
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "rag_requests_in_flight",
+    "Tool calls currently being served",
+    ["tool"],
+)
+
+REQUESTS = Counter(
+    "rag_requests_total",
+    "Tool calls by tool, corpus and status",
+    ["tool", "corpus", "status"],
+)
+
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds",
+    "End-to-end latency of a tool call",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RESULT_DOCUMENTS = Histogram(
+    "rag_result_documents",
+    "Number of documents returned per query",
+    ["tool"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64),
+)
+
+RESULT_BYTES = Histogram(
+    "rag_result_bytes",
+    "Size of the formatted tool response in bytes",
+    ["tool"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Record the duration of a retrieval stage in ``rag_stage_seconds``.
+
+    Args:
+        stage: Stage name
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_request(tool: str, corpus: str) -> Iterator[None]:
+    """
+    Count a tool call, keep it in the in-flight gauge and record its latency.
+
+    Args:
+        tool: Tool name
+        corpus: Corpus the call searches
+    """
+
+    in_flight = REQUESTS_IN_FLIGHT.labels(tool)
+    in_flight.inc()
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        in_flight.dec()
+        REQUEST_SECONDS.labels(tool).observe(time.perf_counter() - start)
+        REQUESTS.labels(tool, corpus, status).inc()
+
+
+def observe_result(tool: str, documents: Sequence[int], response: str) -> None:
+    """
+    Record the number of documents per query and the size of the formatted response.
+
+    Args:
+        tool: Tool name
+        documents: Number of documents returned for each query
+        response: Formatted response text
+    """
+
+    histogram = RESULT_DOCUMENTS.labels(tool)
+    for count in documents:
+        histogram.observe(count)
+    RESULT_BYTES.labels(tool).observe(len(response.encode("utf-8")))
+
+
+def metrics_response() -> tuple:
+    """
+    Render every registered metric in the Prometheus text format.
+
+    Returns:
+        Tuple of (body bytes, content type)
+    """
+
+    return generate_latest(), CONTENT_TYPE_LATEST
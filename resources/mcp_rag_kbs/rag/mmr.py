@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.5) -> np.ndarray:
+    """
+    Select k candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max similarity to the picked ones``.
+    Relevance is min-max normalized to [0, 1] and similarity is the cosine
+    of the candidate vectors, computed once for all pairs as a single
+    matrix product; the selection loop only updates one running maximum
+    per candidate. Candidates with a zero vector (unknown) are never
+    penalized as redundant.
+
+    Args:
+        relevance: Relevance score of each candidate, higher is better
+        vectors: Candidate vectors of shape ``(n, d)``
+        k: Number of candidates to select
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+
+    Returns:
+        Indices of the selected candidates, in selection order
+
+    Raises:
+        ValueError: If lambda_mult is not between 0 and 1
+    """
+
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError(f"MMR lambda must be between 0 and 1, got {lambda_mult}.")
+    n = relevance.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    relevance = np.asarray(relevance, dtype=np.float64)
+    low, high = relevance.min(), relevance.max()
+    relevance = (relevance - low) / (high - low) if high > low else np.ones(n)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = unit @ unit.T
+
+    selected = np.empty(k, dtype=np.int64)
+    selected[0] = int(np.argmax(relevance))
+    max_similarity = similarity[selected[0]].astype(np.float64)
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    for step in range(1, k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected[step] = best
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
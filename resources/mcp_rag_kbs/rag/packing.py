@@ -0,0 +1,346 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+from rag.dedup import DUPLICATES_KEY
+
+OUTPUT_FORMATS = ("markdown", "json")
+NO_RESULTS = "No relevant information found."
+ELLIPSIS = "…"
+# Shortest passage worth returning; lower ranked results are dropped rather than cut shorter
+MIN_PASSAGE = {"chars": 200, "tokens": 60}
+# Passes that shrink the text budget when the rendered response overshoots
+# (JSON escapes, token merges across boundaries) before dropping a result
+FIT_ATTEMPTS = 4
+
+# A sentence, or the rest of a line that has no sentence end
+_SEGMENT = re.compile(r"[^\n]+?(?:[.?!。](?=\s)|$)", re.MULTILINE)
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(name: str) -> Optional[Any]:
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # tiktoken downloads the BPE file on first use
+        print(f"Token encoding {name} is unavailable ({type(e).__name__}), estimating token counts")
+        return None
+
+
+def count_tokens(text: str, encoding: str = "o200k_base") -> int:
+    """
+    Count the tokens of a text.
+
+    Falls back to an estimate of one token per non-ASCII character (Hangul
+    is rarely merged) and one per four ASCII characters when the tiktoken
+    encoding cannot be loaded.
+
+    Args:
+        text: Text to count
+        encoding: tiktoken encoding name
+
+    Returns:
+        Number of tokens
+    """
+
+    enc = _load_encoding(encoding)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    ascii_chars = sum(c.isascii() for c in text)
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def query_terms(query: str) -> List[Tuple[str, ...]]:
+    """
+    Split a query into terms for passage matching.
+
+    Each term is a tuple of alternatives: the lowercased word and, for
+    non-ASCII words of three or more characters, the word without its last
+    character so that Korean particles ("과정은" -> "과정") do not prevent a match.
+
+    Args:
+        query: Search query
+
+    Returns:
+        Term alternatives, one tuple per distinct word of two or more characters
+    """
+
+    terms = {}
+    for word in re.findall(r"\w+", query.lower()):
+        if len(word) < 2:
+            continue
+        terms[word] = (word, word[:-1]) if len(word) >= 3 and not word.isascii() else (word,)
+    return list(terms.values())
+
+
+def passage_window(text: str, terms: Sequence[Tuple[str, ...]], allowance: int,
+                   measure: Callable[[str], int]) -> Tuple[str, bool]:
+    """
+    Trim a chunk to the window of consecutive sentences that matches the most query terms.
+
+    Windows are scored by the number of term matches of their sentences;
+    ties go to the earliest window. Trimmed ends are marked with an ellipsis.
+
+    Args:
+        text: Chunk text
+        terms: Query terms from ``query_terms``
+        allowance: Budget of the passage, in the units of ``measure``
+        measure: Size of a text (characters or tokens)
+
+    Returns:
+        Tuple of (passage, whether the text was trimmed)
+    """
+
+    if measure(text) <= allowance:
+        return text, False
+    allowance -= 2 * measure(ELLIPSIS)
+    spans = [m.span() for m in _SEGMENT.finditer(text)]
+    if allowance <= 0 or not spans:
+        return "", True
+    lowered = text.lower()
+    costs = [measure(text[start:end]) for start, end in spans]
+    hits = [sum(any(alt in lowered[start:end] for alt in alts) for alts in terms) for start, end in spans]
+
+    # Two pointer scan over windows [i, j) that fit the allowance
+    best_hits, best = -1, (0, 0)
+    j, cost, window_hits = 0, 0, 0
+    for i in range(len(spans)):
+        if j < i:
+            j, cost, window_hits = i, 0, 0
+        while j < len(spans) and cost + costs[j] <= allowance:
+            cost += costs[j]
+            window_hits += hits[j]
+            j += 1
+        if j > i:
+            if window_hits > best_hits:
+                best_hits, best = window_hits, (i, j)
+            cost -= costs[i]
+            window_hits -= hits[i]
+
+    if best_hits >= 0:
+        start, end = spans[best[0]][0], spans[best[1] - 1][1]
+    else:
+        # No sentence fits: cut the best matching sentence around its first match
+        i = max(range(len(spans)), key=lambda x: (hits[x], -x))
+        start, end = spans[i]
+        positions = [lowered.find(alt, start, end) for alts in terms for alt in alts]
+        first = min((p for p in positions if p >= 0), default=start)
+        length = (end - start) * allowance // costs[i]
+        while length > 0:
+            start = min(max(start, first - length // 4), end - length)
+            if measure(text[start:start + length]) <= allowance:
+                break
+            length = length * 9 // 10
+        end = start + length
+
+    passage = text[start:end].strip()
+    if not passage:
+        return "", True
+    return (ELLIPSIS if start > 0 else "") + passage + (ELLIPSIS if end < len(text) else ""), True
+
+
+def _allocate(costs: List[int], budget: int) -> List[int]:
+    # Max-min fair shares: short texts keep their full size, the rest split what is left evenly
+    allowances = [0] * len(costs)
+    remaining = budget
+    order = sorted(range(len(costs)), key=costs.__getitem__)
+    for position, i in enumerate(order):
+        allowances[i] = min(costs[i], remaining // (len(costs) - position))
+        remaining -= allowances[i]
+    return allowances
+
+
+def _page_info(doc: Document) -> str:
+    page = doc.metadata.get("page", None)
+    return f" (Page: {page+1})" if page is not None else ""
+
+
+def _also_in(doc: Document) -> List[Dict[str, Any]]:
+    # Source references of the near-duplicates collapsed into the chunk (see rag.dedup), pages from 1
+    references = []
+    for reference in doc.metadata.get(DUPLICATES_KEY) or ():
+        reference = dict(reference)
+        if reference.get("page") is not None:
+            reference["page"] += 1
+        if reference not in references:
+            references.append(reference)
+    return references
+
+
+def _render_markdown(groups: List[Dict[str, Any]], grouped: bool, omitted: int) -> str:
+    parts = [] if grouped else ["## Search Results\n\n"]
+    for q, group in enumerate(groups, 1):
+        if grouped:
+            parts.append(f"## Query {q}: {group['query']}\n\n")
+            if not group["items"]:
+                parts.append(f"{NO_RESULTS}\n\n")
+        for item in group["items"]:
+            if item["same_as"] is not None:
+                parts.append(f"### Result {item['rank']}\n\nSame chunk as {item['same_as']}.\n\n---\n\n")
+                continue
+            doc = item["doc"]
+            parts.append(f"### Result {item['rank']}{_page_info(doc)}\n\n")
+            parts.append(f"{item['text']}\n\n")
+            images = doc.metadata.get("images")
+            if images:
+                parts.append("**Related Images:**\n")
+                parts.extend(f"- {img}\n" for img in images)
+                parts.append("\n")
+            parts.append(f"Source: {doc.metadata.get('source', 'Unknown source')}\n\n")
+            also_in = _also_in(doc)
+            if also_in:
+                references = (
+                    reference.get("source", "Unknown source")
+                    + (f" (Page: {reference['page']})" if reference.get("page") is not None else "")
+                    for reference in also_in
+                )
+                parts.append(f"Also in: {', '.join(references)}\n\n")
+            parts.append("---\n\n")
+    if omitted:
+        parts.append(f"_{omitted} more results omitted to fit the budget._\n\n")
+    return "".join(parts)
+
+
+def _json_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    if item["same_as"] is not None:
+        return {"rank": item["rank"], "same_as": item["same_as"]}
+    doc = item["doc"]
+    record = {"rank": item["rank"], "source": doc.metadata.get("source", "Unknown source")}
+    if doc.metadata.get("page") is not None:
+        record["page"] = doc.metadata["page"] + 1
+    record["text"] = item["text"]
+    if doc.metadata.get("images"):
+        record["images"] = list(doc.metadata["images"])
+    also_in = _also_in(doc)
+    if also_in:
+        record["also_in"] = also_in
+    if item["truncated"]:
+        record["truncated"] = True
+    return record
+
+
+def _render_json(groups: List[Dict[str, Any]], grouped: bool, omitted: int) -> str:
+    if grouped:
+        payload = {"queries": [{"query": group["query"], "results": [_json_item(item) for item in group["items"]]}
+                               for group in groups]}
+    else:
+        payload = {"results": [_json_item(item) for group in groups for item in group["items"]]}
+    if omitted:
+        payload["omitted"] = omitted
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def pack_results(queries: List[str],
+                 results: List[List[Document]],
+                 max_chars: Optional[int] = None,
+                 max_tokens: Optional[int] = None,
+                 output_format: str = "markdown",
+                 grouped: bool = True,
+                 encoding: str = "o200k_base") -> str:
+    """
+    Format search results as markdown or compact JSON within a size budget.
+
+    Without a budget every chunk is returned in full. With one, each chunk
+    is trimmed to its best query-matching passage (``passage_window``) and
+    the budget is shared between the chunks; when the shares would fall
+    below ``MIN_PASSAGE``, the lowest ranked results (across queries) are
+    left out and counted as omitted. At least one result is kept, so a
+    budget smaller than the headers of the response is exceeded. The
+    response is assembled with a single join.
+
+    A chunk returned for several queries is shown once; later occurrences
+    refer back to it ("Query 1, Result 2" in markdown, [1, 2] in JSON).
+
+    Args:
+        queries: Search queries
+        results: Documents grouped by query, in rank order
+        max_chars: Character budget of the whole response
+        max_tokens: Token budget of the whole response (ignored if max_chars is given)
+        output_format: "markdown" or "json"
+        grouped: Group the results by query; False for a single query without query headers
+        encoding: tiktoken encoding used to count tokens
+
+    Returns:
+        Formatted search results
+
+    Raises:
+        ValueError: If the output format is unknown or a budget is not positive
+    """
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}. Expected one of {OUTPUT_FORMATS}.")
+    if max_chars is not None:
+        budget, unit = max_chars, "chars"
+    elif max_tokens is not None:
+        budget, unit = max_tokens, "tokens"
+    else:
+        budget, unit = None, "chars"
+    if budget is not None and budget <= 0:
+        raise ValueError(f"The {unit} budget must be positive, got {budget}.")
+
+    render = _render_json if output_format == "json" else _render_markdown
+    if not any(results):
+        if output_format == "json":
+            return render([{"query": query, "items": []} for query in queries], grouped, 0)
+        return NO_RESULTS
+    measure = len if unit == "chars" else (lambda text: count_tokens(text, encoding))
+
+    # Results in priority order: every query's first result, then every second result, ...
+    ranked = [(rank, q) for q, docs in enumerate(results) for rank in range(len(docs))]
+    priority = sorted(ranked)
+    terms = [query_terms(query) for query in queries]
+
+    def layout(kept: set, texts: Dict[Tuple[int, int], Tuple[str, bool]]) -> List[Dict[str, Any]]:
+        groups, seen = [], {}
+        for q, (query, docs) in enumerate(zip(queries, results)):
+            items = []
+            for rank, doc in enumerate(docs):
+                if (rank, q) not in kept:
+                    continue
+                item = {"rank": rank + 1, "doc": doc, "text": None, "truncated": False, "same_as": None}
+                first = seen.get(doc.page_content)
+                if first is not None:
+                    item["same_as"] = f"Query {first[0] + 1}, Result {first[1] + 1}" \
+                        if output_format == "markdown" else [first[0] + 1, first[1] + 1]
+                else:
+                    seen[doc.page_content] = (q, rank)
+                    item["text"], item["truncated"] = texts.get((rank, q), ("", False))
+                items.append(item)
+            groups.append({"query": query, "items": items})
+        return groups
+
+    full = {(rank, q): (results[q][rank].page_content, False) for rank, q in ranked}
+    if budget is None:
+        return render(layout(set(ranked), full), grouped, 0)
+
+    kept_count = len(priority)
+    while True:
+        kept = set(priority[:kept_count])
+        omitted = len(priority) - kept_count
+        groups = layout(kept, {})
+        # Chunks shown in full (not references to an earlier result) share the text budget
+        owners = [(item["rank"] - 1, q) for q, group in enumerate(groups) for item in group["items"]
+                  if item["same_as"] is None]
+        text_budget = budget - measure(render(groups, grouped, omitted))
+        if kept_count > 1 and text_budget < len(owners) * MIN_PASSAGE[unit]:
+            kept_count -= 1
+            continue
+
+        costs = [measure(results[q][rank].page_content) for rank, q in owners]
+        for _ in range(FIT_ATTEMPTS):
+            allowances = _allocate(costs, max(text_budget, 0))
+            texts = {key: passage_window(results[key[1]][key[0]].page_content, terms[key[1]], allowance, measure)
+                     for key, allowance in zip(owners, allowances)}
+            response = render(layout(kept, texts), grouped, omitted)
+            overflow = measure(response) - budget
+            if overflow <= 0:
+                return response
+            text_budget -= overflow
+        if kept_count <= 1:
+            # Not even one passage fits next to the headers
+            return response
+        kept_count -= 1
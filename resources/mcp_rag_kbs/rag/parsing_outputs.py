@@ -0,0 +1,159 @@
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain_core.documents import Document
+
+# Columnar layout of a parsing output chunk file
+CHUNK_FILE_SUFFIX = ".parquet"
+CHUNK_SCHEMA = pa.schema([
+    ("page_content", pa.string()),
+    ("source", pa.string()),
+    ("page", pa.int32()),
+    ("images", pa.list_(pa.string())),
+    # Remaining metadata keys (entity, table, ...) as a JSON object
+    ("extra_metadata", pa.string()),
+])
+COLUMN_METADATA_KEYS = ("source", "page", "images")
+
+
+def _to_row(doc: Document) -> dict:
+    metadata = doc.metadata
+    extra = {key: value for key, value in metadata.items() if key not in COLUMN_METADATA_KEYS}
+    return {
+        "page_content": doc.page_content,
+        "source": metadata.get("source"),
+        "page": metadata.get("page"),
+        "images": metadata.get("images"),
+        "extra_metadata": json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+    }
+
+
+def _to_documents(batch: pa.RecordBatch) -> List[Document]:
+    columns = batch.to_pydict()
+    docs = []
+    for content, source, page, images, extra in zip(
+        columns["page_content"], columns["source"], columns["page"], columns["images"], columns["extra_metadata"]
+    ):
+        metadata = {}
+        if page is not None:
+            metadata["page"] = page
+        if source is not None:
+            metadata["source"] = source
+        if images is not None:
+            metadata["images"] = images
+        if extra:
+            metadata.update(json.loads(extra))
+        docs.append(Document(page_content=content, metadata=metadata))
+    return docs
+
+
+def write_chunk_file(path: Union[str, Path], docs: Iterable[Document], batch_size: int = 1024) -> int:
+    """
+    Write chunks to a Parquet chunk file, streaming them in row groups.
+
+    Args:
+        path: Target file, replaced atomically
+        docs: Chunks to write
+        batch_size: Chunks per row group
+
+    Returns:
+        Number of chunks written
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    count = 0
+    rows = []
+
+    with pq.ParquetWriter(str(tmp_path), CHUNK_SCHEMA) as writer:
+        for doc in docs:
+            rows.append(_to_row(doc))
+            if len(rows) == batch_size:
+                writer.write_table(pa.Table.from_pylist(rows, schema=CHUNK_SCHEMA))
+                count += len(rows)
+                rows = []
+        if rows:
+            writer.write_table(pa.Table.from_pylist(rows, schema=CHUNK_SCHEMA))
+            count += len(rows)
+
+    os.replace(tmp_path, path)
+    return count
+
+
+def find_chunk_files(directory: Union[str, Path]) -> List[Path]:
+    """
+    List the chunk files of a parsing output directory.
+
+    Args:
+        directory: Parsing output directory
+
+    Returns:
+        Sorted chunk file paths
+    """
+
+    return sorted(Path(directory).glob(f"*{CHUNK_FILE_SUFFIX}"))
+
+
+def iter_chunk_batches(paths: Iterable[Union[str, Path]], batch_size: int = 1024) -> Iterator[List[Document]]:
+    """
+    Stream chunks from chunk files in batches, without loading whole files.
+
+    Args:
+        paths: Chunk files, read in order
+        batch_size: Maximum chunks per batch
+
+    Yields:
+        Lists of at most ``batch_size`` documents
+    """
+
+    for path in paths:
+        parquet_file = pq.ParquetFile(str(path))
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield _to_documents(batch)
+
+
+def iter_chunks(paths: Iterable[Union[str, Path]], batch_size: int = 1024) -> Iterator[Document]:
+    """
+    Stream chunks from chunk files one by one.
+
+    Args:
+        paths: Chunk files, read in order
+        batch_size: Chunks decoded at a time
+
+    Yields:
+        Documents
+    """
+
+    for batch in iter_chunk_batches(paths, batch_size=batch_size):
+        yield from batch
+
+
+def convert_pickle_outputs(directory: Union[str, Path], overwrite: bool = False) -> List[Path]:
+    """
+    Convert the pickled parsing outputs (``*.pkl``) of a directory to chunk files.
+
+    Each ``<name>.pkl`` is written to ``<name>.parquet`` next to it.
+
+    Args:
+        directory: Parsing output directory
+        overwrite: Rewrite chunk files that already exist
+
+    Returns:
+        Paths of the written chunk files
+    """
+
+    written = []
+    for pkl_path in sorted(Path(directory).glob("*.pkl")):
+        chunk_path = pkl_path.with_suffix(CHUNK_FILE_SUFFIX)
+        if chunk_path.exists() and not overwrite:
+            continue
+        with open(pkl_path, "rb") as f:
+            documents = pickle.load(f)
+        write_chunk_file(chunk_path, documents)
+        written.append(chunk_path)
+    return written
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+
+from rag.embedding_cache import normalize_query
+from rag.metrics import CACHE_LOOKUPS
+
+
+class ResultCacheBackend(ABC):
+    """
+    Abstract key-value store for ranked search results with TTL and LRU eviction.
+    """
+
+    # Whether get and set wait on I/O, so async callers run them off the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 3600) -> None:
+        """
+        Initialize a result cache backend.
+
+        Args:
+            max_entries: Maximum number of cached result lists
+            ttl: Seconds a result list stays valid, None for no expiry
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[Document]]:
+        """
+        Look up a result list.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached documents, or None if missing or expired
+        """
+
+        pass
+
+    @abstractmethod
+    def set(self, key: str, docs: List[Document]) -> None:
+        """
+        Store a result list, evicting the least recently used ones if needed.
+
+        Args:
+            key: Cache key
+            docs: Ranked documents
+        """
+
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove every cached result list.
+        """
+
+        pass
+
+    def close(self) -> None:
+        """
+        Release the resources held by the backend.
+        """
+
+        pass
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+
+class MemoryResultCache(ResultCacheBackend):
+    """
+    In-process result cache, for a single server process.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 3600) -> None:
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], List[Document]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, docs = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(docs)
+
+    def set(self, key: str, docs: List[Document]) -> None:
+        with self._lock:
+            self._entries[key] = (self._expires_at(), list(docs))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResultCache(ResultCacheBackend):
+    """
+    Result cache stored in a SQLite file, shared by every worker process on a host.
+    """
+
+    blocking = True
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 max_entries: int = 4096,
+                 ttl: Optional[float] = 3600) -> None:
+        """
+        Open (or create) a SQLite result cache.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum number of cached result lists
+            ttl: Seconds a result list stays valid, None for no expiry
+        """
+
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, docs TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)")
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT docs, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        return [Document(page_content=content, metadata=metadata) for content, metadata in json.loads(row[0])]
+
+    def set(self, key: str, docs: List[Document]) -> None:
+        payload = json.dumps(
+            [(doc.page_content, doc.metadata) for doc in docs],
+            ensure_ascii=False,
+            default=str,
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, docs, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, self._expires_at(), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return count
+
+
+class SearchResultCache:
+    """
+    Cache of ranked search results keyed by index version, mode, top_k and query.
+
+    The index version is part of every key, so results computed against an
+    older index are never served after the index changes; they simply age
+    out of the backend.
+    """
+
+    def __init__(self, backend: ResultCacheBackend, index_version: str) -> None:
+        """
+        Initialize a search result cache.
+
+        Args:
+            backend: Storage backend
+            index_version: Version identifier of the indexes results are computed from
+        """
+
+        self.backend = backend
+        self.index_version = index_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def cache_key(self, query: str, mode: str, k: int) -> str:
+        """
+        Build the cache key of a search.
+
+        Args:
+            query: Search query
+            mode: Search mode, e.g. "semantic", "keyword" or "hybrid"
+            k: Number of results
+
+        Returns:
+            Cache key
+        """
+
+        raw = "\0".join([self.index_version, mode, str(k), normalize_query(query)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, mode: str, k: int) -> Optional[List[Document]]:
+        """
+        Look up the results of a search.
+
+        Args:
+            query: Search query
+            mode: Search mode
+            k: Number of results
+
+        Returns:
+            The cached documents, or None on a miss
+        """
+
+        docs = self.backend.get(self.cache_key(query, mode, k))
+        with self._lock:
+            if docs is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_LOOKUPS.labels("search_result", "miss" if docs is None else "hit").inc()
+        return docs
+
+    def set(self, query: str, mode: str, k: int, docs: List[Document]) -> None:
+        """
+        Store the results of a search.
+
+        Args:
+            query: Search query
+            mode: Search mode
+            k: Number of results
+            docs: Ranked documents
+        """
+
+        self.backend.set(self.cache_key(query, mode, k), docs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate and index_version
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "index_version": self.index_version,
+            }
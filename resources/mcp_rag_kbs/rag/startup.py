@@ -0,0 +1,142 @@
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ServerNotReady(ValueError):
+    """
+    Raised when a request arrives before the server finished warming up.
+    """
+
+
+class Startup:
+    """
+    Run the slow initialization steps of a server in a background thread.
+
+    The transport can accept connections right away; requests check
+    ``ready`` (or call ``require``) and are refused with a status message
+    until every step has finished. The state moves from "pending" to
+    "warming" and then to "ready", or to "failed" if a step raised.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]]) -> None:
+        """
+        Initialize the startup sequence.
+
+        Args:
+            steps: (name, function) pairs run in order
+        """
+
+        self.steps = steps
+        self.state = "pending"
+        self.step: Optional[str] = None
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> "Startup":
+        """
+        Start the steps in a daemon thread; later calls do nothing.
+
+        Returns:
+            self
+        """
+
+        with self._lock:
+            if self.state != "pending":
+                return self
+            self.state = "warming"
+            self.started_at = time.perf_counter()
+        threading.Thread(target=self._run, name="startup", daemon=True).start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            for name, func in self.steps:
+                self.step = name
+                start = time.perf_counter()
+                func()
+                self.timings[name] = time.perf_counter() - start
+                print(f"Startup step {name}: {self.timings[name]:.2f}s")
+            self.step = None
+            self.state = "ready"
+        except Exception as e:
+            traceback.print_exc()
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+        finally:
+            self.finished_at = time.perf_counter()
+            self._done.set()
+            if self.state == "ready":
+                print(f"Server ready in {self.finished_at - self.started_at:.2f}s")
+
+    def mark_ready(self) -> None:
+        """
+        Skip the steps and report ready, for callers that set up the state themselves.
+        """
+
+        with self._lock:
+            self.state = "ready"
+            self.step = None
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Start the steps if needed and block until they finish.
+
+        Args:
+            timeout: Seconds to wait, None to wait indefinitely
+
+        Returns:
+            True if the server is ready
+        """
+
+        self.start()
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Describe the startup progress.
+
+        Returns:
+            Dictionary with state, current step, elapsed seconds, step timings and error
+        """
+
+        end = self.finished_at or time.perf_counter()
+        return {
+            "state": self.state,
+            "step": self.step,
+            "elapsed": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "timings": {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            "error": self.error,
+        }
+
+    def require(self) -> None:
+        """
+        Fail fast unless the server is ready, starting the steps if nobody has.
+
+        Raises:
+            ServerNotReady: While warming up or after a failed startup
+        """
+
+        if self.ready:
+            return
+        self.start()
+        status = self.status()
+        if status["state"] == "failed":
+            raise ServerNotReady(f"Server failed to start: {status['error']}")
+        if status["state"] == "ready":
+            return
+        raise ServerNotReady(
+            f"Server is warming up ({status['step'] or 'starting'}, {status['elapsed']:.1f}s elapsed). "
+            "Retry in a few seconds."
+        )
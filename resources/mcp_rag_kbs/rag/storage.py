@@ -0,0 +1,141 @@
+import glob
+import hashlib
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TypeVar, Union
+
+T = TypeVar("T")
+
+# How long readers wait for an atomic_directory replace in progress
+SWAP_TIMEOUT = 5.0
+SWAP_POLL_INTERVAL = 0.01
+
+
+@contextmanager
+def atomic_directory(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Write a directory atomically.
+
+    Yields a temporary sibling directory to write into; on success it
+    replaces ``path``, so readers never observe a partially written
+    artifact. On error the temporary directory is removed.
+
+    A directory cannot be replaced by a single rename, so ``path`` is
+    briefly missing while the previous one is moved aside; read it
+    through ``load_directory`` to wait that out.
+
+    Args:
+        path: Target directory
+
+    Yields:
+        Temporary directory to write into
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    old_path = path.with_name(f"{path.name}.old-{os.getpid()}")
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _replacing(path: Path) -> bool:
+    return any(path.parent.glob(f"{glob.escape(path.name)}.old-*"))
+
+
+def load_directory(path: Union[str, Path], load: Callable[[Path], T], timeout: float = SWAP_TIMEOUT) -> T:
+    """
+    Load a directory written by ``atomic_directory``, waiting out a replace in progress.
+
+    While the previous directory is moved aside ``path`` is missing, and a
+    reader that opened it just before may find its files deleted; both
+    cases are retried until ``timeout``.
+
+    Args:
+        path: Directory to load
+        load: Loader called with ``path``
+        timeout: Maximum time to wait, in seconds
+
+    Returns:
+        The result of ``load``
+    """
+
+    path = Path(path)
+    deadline = time.monotonic() + timeout
+    while True:
+        expired = time.monotonic() >= deadline
+        if expired or path.exists() or not _replacing(path):
+            try:
+                return load(path)
+            except FileNotFoundError:
+                if expired:
+                    raise
+        time.sleep(SWAP_POLL_INTERVAL)
+
+
+@contextmanager
+def atomic_file(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Write a file atomically.
+
+    Yields a temporary sibling path to write to; on success it replaces
+    ``path``. On error the temporary file is removed.
+
+    Args:
+        path: Target file
+
+    Yields:
+        Temporary path to write to
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}{path.suffix}")
+    try:
+        yield tmp_path
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+
+
+def corpus_fingerprint(texts: Iterable[str]) -> str:
+    """
+    Compute a stable fingerprint of a corpus, used to detect stale indexes.
+
+    Args:
+        texts: Texts of the corpus, in index order
+
+    Returns:
+        Hex digest identifying the corpus
+    """
+
+    digest = hashlib.sha256()
+    for text in texts:
+        update_fingerprint(digest, text)
+    return digest.hexdigest()
+
+
+def update_fingerprint(digest: Any, text: str) -> None:
+    """
+    Feed one text into a corpus fingerprint digest.
+
+    Args:
+        digest: hashlib digest object
+        text: Text to add
+    """
+
+    encoded = text.encode("utf-8")
+    digest.update(len(encoded).to_bytes(8, "little"))
+    digest.update(encoded)
@@ -0,0 +1,159 @@
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+from rag.storage import atomic_file
+
+# Layout: <db_dir>/versions/<name>/ holds one complete set of index files,
+# <db_dir>/CURRENT names the active one. Without CURRENT, <db_dir> itself is the index.
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+# Runtime files of <db_dir> that are not part of an index version (caches, PID file, build checkpoints)
+RUNTIME_SUFFIXES = (".sqlite3", ".sqlite3-wal", ".sqlite3-shm", ".pid", ".checkpoint")
+
+
+def current_version(db_dir: Union[str, Path]) -> Optional[str]:
+    """
+    Return the name of the active index version.
+
+    Args:
+        db_dir: Index root directory
+
+    Returns:
+        The version name, or None for an unversioned layout
+    """
+
+    current_path = Path(db_dir) / CURRENT_FILE
+    if not current_path.exists():
+        return None
+    return current_path.read_text(encoding="utf-8").strip() or None
+
+
+def current_index_directory(db_dir: Union[str, Path]) -> Path:
+    """
+    Return the directory of the active index version.
+
+    Args:
+        db_dir: Index root directory
+
+    Returns:
+        ``<db_dir>/versions/<current>``, or ``db_dir`` for an unversioned layout
+    """
+
+    name = current_version(db_dir)
+    return Path(db_dir) / VERSIONS_DIR / name if name else Path(db_dir)
+
+
+def list_versions(db_dir: Union[str, Path]) -> List[str]:
+    """
+    List the index versions, oldest first.
+
+    Args:
+        db_dir: Index root directory
+
+    Returns:
+        Version names
+    """
+
+    versions_path = Path(db_dir) / VERSIONS_DIR
+    if not versions_path.exists():
+        return []
+    return sorted(path.name for path in versions_path.iterdir() if path.is_dir() and ".tmp-" not in path.name)
+
+
+def _link_tree(source: Path, target: Path) -> None:
+    # Index files are only ever replaced (never modified in place), so versions can share inodes
+    target.mkdir(parents=True)
+    for entry in source.iterdir():
+        if entry.name in (VERSIONS_DIR, CURRENT_FILE) or entry.name.endswith(RUNTIME_SUFFIXES):
+            continue
+        if ".tmp-" in entry.name or ".old-" in entry.name:
+            continue
+        if entry.is_dir():
+            _link_tree(entry, target / entry.name)
+        else:
+            try:
+                os.link(entry, target / entry.name)
+            except OSError:
+                shutil.copy2(entry, target / entry.name)
+
+
+def create_version(db_dir: Union[str, Path],
+                   base: Optional[Union[str, Path]] = None,
+                   empty: bool = False) -> Path:
+    """
+    Create a new, inactive index version holding a copy of an existing one.
+
+    Files are hard linked rather than copied, so creating a version is
+    cheap; index writers replace files atomically and never modify the
+    shared ones.
+
+    Args:
+        db_dir: Index root directory
+        base: Directory to copy (default: the active index directory)
+        empty: Create an empty version instead, e.g. for a full rebuild
+
+    Returns:
+        Directory of the new version
+    """
+
+    db_dir = Path(db_dir)
+    base = Path(base) if base is not None else current_index_directory(db_dir)
+    name = time.strftime("%Y%m%d-%H%M%S")
+    existing = set(list_versions(db_dir))
+    suffix = 1
+    while (f"{name}-{suffix}" if suffix > 1 else name) in existing:
+        suffix += 1
+    name = f"{name}-{suffix}" if suffix > 1 else name
+
+    target = db_dir / VERSIONS_DIR / name
+    tmp_target = target.with_name(f"{name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_target, ignore_errors=True)
+    if base.exists() and not empty:
+        _link_tree(base, tmp_target)
+    else:
+        tmp_target.mkdir(parents=True)
+    os.replace(tmp_target, target)
+    return target
+
+
+def activate_version(db_dir: Union[str, Path], name: str) -> None:
+    """
+    Make an index version the active one.
+
+    Running servers keep serving the previous version until they reload.
+
+    Args:
+        db_dir: Index root directory
+        name: Version name
+
+    Raises:
+        ValueError: If the version does not exist
+    """
+
+    if not (Path(db_dir) / VERSIONS_DIR / name).is_dir():
+        raise ValueError(f"Unknown index version: {name}")
+    with atomic_file(Path(db_dir) / CURRENT_FILE) as tmp_path:
+        tmp_path.write_text(name, encoding="utf-8")
+
+
+def prune_versions(db_dir: Union[str, Path], keep: int = 3) -> List[str]:
+    """
+    Delete the oldest index versions, never the active one.
+
+    Args:
+        db_dir: Index root directory
+        keep: Number of most recent versions to keep
+
+    Returns:
+        Names of the deleted versions
+    """
+
+    active = current_version(db_dir)
+    versions = list_versions(db_dir)
+    removed = [name for name in versions[:max(len(versions) - keep, 0)] if name != active]
+    for name in removed:
+        shutil.rmtree(Path(db_dir) / VERSIONS_DIR / name, ignore_errors=True)
+    return removed
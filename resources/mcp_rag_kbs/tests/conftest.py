@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# The default embedding backend reads its API key at import; tests use the hashing backend
+os.environ.setdefault("UPSTAGE_API_KEY", "test")
@@ -0,0 +1,126 @@
+import faiss
+import numpy as np
+import pytest
+
+from rag import ann
+from rag.ann import (
+    INDEX_TYPES,
+    QUANTIZED_INDEX_TYPES,
+    RerankIndex,
+    apply_search_params,
+    build_index,
+    read_index,
+    search_rows,
+    selector_params,
+)
+
+NUM_VECTORS, DIM = 600, 32
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((NUM_VECTORS, DIM)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def index_files(vectors, tmp_path_factory):
+    directory = tmp_path_factory.mktemp("ann")
+    paths = {}
+    for index_type in INDEX_TYPES:
+        paths[index_type] = directory / f"{index_type}.faiss"
+        faiss.write_index(build_index(vectors, index_type, ivf_nlist=8, pq_m=8), str(paths[index_type]))
+    return paths
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_mmap_read_matches_in_memory_read(index_type, index_files, vectors):
+    in_memory = read_index(index_files[index_type])
+    mapped = read_index(index_files[index_type], mmap=True)
+
+    assert mapped.ntotal == NUM_VECTORS
+    np.testing.assert_array_equal(mapped.search(vectors[:5], 4)[1], in_memory.search(vectors[:5], 4)[1])
+
+
+def exact_search(vectors, queries, k, rows=None):
+    rows = np.arange(len(vectors)) if rows is None else rows
+    distances = np.square(vectors[rows][None, :, :] - queries[:, None, :]).sum(axis=2)
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(distances, order, axis=1), rows[order]
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "pq"])
+def test_rerank_orders_the_shortlist_by_exact_distance(index_type, index_files, vectors):
+    queries = vectors[:8] + 0.1
+    index = RerankIndex(read_index(index_files[index_type]), vectors, rerank_factor=4)
+
+    distances, ids = index.search(queries, 5)
+
+    np.testing.assert_allclose(distances, np.square(vectors[ids] - queries[:, None, :]).sum(axis=2), rtol=1e-4)
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+@pytest.mark.parametrize("index_type", ["sq8", "pq"])
+def test_rerank_over_every_row_is_exact(index_type, index_files, vectors):
+    queries = vectors[:8] + 0.1
+    index = RerankIndex(read_index(index_files[index_type]), vectors, rerank_factor=NUM_VECTORS // 5)
+
+    distances, ids = index.search(queries, 5)
+
+    expected_distances, expected_ids = exact_search(vectors, queries, 5)
+    np.testing.assert_array_equal(ids, expected_ids)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-4)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat", "sq8", "pq"])
+@pytest.mark.parametrize("num_rows", [40, 300])
+def test_search_rows_returns_only_rows_in_the_filter(index_type, num_rows, index_files, vectors, monkeypatch):
+    # 40 rows are scored exactly with faiss.knn, 300 go through the index with a bitmap selector
+    monkeypatch.setattr(ann, "EXACT_SEARCH_ROWS", 100)
+    index = apply_search_params(read_index(index_files[index_type]), ef_search=128, nprobe=8)
+    rows = np.sort(np.random.default_rng(1).choice(NUM_VECTORS, num_rows, replace=False))
+    queries = vectors[:6] + 0.1
+
+    distances, ids = search_rows(index, queries, 5, rows)
+
+    assert np.isin(ids, rows).all()
+    # Quantized variants score their decoded vectors, the others exactly
+    if index_type == "flat" or (num_rows <= ann.EXACT_SEARCH_ROWS and index_type not in QUANTIZED_INDEX_TYPES):
+        expected_distances, expected_ids = exact_search(vectors, queries, 5, rows)
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-4)
+
+
+def test_search_rows_uses_a_selector_above_the_exact_limit(index_files, vectors, monkeypatch):
+    calls = []
+
+    def spy(index, rows):
+        calls.append(rows.size)
+        return selector_params(index, rows)
+
+    monkeypatch.setattr(ann, "EXACT_SEARCH_ROWS", 100)
+    monkeypatch.setattr(ann, "selector_params", spy)
+    index = read_index(index_files["hnsw"])
+
+    search_rows(index, vectors[:1], 5, np.arange(40))
+    search_rows(index, vectors[:1], 5, np.arange(300))
+
+    assert calls == [300]
+
+
+def test_search_rows_without_rows():
+    index = faiss.IndexFlatL2(DIM)
+
+    distances, ids = search_rows(index, np.zeros((2, DIM), dtype=np.float32), 3, np.array([], dtype=np.int64))
+
+    assert (ids == -1).all() and np.isinf(distances).all()
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat", "sq8", "ivf_pq"])
+def test_excluding_selector_skips_removed_rows(index_type, index_files, vectors):
+    index = read_index(index_files[index_type])
+    removed = np.arange(0, NUM_VECTORS, 2)
+
+    _, ids = index.search(vectors[:6], 5, params=selector_params(index, removed, exclude=True))
+
+    assert (ids >= 0).all()
+    assert not np.isin(ids, removed).any()
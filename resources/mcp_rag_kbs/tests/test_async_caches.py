@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+from langchain_core.documents import Document
+
+from rag import KBSRetrievalChain
+from rag.embedding_cache import CachedQueryEmbeddings, SQLiteEmbeddingStore
+from rag.embeddings import create_embeddings
+from rag.result_cache import MemoryResultCache, SearchResultCache, SQLiteResultCache
+
+
+class ThreadRecorder:
+    """Mixin recording the threads that call get, set and put."""
+
+    def get(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().get(*args)
+
+    def set(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().set(*args)
+
+    def put(self, *args):
+        self.threads.append(threading.get_ident())
+        return super().put(*args)
+
+
+class RecordingEmbeddingStore(ThreadRecorder, SQLiteEmbeddingStore):
+    threads = []
+
+
+class RecordingResultCache(ThreadRecorder, SQLiteResultCache):
+    threads = []
+
+
+def test_async_query_embedding_keeps_sqlite_off_the_loop(tmp_path):
+    store = RecordingEmbeddingStore(tmp_path / "embeddings.db")
+    store.threads = []
+    embeddings = CachedQueryEmbeddings(create_embeddings("hashing", "query", dim=16), disk_store=store)
+
+    async def run():
+        first = await embeddings.aembed_query("질문")
+        batch = await embeddings.aembed_queries(["질문", "다른 질문"])
+        return threading.get_ident(), first, batch
+
+    loop_thread, first, batch = asyncio.run(run())
+
+    assert batch[0] == first
+    assert store.threads and loop_thread not in store.threads
+    assert len(store) == 2
+    store.close()
+
+
+def test_async_query_embedding_reads_the_disk_tier(tmp_path):
+    store = SQLiteEmbeddingStore(tmp_path / "embeddings.db")
+    model = create_embeddings("hashing", "query", dim=16)
+    CachedQueryEmbeddings(model, disk_store=store).embed_query("질문")
+    embeddings = CachedQueryEmbeddings(model, disk_store=store)
+
+    asyncio.run(embeddings.aembed_query("질문"))
+
+    assert embeddings.stats()["disk_hits"] == 1
+    store.close()
+
+
+def make_chain(backend):
+    chain = KBSRetrievalChain(embedding_backend="hashing", embedding_options={"dim": 16})
+    chain.result_cache = SearchResultCache(backend, "v1")
+    return chain
+
+
+def test_async_result_cache_keeps_sqlite_off_the_loop(tmp_path):
+    backend = RecordingResultCache(tmp_path / "results.db")
+    backend.threads = []
+    chain = make_chain(backend)
+    calls = []
+
+    async def search(query, k):
+        calls.append(query)
+        return [Document(page_content="답", metadata={"source": "a.pdf", "page": 0})]
+
+    async def run():
+        first = await chain._acached_search("hybrid", "질문", 4, search)
+        second = await chain._acached_search("hybrid", "질문", 4, search)
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(run())
+
+    assert calls == ["질문"]
+    assert second[0].page_content == first[0].page_content
+    assert backend.threads and loop_thread not in backend.threads
+    chain.close()
+
+
+def test_async_memory_result_cache():
+    chain = make_chain(MemoryResultCache())
+    calls = []
+
+    async def search(query, k):
+        calls.append(query)
+        return [Document(page_content="답")]
+
+    async def run():
+        await chain._acached_search("hybrid", "질문", 4, search)
+        return await chain._acached_search("hybrid", "질문", 4, search)
+
+    assert asyncio.run(run())[0].page_content == "답"
+    assert calls == ["질문"]
+
+
+def test_result_cache_searches_the_normalized_query():
+    chain = make_chain(MemoryResultCache())
+    calls = []
+
+    def search(query, k):
+        calls.append(query)
+        return [Document(page_content=query)]
+
+    first = chain._cached_search("hybrid", " 질문  하나", 4, search)
+    second = chain._cached_search("hybrid", "질문 하나\n", 4, search)
+
+    assert calls == ["질문 하나"]
+    assert first[0].page_content == second[0].page_content == "질문 하나"
+
+
+def test_query_embedding_embeds_the_normalized_query():
+    model = create_embeddings("hashing", "query", dim=16)
+    embeddings = CachedQueryEmbeddings(model)
+
+    # NFKC folds the full-width letters; the cached vector is that of the normalized text
+    assert embeddings.embed_query("ＡＢＣ  질문") == model.embed_query("ABC 질문")
+    assert embeddings.embed_queries(["ABC 질문 "]) == [model.embed_query("ABC 질문")]
+    assert embeddings.stats()["misses"] == 1
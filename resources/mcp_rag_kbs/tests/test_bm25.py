@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from rag.bm25 import BM25Index
+
+TEXTS = [
+    "kingdom builders school leadership",
+    "servant leadership in the kingdom",
+    "the school of prayer and worship",
+    "worship leaders serve the church",
+    "kingdom prayer school",
+    "the church and the kingdom",
+]
+QUERIES = ["kingdom school", "worship", "the church leadership", "unknown words"]
+
+
+def rebuilt_scores(texts, query):
+    return BM25Index.from_texts(texts).get_scores(query)
+
+
+def test_scores_match_rank_bm25():
+    index = BM25Index.from_texts(TEXTS)
+    reference = BM25Okapi([text.split() for text in TEXTS])
+
+    for query in QUERIES:
+        np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query.split()), rtol=1e-5)
+
+
+def test_search_returns_best_first():
+    index = BM25Index.from_texts(TEXTS)
+
+    ids, scores = index.search("worship", 3)
+
+    assert set(ids[:2].tolist()) == {2, 3}
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_append_matches_a_rebuild():
+    index = BM25Index.from_texts(TEXTS[:4]).append(TEXTS[4:])
+
+    assert len(index) == len(TEXTS)
+    for query in QUERIES:
+        np.testing.assert_allclose(index.get_scores(query), rebuilt_scores(TEXTS, query), rtol=1e-5)
+
+
+def test_remove_matches_a_rebuild_over_the_live_documents():
+    # Removing documents 0 and 1 leaves "builders" and "servant" without live documents
+    index = BM25Index.from_texts(TEXTS).remove([0, 1])
+    live = [2, 3, 4, 5]
+
+    for query in QUERIES:
+        scores = index.get_scores(query)
+        np.testing.assert_allclose(scores[live], rebuilt_scores([TEXTS[i] for i in live], query), rtol=1e-5)
+        assert not scores[[0, 1]].any()
+
+
+def test_removed_documents_are_never_returned():
+    index = BM25Index.from_texts(TEXTS).remove([4])
+
+    ids, _ = index.search("kingdom prayer school", len(TEXTS))
+
+    assert 4 not in ids.tolist()
+    assert len(ids) == len(TEXTS) - 1
+
+
+def test_load_waits_for_a_directory_being_replaced(tmp_path):
+    path = tmp_path / "bm25"
+    BM25Index.from_texts(TEXTS).save(path)
+    # The state atomic_directory leaves between its two renames
+    moved_aside = tmp_path / "bm25.old-1"
+    path.rename(moved_aside)
+    threading.Timer(0.1, moved_aside.rename, args=(path,)).start()
+
+    index = BM25Index.load(path)
+
+    assert index is not None
+    assert index.num_docs == len(TEXTS)
+
+
+def test_load_of_a_missing_directory_returns_none(tmp_path):
+    assert BM25Index.load(tmp_path / "bm25") is None
@@ -0,0 +1,82 @@
+import pytest
+from langchain_core.documents import Document
+
+from rag.chunk_store import ChunkStore, ChunkStoreDocstore, IdentityIndexMapping
+from rag.kbs import KBSRetrievalChain
+from rag.parsing_outputs import write_chunk_file
+from rag.storage import corpus_fingerprint
+
+DOCS = [
+    Document("하나님의 나라를 세우는 리더", metadata={"source": "a.pdf", "page": 0, "images": ["a-0.png"]}),
+    Document("섬김의 본을 보이는 공동체", metadata={"source": "a.pdf", "page": 1, "entity": "table"}),
+    Document("", metadata={"source": "b.pdf", "page": 0}),
+    Document("기도와 예배의 삶 " * 20, metadata={"source": "b.pdf", "page": 1}),
+]
+
+
+def test_round_trip_resolves_ids_text_and_metadata(tmp_path):
+    ChunkStore.write(tmp_path / "chunks", DOCS)
+    store = ChunkStore.open(tmp_path / "chunks")
+
+    assert len(store) == len(DOCS)
+    assert [(doc.page_content, doc.metadata) for doc in store] == [(doc.page_content, doc.metadata) for doc in DOCS]
+    assert [doc.metadata["page"] for doc in store.get_many([3, 0])] == [1, 0]
+    assert store[-1].page_content == DOCS[-1].page_content
+    assert store.fingerprint == corpus_fingerprint(doc.page_content for doc in DOCS)
+    with pytest.raises(IndexError):
+        store[len(DOCS)]
+
+
+def test_chunks_are_decoded_only_when_requested(tmp_path):
+    store = ChunkStore.write(tmp_path / "chunks", DOCS)
+    decoded = []
+    record = store._record
+    store._record = lambda i: decoded.append(i) or record(i)
+
+    assert store.get_many([2])[0].metadata == {"source": "b.pdf", "page": 0}
+    assert decoded == [2]
+
+
+def test_docstore_and_index_mapping_address_chunks_by_row(tmp_path):
+    store = ChunkStore.write(tmp_path / "chunks", DOCS)
+    docstore = ChunkStoreDocstore(store)
+    mapping = IdentityIndexMapping(len(store))
+
+    assert docstore.search(mapping[1]).page_content == DOCS[1].page_content
+    assert docstore.search(len(DOCS)) == f"ID {len(DOCS)} not found."
+    assert list(mapping) == [0, 1, 2, 3] and 4 not in mapping and mapping.get(4) is None
+
+
+def test_open_rejects_a_missing_store(tmp_path):
+    with pytest.raises(ValueError, match="No chunk store found"):
+        ChunkStore.open(tmp_path / "chunks")
+
+
+def make_chain(tmp_path, mode):
+    return KBSRetrievalChain(
+        persist_directory=str(tmp_path / "db"),
+        db_index_name="kbs",
+        embedding_backend="hashing",
+        embedding_options={"dim": 64},
+        vectorstore_mode=mode,
+    )
+
+
+def test_mmap_mode_returns_the_documents_of_pickle_mode(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_chunk_file(outputs / "a.parquet", [doc for doc in DOCS if doc.page_content])
+    pickled = make_chain(tmp_path, "pickle")
+    pickled.ingest([outputs])
+    pickled.export_chunk_store()
+    pickled.initialize()
+    mapped = make_chain(tmp_path, "mmap").initialize()
+
+    assert isinstance(mapped.vectorstore.docstore, ChunkStoreDocstore)
+    for query in ("섬김의 공동체", "기도와 예배", "리더"):
+        for search in ("search_semantic", "search_keyword", "search_hybrid"):
+            expected = getattr(pickled, search)(query, 3)
+            results = getattr(mapped, search)(query, 3)
+            assert [(doc.page_content, doc.metadata) for doc in results] == [
+                (doc.page_content, doc.metadata) for doc in expected
+            ]
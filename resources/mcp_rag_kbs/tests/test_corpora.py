@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rag.corpora import CorpusLoading, CorpusRegistry
+
+LOAD_SECONDS = 0.3
+
+
+class FakeChain:
+    def __init__(self, generation: int) -> None:
+        self.generation = generation
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def make_registry(tmp_path):
+    generations = []
+
+    def factory(name, directory):
+        time.sleep(LOAD_SECONDS)
+        generations.append(name)
+        return FakeChain(len(generations))
+
+    return CorpusRegistry(factory, {"kbs": {"db_dir": tmp_path}})
+
+
+async def ticks_during(coroutine) -> int:
+    # Count how often the event loop gets to run another task while the coroutine runs
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        await coroutine
+    finally:
+        task.cancel()
+    return ticks
+
+
+def test_alease_loads_without_blocking_the_event_loop(tmp_path):
+    registry = make_registry(tmp_path)
+
+    async def search():
+        async with registry.alease("kbs") as chain:
+            return chain
+
+    async def main():
+        results = []
+
+        async def run():
+            results.extend(await asyncio.gather(search(), search()))
+
+        ticks = await ticks_during(run())
+        return ticks, results
+
+    ticks, (first, second) = asyncio.run(main())
+    assert ticks >= LOAD_SECONDS / 0.01 / 2
+    # Concurrent requests share one load
+    assert first is second and first.generation == 1
+
+
+def test_alease_reports_loading_after_wait(tmp_path):
+    registry = make_registry(tmp_path)
+
+    async def main():
+        with pytest.raises(CorpusLoading):
+            async with registry.alease("kbs", wait=0.01):
+                pass
+        # The load went on in the background
+        await asyncio.sleep(LOAD_SECONDS * 2)
+        async with registry.alease("kbs", wait=0.01) as chain:
+            return chain
+
+    assert asyncio.run(main()).generation == 1
+
+
+def test_alease_serves_the_previous_chain_during_reload(tmp_path):
+    registry = make_registry(tmp_path)
+    with registry.lease("kbs") as chain:
+        assert chain.generation == 1
+
+    reload = threading.Thread(target=registry.reload, args=("kbs",))
+    reload.start()
+    time.sleep(LOAD_SECONDS / 3)
+
+    async def main():
+        start = time.perf_counter()
+        async with registry.alease("kbs", wait=0) as chain:
+            return chain, time.perf_counter() - start
+
+    chain, elapsed = asyncio.run(main())
+    reload.join()
+    assert chain.generation == 1 and elapsed < LOAD_SECONDS / 3
+    with registry.lease("kbs") as chain:
+        assert chain.generation == 2
+
+
+def test_unknown_corpus(tmp_path):
+    registry = make_registry(tmp_path)
+
+    async def main():
+        async with registry.alease("missing"):
+            pass
+
+    with pytest.raises(ValueError, match="Unknown corpus"):
+        asyncio.run(main())
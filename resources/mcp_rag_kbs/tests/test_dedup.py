@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag.dedup import (
+    MinHashDeduplicator,
+    collapse_duplicates,
+    load_signatures,
+    release_reference,
+    save_signatures,
+)
+
+BASE = "하나님의 나라를 세우는 리더는 섬김의 본을 보이며 공동체를 이끈다. " * 5
+OTHER = "선교와 전도의 사명을 다루는 두 번째 강의 내용입니다. " * 6
+
+
+def test_find_duplicates_maps_near_copies_to_the_first_occurrence():
+    texts = [BASE, OTHER, BASE.upper() + "  ", BASE.replace("리더는", "리더가")]
+
+    canonical = MinHashDeduplicator(0.9).find_duplicates(texts)
+
+    assert canonical[:3].tolist() == [0, 1, 0]
+
+
+def test_threshold_decides_how_close_a_duplicate_is():
+    # About two thirds of the shingles are shared
+    edited = BASE[:-40] + "전혀 다른 문장이 끝에 이어서 붙어 있습니다."
+
+    assert MinHashDeduplicator(0.6).find_duplicates([BASE, edited]).tolist() == [0, 0]
+    assert MinHashDeduplicator(0.8).find_duplicates([BASE, edited]).tolist() == [0, 1]
+
+
+def test_fixed_texts_are_never_collapsed():
+    canonical = MinHashDeduplicator(0.9).find_duplicates([BASE, BASE, BASE], num_fixed=2)
+
+    assert canonical.tolist() == [0, 1, 0]
+
+
+def test_new_texts_match_stored_rows_like_a_full_pass():
+    texts = [BASE, OTHER, BASE + " 끝", OTHER.replace("두 번째", "세 번째"), "전혀 다른 짧은 문장", OTHER + "!"]
+    deduplicator = MinHashDeduplicator(0.8)
+    signatures = deduplicator.signatures(texts)
+    keys = deduplicator.band_keys(signatures)
+
+    for num_fixed in range(len(texts)):
+        expected = deduplicator.find_duplicates(texts, num_fixed=num_fixed)[num_fixed:]
+        live = np.ones(num_fixed, dtype=bool)
+        canonical = deduplicator.find_new_duplicates(signatures[:num_fixed], keys[:num_fixed], live,
+                                                     signatures[num_fixed:])
+        assert canonical.tolist() == expected.tolist()
+
+
+def test_new_texts_never_collapse_into_removed_rows():
+    deduplicator = MinHashDeduplicator(0.9)
+    signatures = deduplicator.signatures([BASE, OTHER, BASE])
+    keys = deduplicator.band_keys(signatures)
+
+    live = np.array([False, True])
+    canonical = deduplicator.find_new_duplicates(signatures[:2], keys[:2], live, signatures[1:])
+
+    assert canonical.tolist() == [1, 3]
+
+
+def test_saved_signatures_are_only_loaded_with_the_same_settings(tmp_path):
+    deduplicator = MinHashDeduplicator(0.9)
+    signatures = deduplicator.signatures([BASE, OTHER])
+    save_signatures(tmp_path / "minhash", deduplicator, signatures, deduplicator.band_keys(signatures))
+
+    loaded, keys = load_signatures(tmp_path / "minhash", MinHashDeduplicator(0.9))
+    np.testing.assert_array_equal(loaded, signatures)
+    np.testing.assert_array_equal(keys, deduplicator.band_keys(signatures))
+    assert load_signatures(tmp_path / "minhash", MinHashDeduplicator(0.8)) is None
+    assert load_signatures(tmp_path / "missing", deduplicator) is None
+
+
+def test_invalid_threshold():
+    with pytest.raises(ValueError):
+        MinHashDeduplicator(0)
+
+
+def test_collapse_merges_references_into_the_canonical_chunk():
+    docs = [
+        Document(BASE, metadata={"source": "a.pdf", "page": 0}),
+        Document(OTHER, metadata={"source": "a.pdf", "page": 1}),
+        Document(BASE, metadata={"source": "b.pdf", "page": 3, "images": ["x.png"],
+                                 "duplicates": [{"source": "c.pdf", "page": 7}]}),
+    ]
+
+    kept, rows = collapse_duplicates(docs, np.array([0, 1, 0]))
+
+    assert kept == docs[:2]
+    assert rows.tolist() == [0, 1, 0]
+    assert docs[0].metadata["duplicates"] == [{"source": "b.pdf", "page": 3}, {"source": "c.pdf", "page": 7}]
+
+
+def test_release_drops_a_collapsed_reference():
+    doc = Document(BASE, metadata={"source": "a.pdf", "page": 0, "duplicates": [{"source": "b.pdf", "page": 3}]})
+
+    assert release_reference(doc, {"source": "b.pdf", "page": 3})
+    assert doc.metadata == {"source": "a.pdf", "page": 0}
+    assert not release_reference(doc, {"source": "b.pdf", "page": 3})
+
+
+def test_release_of_the_own_reference_promotes_a_duplicate():
+    doc = Document(BASE, metadata={"source": "a.pdf", "page": 0, "images": ["x.png"],
+                                   "duplicates": [{"source": "b.pdf", "page": 3}, {"source": "c.pdf"}]})
+
+    assert release_reference(doc, {"source": "a.pdf", "page": 0})
+    assert doc.metadata == {"images": ["x.png"], "source": "b.pdf", "page": 3, "duplicates": [{"source": "c.pdf"}]}
+    assert release_reference(doc, {"source": "b.pdf", "page": 3})
+    assert doc.metadata == {"images": ["x.png"], "source": "c.pdf"}
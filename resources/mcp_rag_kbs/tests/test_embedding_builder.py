@@ -0,0 +1,115 @@
+import httpx
+import numpy as np
+import openai
+import pytest
+from langchain_core.documents import Document
+
+from rag.embedding_builder import EmbeddingBuilder, is_retryable
+from rag.embeddings import HashingEmbeddings
+from rag.ingest import discover_sources
+from rag.kbs import KBSRetrievalChain
+from rag.parsing_outputs import write_chunk_file
+
+
+class FlakyEmbeddings(HashingEmbeddings):
+    """Hashing embeddings whose batch requests fail ``failures`` times, from the ``fail_from``-th call on."""
+
+    def __init__(self, failures=0, error=ConnectionError, fail_from=0):
+        super().__init__(dim=32)
+        self.failures = failures
+        self.error = error
+        self.fail_from = fail_from
+        self.calls = 0
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        if self.calls > self.fail_from and self.failures:
+            self.failures -= 1
+            raise self.error("embedding service unavailable")
+        return await super().aembed_documents(texts)
+
+
+def make_sources(tmp_path, num_chunks=10):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_chunk_file(
+        outputs / "a.parquet",
+        [Document(f"강의 {i} 섬김의 리더십 " * 3, metadata={"source": "a.pdf", "page": i}) for i in range(num_chunks)],
+    )
+    return discover_sources([outputs])
+
+
+def make_builder(tmp_path, embeddings, **kwargs):
+    options = {"batch_size": 2, "concurrency": 1, "max_retries": 3, "backoff_base": 0.0}
+    return EmbeddingBuilder(embeddings, tmp_path / "checkpoint", **{**options, **kwargs})
+
+
+def test_transient_errors_are_retried(tmp_path):
+    sources = make_sources(tmp_path)
+    builder = make_builder(tmp_path, FlakyEmbeddings(failures=2))
+    builder.open_checkpoint(sources)
+
+    stats = builder.embed(sources)
+
+    assert stats == {"embedded_batches": 5, "resumed_batches": 0, "embedded_chunks": 10, "retries": 2}
+
+
+def test_build_fails_after_max_retries_or_on_permanent_errors(tmp_path):
+    sources = make_sources(tmp_path)
+    builder = make_builder(tmp_path, FlakyEmbeddings(failures=4))
+    builder.open_checkpoint(sources)
+    with pytest.raises(ConnectionError):
+        builder.embed(sources)
+
+    builder = make_builder(tmp_path, FlakyEmbeddings(failures=1, error=ValueError))
+    with pytest.raises(ValueError):
+        builder.embed(sources)
+    assert builder.embeddings.calls == 1
+
+
+def test_backoff_honours_retry_after_and_grows_exponentially():
+    builder = EmbeddingBuilder(HashingEmbeddings(dim=8), "unused", backoff_base=1.0, backoff_max=10.0)
+    response = httpx.Response(429, headers={"retry-after": "3"}, request=httpx.Request("POST", "https://api"))
+    rate_limited = openai.RateLimitError("rate limited", response=response, body=None)
+
+    assert is_retryable(rate_limited)
+    assert builder.backoff_delay(0, rate_limited) == 3.0
+    assert 4.0 <= builder.backoff_delay(3, ConnectionError()) <= 8.0
+    assert builder.backoff_delay(10, ConnectionError()) <= 10.0
+
+
+def test_interrupted_build_resumes_from_the_checkpoint(tmp_path):
+    sources = make_sources(tmp_path)
+    # The third request fails for good, as if the build were killed there
+    crashing = make_builder(tmp_path, FlakyEmbeddings(failures=1, error=ValueError, fail_from=2))
+    assert crashing.open_checkpoint(sources) == 0
+    with pytest.raises(ValueError):
+        crashing.embed(sources)
+
+    embeddings = FlakyEmbeddings()
+    builder = make_builder(tmp_path, embeddings)
+    assert builder.open_checkpoint(sources) == 2
+    stats = builder.embed(sources)
+
+    assert stats["resumed_batches"] == 2 and stats["embedded_batches"] == 3
+    assert embeddings.calls == 3
+
+    chain = KBSRetrievalChain(
+        persist_directory=str(tmp_path / "db"),
+        db_index_name="kbs",
+        embedding_backend="hashing",
+        embedding_options={"dim": 32},
+    )
+    assert builder.write(chain, sources) == {"sources": 1, "chunks": 10}
+    vectorstore = chain.load_pickled_vectorstore()
+    texts = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content for i in range(10)]
+    np.testing.assert_allclose(vectorstore.index.reconstruct_n(0, 10), HashingEmbeddings(dim=32).embed_array(texts))
+
+
+def test_checkpoint_of_other_sources_is_not_resumed(tmp_path):
+    sources = make_sources(tmp_path)
+    make_builder(tmp_path, FlakyEmbeddings()).open_checkpoint(sources)
+
+    with pytest.raises(ValueError, match="other sources or settings"):
+        make_builder(tmp_path, FlakyEmbeddings(), batch_size=3).open_checkpoint(sources)
+    assert make_builder(tmp_path, FlakyEmbeddings(), batch_size=3).open_checkpoint(sources, restart=True) == 0
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from rag.embeddings import (
+    EMBEDDING_BACKENDS,
+    HashingEmbeddings,
+    aembed_queries,
+    create_embeddings,
+    embed_queries,
+    register_embedding_backend,
+)
+
+
+def test_builtin_backends_are_registered():
+    assert {"upstage", "openai", "hashing"} <= set(EMBEDDING_BACKENDS)
+    assert isinstance(create_embeddings("hashing", "passage", dim=32), HashingEmbeddings)
+
+
+def test_registered_backend_receives_role_and_options():
+    calls = []
+
+    @register_embedding_backend("test-recording")
+    def create_recording(role, **options):
+        calls.append((role, options))
+        return HashingEmbeddings(**options)
+
+    try:
+        embeddings = create_embeddings("test-recording", "query", dim=8)
+    finally:
+        del EMBEDDING_BACKENDS["test-recording"]
+
+    assert calls == [("query", {"dim": 8})]
+    assert embeddings.dim == 8
+
+
+def test_unknown_backend_or_role_is_rejected():
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        create_embeddings("missing")
+    with pytest.raises(ValueError, match="Unknown embedding role"):
+        create_embeddings("hashing", "document")
+
+
+def test_hashing_vectors_are_normalized_with_the_configured_dimension():
+    vectors = np.asarray(HashingEmbeddings(dim=64).embed_documents(["섬김의 리더십", "kingdom school", ""]))
+
+    assert vectors.shape == (3, 64)
+    np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1.0, rtol=1e-6)
+    assert not vectors[2].any()
+
+
+def test_hashing_is_deterministic_across_instances_and_threads():
+    texts = [f"강의 {i} 섬김의 리더십" for i in range(10)]
+    single = HashingEmbeddings(dim=64).embed_documents(texts)
+
+    assert HashingEmbeddings(dim=64, batch_size=3, num_threads=4).embed_documents(texts) == single
+    assert HashingEmbeddings(dim=64).embed_query(texts[0]) == single[0]
+    assert embed_queries(HashingEmbeddings(dim=64), texts[:2]) == single[:2]
+
+
+def test_hashing_async_methods_run_off_the_event_loop():
+    embeddings = HashingEmbeddings(dim=64)
+    threads = []
+    embed_array = embeddings.embed_array
+
+    def recording_embed_array(texts):
+        threads.append(threading.get_ident())
+        return embed_array(texts)
+
+    embeddings.embed_array = recording_embed_array
+
+    async def run():
+        vectors = [
+            await embeddings.aembed_query("질문"),
+            (await embeddings.aembed_documents(["질문"]))[0],
+            (await aembed_queries(embeddings, ["질문"]))[0],
+        ]
+        return threading.get_ident(), vectors
+
+    loop_thread, vectors = asyncio.run(run())
+
+    assert vectors[0] == vectors[1] == vectors[2]
+    assert len(threads) == 3 and loop_thread not in threads
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from rag.hot_swap import ChainManager
+from rag.versions import activate_version, create_version
+
+
+class FakeChain:
+    def __init__(self, directory):
+        self.directory = directory
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_manager(tmp_path, factory=FakeChain):
+    db_dir = tmp_path / "db"
+    activate_version(db_dir, create_version(db_dir, empty=True).name)
+    return db_dir, ChainManager(factory, db_dir)
+
+
+def test_lease_requires_a_loaded_chain(tmp_path):
+    _, manager = make_manager(tmp_path)
+
+    with pytest.raises(ValueError, match="No retrieval chain loaded"):
+        with manager.lease():
+            pass
+
+
+def test_lease_held_during_reload_keeps_the_old_chain_until_released(tmp_path):
+    db_dir, manager = make_manager(tmp_path)
+    manager.reload()
+
+    with manager.lease() as old:
+        activate_version(db_dir, create_version(db_dir).name)
+        manager.reload()
+        assert manager.chain is not old
+        assert not old.closed
+        assert not manager.in_use()
+        with manager.lease() as new:
+            assert new is manager.chain
+
+    assert old.closed
+    assert not manager.chain.closed
+    assert manager.chain.directory == manager.directory == db_dir / "versions" / (db_dir / "CURRENT").read_text()
+
+
+def test_unleased_old_chain_is_closed_on_reload(tmp_path):
+    _, manager = make_manager(tmp_path)
+    manager.reload()
+    old = manager.chain
+
+    manager.reload()
+
+    assert old.closed and not manager.chain.closed
+
+
+def test_failed_reload_keeps_the_current_chain(tmp_path):
+    fail = []
+
+    def factory(directory):
+        if fail:
+            raise RuntimeError("broken index")
+        return FakeChain(directory)
+
+    _, manager = make_manager(tmp_path, factory)
+    manager.reload()
+    current = manager.chain
+    fail.append(True)
+
+    with pytest.raises(RuntimeError, match="broken index"):
+        manager.reload()
+    manager.reload_in_background().join()
+
+    assert manager.chain is current and not current.closed
+
+
+def test_background_reload_does_not_block_searches(tmp_path):
+    loading = threading.Event()
+    release = threading.Event()
+    chains = []
+
+    def factory(directory):
+        if chains:
+            loading.set()
+            assert release.wait(5)
+        chains.append(FakeChain(directory))
+        return chains[-1]
+
+    _, manager = make_manager(tmp_path, factory)
+    manager.reload()
+
+    thread = manager.reload_in_background()
+    assert loading.wait(5)
+    # While the new chain loads, requests still lease the live one
+    with manager.lease() as chain:
+        assert chain is chains[0]
+    release.set()
+    thread.join(5)
+
+    assert manager.chain is chains[1]
+    assert chains[0].closed
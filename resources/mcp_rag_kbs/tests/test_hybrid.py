@@ -0,0 +1,61 @@
+import pytest
+from langchain_core.documents import Document
+
+from rag.base import HybridSearchEngine
+
+
+def docs(*texts):
+    return [Document(text) for text in texts]
+
+
+def test_rrf_ranks_by_summed_reciprocal_ranks():
+    a, b, c = docs("a", "b", "c")
+    engine = HybridSearchEngine(fusion="rrf", rrf_k=60)
+
+    results = engine.fuse([[(a, 9.0), (b, 5.0)], [(b, 0.9), (c, 0.8)]], 3)
+
+    assert [doc.page_content for doc, _ in results] == ["b", "a", "c"]
+    assert [score for _, score in results] == pytest.approx([0.5 / 62 + 0.5 / 61, 0.5 / 61, 0.5 / 62])
+
+
+def test_minmax_ranks_by_weighted_normalized_scores():
+    a, b, c = docs("a", "b", "c")
+    engine = HybridSearchEngine(fusion="minmax", weights=(0.2, 0.8))
+
+    results = engine.fuse([[(a, 10.0), (b, 6.0), (c, 0.0)], [(c, -1.0), (b, -3.0), (a, -5.0)]], 3)
+
+    assert [doc.page_content for doc, _ in results] == ["c", "b", "a"]
+    assert [score for _, score in results] == pytest.approx([0.8, 0.2 * 0.6 + 0.8 * 0.5, 0.2])
+
+
+def test_returns_exactly_k_from_overlapping_lists():
+    candidates = docs("a", "b", "c", "d")
+    keyword = [(doc, float(4 - i)) for i, doc in enumerate(candidates)]
+    semantic = [(doc, float(i)) for i, doc in enumerate(candidates)]
+
+    for fusion in HybridSearchEngine.FUSION_METHODS:
+        assert len(HybridSearchEngine(fusion=fusion).fuse([keyword, semantic], 3)) == 3
+
+
+def test_short_lists_return_every_distinct_candidate():
+    a, b = docs("a", "b")
+
+    results = HybridSearchEngine().fuse([[(a, 1.0)], [(a, 0.5), (b, 0.4)]], 5)
+
+    assert [doc.page_content for doc, _ in results] == ["a", "b"]
+
+
+def test_same_text_with_different_ids_stays_apart():
+    first, second = docs("same", "same")
+
+    results = HybridSearchEngine().fuse_with_ids([[(first, 2.0)], [(second, 0.5)]], 2, [[0], [1]])
+
+    assert [row for _, _, row in results] == [0, 1]
+    assert HybridSearchEngine().fuse([[(first, 2.0)], [(second, 0.5)]], 2, [[7], [7]])[0][1] == pytest.approx(
+        1.0 / 61
+    )
+
+
+def test_unknown_fusion_method_is_rejected():
+    with pytest.raises(ValueError, match="Unknown fusion method"):
+        HybridSearchEngine(fusion="sum")
@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag.dedup import load_signatures
+from rag.kbs import KBSRetrievalChain
+from rag.parsing_outputs import write_chunk_file
+
+SHARED = "하나님의 나라를 세우는 리더는 섬김의 본을 보이며 공동체를 이끈다. " * 5
+OWN_A = "기도와 예배의 삶을 다루는 첫 번째 강의 내용입니다. " * 6
+OWN_B = "선교와 전도의 사명을 다루는 두 번째 강의 내용입니다. " * 6
+
+
+def write_source(directory, name, texts):
+    docs = [Document(text, metadata={"source": f"{name}.pdf", "page": page}) for page, text in enumerate(texts)]
+    write_chunk_file(directory / f"{name}.parquet", docs)
+
+
+def make_chain(tmp_path, **kwargs):
+    return KBSRetrievalChain(
+        persist_directory=str(tmp_path / "db"),
+        db_index_name="kbs",
+        embedding_backend="hashing",
+        embedding_options={"dim": 64},
+        **kwargs,
+    )
+
+
+def sources(chain):
+    return [doc.metadata["source"] for doc in chain.search_keyword("강의 섬김의", 10)]
+
+
+def test_ingest_adds_then_skips_unchanged_sources(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [OWN_B])
+    chain = make_chain(tmp_path)
+
+    assert chain.ingest([outputs])["added"] == 2
+    stats = chain.ingest([outputs])
+
+    assert stats["unchanged"] == 2
+    assert stats["embedded_chunks"] == 0
+    chain.initialize()
+    assert sorted(sources(chain)) == ["a.pdf", "a.pdf", "b.pdf"]
+
+
+def test_ingest_tombstones_removed_sources(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [OWN_B])
+    chain = make_chain(tmp_path)
+    chain.ingest([outputs])
+
+    (outputs / "b.parquet").unlink()
+    stats = chain.ingest([outputs])
+
+    assert stats["removed"] == 1
+    assert stats["tombstoned_chunks"] == 1
+    chain.initialize()
+    assert sorted(sources(chain)) == ["a.pdf", "a.pdf"]
+    assert chain.search_hybrid("선교와 전도", 3, filters={"source": "b.pdf"}) == []
+
+
+def test_removed_duplicate_source_leaves_shared_rows(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [OWN_B, SHARED + " "])
+    chain = make_chain(tmp_path, dedup_threshold=0.9)
+    assert chain.ingest([outputs])["duplicate_chunks"] == 1
+    chain.initialize()
+    assert chain.metadata_index.values("source") == ["a.pdf", "b.pdf"]
+    assert len(chain.search_hybrid("섬김의 본", 5, filters={"source": "b.pdf"})) == 2
+
+    (outputs / "b.parquet").unlink()
+    stats = chain.ingest([outputs])
+    chain.initialize()
+
+    assert stats["released_references"] == 1
+    assert chain.metadata_index.values("source") == ["a.pdf"]
+    assert chain.search_hybrid("섬김의 본", 5, filters={"source": "b.pdf"}) == []
+    assert all("duplicates" not in doc.metadata for doc in chain.split_docs)
+
+
+def test_removed_owner_source_hands_shared_rows_to_a_duplicate(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [OWN_B, SHARED + " "])
+    chain = make_chain(tmp_path, dedup_threshold=0.9)
+    chain.ingest([outputs])
+
+    (outputs / "a.parquet").unlink()
+    stats = chain.ingest([outputs])
+    chain.initialize()
+
+    assert stats["released_references"] == 1
+    assert chain.metadata_index.values("source") == ["b.pdf"]
+    shared = chain.search_hybrid("섬김의 본", 1, filters={"source": "b.pdf", "page": 1})
+    assert shared[0].page_content == SHARED
+    assert {key: shared[0].metadata[key] for key in ("source", "page")} == {"source": "b.pdf", "page": 1}
+    assert "duplicates" not in shared[0].metadata
+    assert chain.search_hybrid("섬김의 본", 5, filters={"source": "a.pdf"}) == []
+
+
+def test_dedup_ingest_only_hashes_new_chunks(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    chain = make_chain(tmp_path, dedup_threshold=0.9)
+    chain.ingest([outputs])
+    hashed = []
+    signatures = chain.deduplicator.signatures
+    chain.deduplicator.signatures = lambda texts: hashed.append(len(texts)) or signatures(texts)
+
+    write_source(outputs, "b", [OWN_B, SHARED + " "])
+    stats = chain.ingest([outputs])
+
+    assert hashed == [2]
+    assert stats["duplicate_chunks"] == 1 and stats["embedded_chunks"] == 1
+    stored, keys = load_signatures(tmp_path / "db" / "kbs_minhash", chain.deduplicator)
+    assert len(stored) == len(keys) == 3
+    np.testing.assert_array_equal(stored[2], signatures([OWN_B])[0])
+
+
+def test_semantic_search_skips_tombstones_inside_the_index(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [OWN_B, OWN_B + " 끝"])
+    chain = make_chain(tmp_path)
+    chain.ingest([outputs])
+
+    (outputs / "b.parquet").unlink()
+    chain.ingest([outputs])
+    chain.initialize()
+
+    assert chain.tombstones.tolist() == [2, 3]
+    assert chain.live_search_params is not None
+    results = chain.search_semantic_with_scores("선교와 전도", 4)
+    assert sorted(doc.metadata["page"] for doc, _ in results) == [0, 1]
+    assert all(doc.metadata["source"] == "a.pdf" for doc, _ in results)
+
+
+def test_load_refuses_an_index_and_docstore_of_different_lengths(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    chain = make_chain(tmp_path)
+    chain.ingest([outputs])
+    stale_docstore = (tmp_path / "db" / "kbs.pkl").read_bytes()
+
+    write_source(outputs, "b", [OWN_B])
+    chain.ingest([outputs])
+    # A crash between the two replaces of save_vectorstore
+    (tmp_path / "db" / "kbs.pkl").write_bytes(stale_docstore)
+
+    with pytest.raises(ValueError, match="interrupted write"):
+        make_chain(tmp_path).load_pickled_vectorstore()
+
+
+def test_hybrid_search_keeps_equal_chunks_of_different_sources_apart(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    write_source(outputs, "a", [SHARED, OWN_A])
+    write_source(outputs, "b", [SHARED, OWN_B])
+    chain = make_chain(tmp_path)
+    chain.ingest([outputs])
+    chain.initialize()
+
+    results = chain.search_hybrid("섬김의 본", 3)
+
+    assert len(results) == 3
+    shared = sorted(doc.metadata["source"] for doc in results if doc.page_content == SHARED)
+    assert shared == ["a.pdf", "b.pdf"]
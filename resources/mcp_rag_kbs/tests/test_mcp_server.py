@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from prometheus_client import REGISTRY
+from starlette.applications import Starlette
+
+import mcp_server
+from rag.corpora import CorpusRegistry
+from rag.kbs import KBSRetrievalChain
+from rag.metadata_index import MetadataIndex
+from rag.parsing_outputs import write_chunk_file
+from rag.startup import Startup
+
+
+class ReadyStartup:
+    def require(self) -> None:
+        pass
+
+
+def serve_chain(monkeypatch, tmp_path, chain):
+    registry = CorpusRegistry(lambda name, directory: chain, {"kbs": {"db_dir": tmp_path}})
+    monkeypatch.setattr(mcp_server, "startup", ReadyStartup())
+    monkeypatch.setattr(mcp_server, "corpus_registry", registry)
+
+
+def test_server_registers_its_tools():
+    tools = asyncio.run(mcp_server.mcp.list_tools())
+
+    assert {tool.name for tool in tools} == {"list_corpora", "list_sources", "search", "search_batch"}
+    assert mcp_server.mcp.settings.stateless_http
+
+
+def test_list_sources_counts_chunks_per_source(monkeypatch, tmp_path):
+    docs = [Document("a", metadata={"source": "a.pdf"}), Document("b", metadata={"source": "b.pdf"}),
+            Document("c", metadata={"source": "a.pdf"})]
+    serve_chain(monkeypatch, tmp_path, SimpleNamespace(filter_fields=("source",),
+                                                       metadata_index=MetadataIndex.build(docs, ("source",))))
+
+    response = asyncio.run(mcp_server.list_sources("kbs"))
+
+    assert response.splitlines()[2:] == ["- a.pdf (2 chunks)", "- b.pdf (1 chunks)"]
+
+
+def test_list_sources_without_source_filtering(monkeypatch, tmp_path):
+    serve_chain(monkeypatch, tmp_path, SimpleNamespace(filter_fields=("page",), metadata_index=None))
+
+    response = asyncio.run(mcp_server.list_sources("kbs"))
+
+    assert response.startswith("Source filtering is disabled for corpus 'kbs'")
+
+
+def test_workers_open_every_corpus_memory_mapped(monkeypatch, tmp_path):
+    monkeypatch.setattr(mcp_server.config, "CORPORA", {"kbs": {"db_dir": tmp_path, "vectorstore_mode": "pickle",
+                                                               "chunk_store_name": "kbs_chunks"}})
+    assert mcp_server.corpus_vectorstore_mode("kbs") == "pickle"
+
+    monkeypatch.setattr(mcp_server, "server_workers", 4)
+
+    assert mcp_server.corpus_vectorstore_mode("kbs") == "mmap"
+    assert mcp_server.corpora_without_chunk_store() == ["kbs"]
+    (tmp_path / "kbs_chunks").mkdir()
+    assert mcp_server.corpora_without_chunk_store() == []
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_expose_stage_histograms_and_cache_counters_after_a_search(monkeypatch, tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    docs = [Document("섬김의 리더십 강의 " * 5, metadata={"source": "a.pdf", "page": 0})]
+    write_chunk_file(outputs / "a.parquet", docs)
+    chain = KBSRetrievalChain(persist_directory=str(tmp_path / "db"), db_index_name="kbs",
+                              embedding_backend="hashing", embedding_options={"dim": 32},
+                              result_cache_backend="memory")
+    chain.ingest([outputs])
+    serve_chain(monkeypatch, tmp_path, chain.initialize())
+    stages = ("embed", "keyword", "semantic", "fuse", "format")
+    before = {stage: sample("rag_stage_seconds_count", stage=stage) for stage in stages}
+    misses = sample("rag_cache_lookups_total", cache="search_result", result="miss")
+    hits = sample("rag_cache_lookups_total", cache="search_result", result="hit")
+
+    for _ in range(2):
+        assert "섬김의 리더십" in asyncio.run(mcp_server.search("섬김의 리더십", 1))
+    body = asyncio.run(mcp_server.metrics_endpoint(None)).body.decode()
+
+    # The second search is served from the result cache, so the search stages run once
+    assert {stage: sample("rag_stage_seconds_count", stage=stage) - before[stage] for stage in stages} == {
+        "embed": 1, "keyword": 1, "semantic": 1, "fuse": 1, "format": 2
+    }
+    assert sample("rag_cache_lookups_total", cache="search_result", result="miss") - misses == 1
+    assert sample("rag_cache_lookups_total", cache="search_result", result="hit") - hits == 1
+    assert 'rag_stage_seconds_bucket{le="0.001",stage="embed"}' in body
+    assert 'rag_cache_lookups_total{cache="search_result",result="hit"}' in body
+    assert 'rag_requests_total{corpus="kbs",status="ok",tool="search"}' in body
+    chain.close()
+
+
+def ready_status():
+    response = asyncio.run(mcp_server.ready_endpoint(None))
+    return response.status_code, json.loads(response.body)
+
+
+def test_ready_reports_warming_failed_and_ready(monkeypatch):
+    release = threading.Event()
+    startup = Startup([("load", lambda: release.wait(5))])
+    monkeypatch.setattr(mcp_server, "startup", startup)
+
+    assert ready_status()[0] == 503
+    startup.start()
+    status, body = ready_status()
+    assert status == 503 and body["state"] == "warming" and body["step"] == "load"
+    release.set()
+    assert startup.wait(5)
+    status, body = ready_status()
+    assert status == 200 and body["state"] == "ready" and "load" in body["timings"]
+
+    failing = Startup([("load", lambda: 1 / 0)])
+    monkeypatch.setattr(mcp_server, "startup", failing)
+    assert not failing.wait(5)
+    status, body = ready_status()
+    assert status == 503 and body["state"] == "failed" and body["error"].startswith("ZeroDivisionError")
+
+
+def test_tools_refuse_calls_until_ready(monkeypatch, tmp_path):
+    release = threading.Event()
+    startup = Startup([("load", lambda: release.wait(5))])
+    monkeypatch.setattr(mcp_server, "startup", startup.start())
+    monkeypatch.setattr(mcp_server, "corpus_registry", None)
+
+    for response in (asyncio.run(mcp_server.search("질문")), asyncio.run(mcp_server.search_batch(["질문"])),
+                     asyncio.run(mcp_server.list_sources())):
+        assert response.startswith("Server is warming up (load,")
+    release.set()
+    startup.wait(5)
+
+    failing = Startup([("load", lambda: 1 / 0)])
+    failing.wait(5)
+    monkeypatch.setattr(mcp_server, "startup", failing)
+    assert asyncio.run(mcp_server.search("질문")) == "Server failed to start: ZeroDivisionError: division by zero"
+
+
+def reload_recording_app():
+    # Worker app for the SIGHUP test: records the worker PID and every reload it runs
+    records = Path(os.environ["RELOAD_RECORDS"])
+    mcp_server.corpus_registry = SimpleNamespace(
+        reload_in_background=lambda: (records / f"reload-{os.getpid()}").touch())
+    (records / f"worker-{os.getpid()}").touch()
+    return Starlette()
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+
+def test_sighup_reloads_every_worker_in_place(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    root = Path(__file__).resolve().parent
+    env = dict(os.environ, RELOAD_RECORDS=str(tmp_path),
+               PYTHONPATH=os.pathsep.join([str(root.parent), str(root), os.environ.get("PYTHONPATH", "")]))
+    server = subprocess.Popen(
+        [sys.executable, "-c", "import mcp_server; mcp_server.mcp.settings.host = '127.0.0.1'; "
+         f"mcp_server.mcp.settings.port = {port}; "
+         "mcp_server.run_workers(2, app='test_mcp_server:reload_recording_app')"],
+        cwd=root.parent, env=env)
+    try:
+        wait_for(lambda: len(list(tmp_path.glob("worker-*"))) == 2)
+        workers = {path.name.split("-")[1] for path in tmp_path.glob("worker-*")}
+
+        server.send_signal(signal.SIGHUP)
+
+        wait_for(lambda: len(list(tmp_path.glob("reload-*"))) == 2)
+        assert {path.name.split("-")[1] for path in tmp_path.glob("reload-*")} == workers
+        assert {path.name.split("-")[1] for path in tmp_path.glob("worker-*")} == workers
+        assert server.poll() is None
+    finally:
+        server.terminate()
+        server.wait(30)
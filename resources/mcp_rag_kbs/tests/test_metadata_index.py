@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+
+from rag.metadata_index import MetadataIndex
+
+
+def make_docs():
+    return [
+        Document(page_content="a", metadata={"source": "a.pdf", "page": 0, "images": ["x.png"],
+                                             "duplicates": [{"source": "b.pdf", "page": 5}]}),
+        Document(page_content="b", metadata={"source": "b.pdf", "page": 0}),
+        Document(page_content="c", metadata={"source": "a.pdf", "page": 5}),
+    ]
+
+
+def select(index, filters):
+    return index.select(filters).tolist()
+
+
+def test_single_field_matches_duplicate_references():
+    index = MetadataIndex.build(make_docs())
+
+    assert select(index, {"source": "b.pdf"}) == [0, 1]
+    assert select(index, {"page": 5}) == [0, 2]
+
+
+def test_source_and_page_match_the_same_reference():
+    index = MetadataIndex.build(make_docs())
+
+    assert select(index, {"source": "b.pdf", "page": 0}) == [1]
+    assert select(index, {"source": "b.pdf", "page": 5}) == [0]
+    assert select(index, {"source": "a.pdf", "page": 5}) == [2]
+    assert select(index, {"source": ["a.pdf", "b.pdf"], "page": 0}) == [0, 1]
+
+
+def test_content_fields_apply_to_every_reference():
+    index = MetadataIndex.build(make_docs())
+
+    assert select(index, {"source": "b.pdf", "page": 5, "images": True}) == [0]
+    assert select(index, {"source": "b.pdf", "images": True}) == [0]
+
+
+def test_excluded_rows_keep_no_references():
+    index = MetadataIndex.build(make_docs(), exclude=[0])
+
+    assert select(index, {"source": "b.pdf", "page": 5}) == []
+    assert index.references == {}
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag.kbs import KBSRetrievalChain
+from rag.mmr import mmr_select
+from rag.parsing_outputs import write_chunk_file
+
+RELEVANCE = np.array([0.5, 1.0, 0.95, 0.2])
+VECTORS = np.array([[0.0, 1.0], [1.0, 0.0], [0.99, 0.05], [0.7, 0.7]])
+
+TEXTS = [
+    "섬김의 리더십은 공동체를 세운다. " * 4,
+    "섬김의 리더십은 공동체를 세운다. " * 4 + "기도",
+    "예배와 찬양의 삶을 다루는 강의입니다. " * 4,
+]
+
+
+def test_lambda_one_keeps_the_relevance_order():
+    assert mmr_select(RELEVANCE, VECTORS, 4, lambda_mult=1.0).tolist() == [1, 2, 0, 3]
+
+
+def test_lower_lambda_drops_a_near_identical_second_hit():
+    assert mmr_select(RELEVANCE, VECTORS, 2, lambda_mult=0.5).tolist() == [1, 0]
+
+
+def test_unknown_vectors_are_not_penalized():
+    vectors = VECTORS.copy()
+    vectors[2] = 0.0
+
+    assert mmr_select(RELEVANCE, vectors, 2, lambda_mult=0.5).tolist() == [1, 2]
+
+
+def test_k_is_capped_by_the_candidates():
+    assert sorted(mmr_select(RELEVANCE, VECTORS, 10, lambda_mult=0.3).tolist()) == [0, 1, 2, 3]
+    assert mmr_select(RELEVANCE[:0], VECTORS[:0], 3).size == 0
+
+
+def test_lambda_out_of_range_is_rejected():
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        mmr_select(RELEVANCE, VECTORS, 2, lambda_mult=1.5)
+
+
+def make_chain(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    docs = [Document(text, metadata={"source": "a.pdf", "page": page}) for page, text in enumerate(TEXTS)]
+    write_chunk_file(outputs / "a.parquet", docs)
+    chain = KBSRetrievalChain(
+        persist_directory=str(tmp_path / "db"),
+        db_index_name="kbs",
+        embedding_backend="hashing",
+        embedding_options={"dim": 64},
+    )
+    chain.ingest([outputs])
+    return chain.initialize()
+
+
+def test_chain_returns_k_results_when_the_pool_exceeds_the_candidates(tmp_path):
+    chain = make_chain(tmp_path)
+
+    chain.mmr_fetch_k = 20
+    for lambda_mult in (0.0, 0.5):
+        chain.mmr_lambda = lambda_mult
+        assert len(chain.search_semantic("섬김의 리더십", 2)) == 2
+        assert len(chain.search_hybrid("섬김의 리더십", 2)) == 2
+
+
+def test_chain_diversifies_near_duplicate_hits(tmp_path):
+    chain = make_chain(tmp_path)
+
+    plain = [doc.metadata["page"] for doc in chain.search_hybrid("섬김의 리더십 공동체", 2, mmr_lambda=1.0)]
+    diverse = [doc.metadata["page"] for doc in chain.search_hybrid("섬김의 리더십 공동체", 2, mmr_lambda=0.3)]
+
+    assert sorted(plain) == [0, 1]
+    # One of the two near-identical chunks makes room for the other topic
+    assert 2 in diverse and len(diverse) == 2
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+from rag.packing import ELLIPSIS, NO_RESULTS, count_tokens, pack_results, passage_window, query_terms
+
+FILLER = "이 문장은 질문과 관련이 없는 내용입니다. "
+MATCH = "제자 훈련 과정은 열두 주 동안 진행됩니다. "
+
+
+def make_doc(text, source="a.pdf", page=0, **metadata):
+    return Document(text, metadata={"source": source, "page": page, **metadata})
+
+
+def test_query_terms_allow_korean_particles():
+    assert query_terms("훈련 과정은 a") == [("훈련",), ("과정은", "과정")]
+
+
+def test_passage_window_keeps_the_best_matching_sentences():
+    text = FILLER * 5 + MATCH + FILLER * 5
+
+    passage, trimmed = passage_window(text, query_terms("제자 훈련 과정"), 60, len)
+
+    assert trimmed
+    assert MATCH.strip() in passage
+    assert passage.startswith(ELLIPSIS) and passage.endswith(ELLIPSIS)
+    assert len(passage) <= 60
+
+
+def test_passage_window_returns_short_text_unchanged():
+    assert passage_window(MATCH, query_terms("훈련"), 100, len) == (MATCH, False)
+
+
+def test_without_budget_every_chunk_is_returned_in_full():
+    docs = [make_doc(FILLER * 20, page=0), make_doc(MATCH * 20, page=4)]
+
+    response = pack_results(["훈련"], [docs], grouped=False)
+
+    assert response.startswith("## Search Results")
+    assert FILLER * 20 in response and MATCH * 20 in response
+    assert "### Result 2 (Page: 5)" in response
+
+
+@pytest.mark.parametrize("output_format", ["markdown", "json"])
+def test_char_budget_is_respected(output_format):
+    docs = [make_doc(f"{page}장. " + FILLER * 10 + MATCH + FILLER * 10, page=page) for page in range(6)]
+
+    response = pack_results(["제자 훈련"], [docs], max_chars=1200, output_format=output_format, grouped=False)
+
+    assert len(response) <= 1200
+    assert MATCH.strip() in response
+
+
+def test_lowest_ranked_results_are_omitted_first():
+    docs = [make_doc(f"{page}장. " + FILLER * 10 + MATCH + FILLER * 10, page=page) for page in range(6)]
+
+    payload = json.loads(pack_results(["훈련"], [docs], max_chars=700, output_format="json", grouped=False))
+
+    ranks = [result["rank"] for result in payload["results"]]
+    assert ranks == list(range(1, len(ranks) + 1))
+    assert payload["omitted"] == 6 - len(ranks) > 0
+    assert all(result["truncated"] for result in payload["results"])
+
+
+def test_token_budget_is_respected():
+    docs = [make_doc(f"{page}장. " + FILLER * 30 + MATCH, page=page) for page in range(3)]
+
+    response = pack_results(["훈련"], [docs], max_tokens=300, grouped=False, encoding="no-such-encoding")
+
+    # Unknown encodings fall back to an estimate, so the test needs no BPE download
+    assert count_tokens(response, "no-such-encoding") <= 300
+    assert MATCH.strip() in response
+
+
+def test_json_shape_groups_by_query_and_refers_back_to_repeats():
+    shared = make_doc(MATCH, page=2, images=["x.png"], duplicates=[{"source": "b.pdf", "page": 6}])
+    other = make_doc(FILLER, source="c.pdf", page=None)
+
+    payload = json.loads(pack_results(["훈련", "제자"], [[shared], [other, shared]], output_format="json"))
+
+    assert payload == {"queries": [
+        {"query": "훈련", "results": [
+            {"rank": 1, "source": "a.pdf", "page": 3, "text": MATCH, "images": ["x.png"],
+             "also_in": [{"source": "b.pdf", "page": 7}]},
+        ]},
+        {"query": "제자", "results": [
+            {"rank": 1, "source": "c.pdf", "text": FILLER},
+            {"rank": 2, "same_as": [1, 1]},
+        ]},
+    ]}
+
+
+def test_markdown_shows_references_and_repeats():
+    shared = make_doc(MATCH, page=2, duplicates=[{"source": "b.pdf", "page": 6}])
+
+    response = pack_results(["훈련", "제자"], [[shared], [shared]])
+
+    assert "Also in: b.pdf (Page: 7)" in response
+    assert "Same chunk as Query 1, Result 1." in response
+
+
+def test_empty_results_and_invalid_arguments():
+    assert pack_results(["훈련"], [[]]) == NO_RESULTS
+    assert json.loads(pack_results(["훈련"], [[]], output_format="json")) == {"queries": [{"query": "훈련", "results": []}]}
+    with pytest.raises(ValueError):
+        pack_results(["훈련"], [[make_doc(MATCH)]], output_format="xml")
+    with pytest.raises(ValueError):
+        pack_results(["훈련"], [[make_doc(MATCH)]], max_chars=0)
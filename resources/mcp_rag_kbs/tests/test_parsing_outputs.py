@@ -0,0 +1,46 @@
+import pickle
+
+from langchain_core.documents import Document
+
+from rag.parsing_outputs import (
+    convert_pickle_outputs,
+    find_chunk_files,
+    iter_chunk_batches,
+    iter_chunks,
+    write_chunk_file,
+)
+
+DOCS = [
+    Document("하나님의 나라를 세우는 리더", metadata={"source": "a.pdf", "page": 0, "images": ["a-0.png"]}),
+    Document("섬김의 본을 보이는 공동체", metadata={"source": "a.pdf", "page": 1, "entity": "table"}),
+    Document("", metadata={"source": "b.pdf", "page": 0}),
+    Document("기도와 예배의 삶 " * 20, metadata={"source": "b.pdf", "page": 1}),
+]
+
+
+def pairs(docs):
+    return [(doc.page_content, doc.metadata) for doc in docs]
+
+
+def test_chunk_file_round_trip_in_batches(tmp_path):
+    assert write_chunk_file(tmp_path / "a.parquet", DOCS, batch_size=3) == len(DOCS)
+
+    batches = list(iter_chunk_batches([tmp_path / "a.parquet"], batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert pairs(doc for batch in batches for doc in batch) == pairs(DOCS)
+
+
+def test_pickle_outputs_convert_to_equal_chunk_files(tmp_path):
+    with open(tmp_path / "a.pkl", "wb") as f:
+        pickle.dump(DOCS, f)
+
+    assert convert_pickle_outputs(tmp_path) == [tmp_path / "a.parquet"]
+    assert find_chunk_files(tmp_path) == [tmp_path / "a.parquet"]
+    converted = list(iter_chunks(find_chunk_files(tmp_path), batch_size=3))
+    assert pairs(converted) == pairs(DOCS)
+    # Existing chunk files are kept unless overwriting
+    assert convert_pickle_outputs(tmp_path) == []
+    assert convert_pickle_outputs(tmp_path, overwrite=True) == [tmp_path / "a.parquet"]
+
+
@@ -0,0 +1,73 @@
+from typing import Any, List
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from rag.base import RetrievalChain
+
+SHARED = "하나님의 나라를 세우는 리더는 섬김의 본을 보이며 공동체를 이끈다. " * 5
+
+
+class InMemoryRetrievalChain(RetrievalChain):
+    """RetrievalChain over in-memory documents and an in-memory FAISS store."""
+
+    def __init__(self, docs: List[Document], **kwargs) -> None:
+        super().__init__(embedding_backend="hashing", embedding_options={"dim": 64}, **kwargs)
+        self.docs = docs
+
+    def load_documents(self, source_uris: List[str]) -> List[Document]:
+        return self.docs
+
+    def create_text_splitter(self) -> RecursiveCharacterTextSplitter:
+        return RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=0)
+
+    def create_vectorstore(self, split_docs: List[Document]) -> Any:
+        return FAISS.from_documents(split_docs, self.embeddings)
+
+
+def make_docs() -> List[Document]:
+    return [
+        Document(SHARED, metadata={"source": "a.pdf", "page": 0}),
+        Document("섬김과 다른 주제의 내용입니다. " * 10, metadata={"source": "a.pdf", "page": 1}),
+        Document(SHARED + " ", metadata={"source": "b.pdf", "page": 3}),
+    ]
+
+
+def test_initialize_builds_all_retrievers():
+    chain = InMemoryRetrievalChain(make_docs(), k=2).initialize()
+
+    assert set(chain.retrievers) == {"semantic", "keyword"}
+    assert len(chain.split_docs) == 3
+    assert len(chain.search_semantic("섬김의 본", 2)) == 2
+    assert chain.search_keyword("주제의", 1)[0].metadata == {"source": "a.pdf", "page": 1}
+
+
+def test_initialize_collapses_near_duplicates():
+    chain = InMemoryRetrievalChain(make_docs(), k=3, dedup_threshold=0.9).initialize()
+
+    assert [doc.metadata["source"] for doc in chain.split_docs] == ["a.pdf", "a.pdf"]
+    canonical = chain.split_docs[0]
+    assert canonical.metadata["duplicates"] == [{"source": "b.pdf", "page": 3}]
+    # Neither index holds the collapsed copy
+    assert chain.vectorstore.index.ntotal == 2
+    results = chain.search_semantic("섬김의 본", 3)
+    assert len(results) == 2
+    assert results[0].metadata["duplicates"] == [{"source": "b.pdf", "page": 3}]
+
+
+def test_initialize_keeps_duplicates_without_threshold():
+    chain = InMemoryRetrievalChain(make_docs(), k=3).initialize()
+
+    assert chain.vectorstore.index.ntotal == 3
+    assert all("duplicates" not in doc.metadata for doc in chain.split_docs)
+
+
+def test_search_hybrid_returns_k_fused_results():
+    chain = InMemoryRetrievalChain(make_docs(), k=1).initialize()
+
+    assert len(chain.search_hybrid("섬김의 본")) == 1
+    results = chain.search_hybrid("섬김의 본", 3)
+    assert sorted((doc.metadata["source"], doc.metadata["page"]) for doc in results) == [
+        ("a.pdf", 0), ("a.pdf", 1), ("b.pdf", 3)
+    ]
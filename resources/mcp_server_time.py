@@ -1,3 +1,4 @@
+import argparse
 from mcp.server.fastmcp import FastMCP
 from datetime import datetime
 import pytz
@@ -9,6 +10,8 @@ mcp = FastMCP(
     instructions="You are a time assistant that can provide the current time for different timezones.",  # Instructions for the LLM on how to use this tool
     host="0.0.0.0",  # Host address (0.0.0.0 allows connections from any IP)
     port=8005,  # Port number for the server
+    stateless_http=True,  # streamable-http: no sessions, so any replica can answer any request
+    json_response=True,  # streamable-http: plain JSON responses instead of SSE streams
 )
 
 
@@ -43,8 +46,15 @@ async def get_current_time(timezone: Optional[str] = "Asia/Seoul") -> str:
 
 
 if __name__ == "__main__":
-    # Start the MCP server with stdio transport
-    # stdio transport allows the server to communicate with clients
-    # through standard input/output streams, making it suitable for
-    # local development and testing
-    mcp.run(transport="sse")
+    # sse: one long-lived connection per client (http://<host>:8005/sse)
+    # streamable-http: stateless HTTP that several replicas can serve behind
+    # a load balancer (http://<host>:8005/mcp/)
+    # stdio: communicate through standard input/output, for local clients
+    parser = argparse.ArgumentParser(description="Time MCP server")
+    parser.add_argument("--transport", choices=["sse", "streamable-http", "stdio"], default="sse")
+    parser.add_argument("--host", default=mcp.settings.host)
+    parser.add_argument("--port", type=int, default=mcp.settings.port)
+    args = parser.parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.run(transport=args.transport)